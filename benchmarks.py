@@ -0,0 +1,282 @@
+"""
+Benchmarks de carga, limpieza, transformación y gráficas.
+
+Genera datos sintéticos con la forma de 'cancer patient data sets.csv',
+'MMSE 1.csv' y de los archivos EEG .mat, mide el tiempo y la memoria pico de
+cada operación y compara los resultados con una línea base en JSON. También
+mide el tiempo de importar clases.py y main.py en un intérprete nuevo.
+
+Uso:
+    python benchmarks.py --filas 10000 100000 --guardar
+    python benchmarks.py --filas 10000 100000
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import scipy.io as sio
+
+from clases import Read_CSV, Read_Mat
+
+BASELINE = 'benchmarks_baseline.json'
+
+# Diferencias mínimas para marcar una regresión: por debajo son ruido de
+# medición aunque en proporción parezcan grandes (tiempos de menos de 1 ms)
+MIN_SEGUNDOS = 0.005
+MIN_MEMORIA_MB = 1.0
+# Además, un aumento de tiempo debe superar este múltiplo de la dispersión
+# entre repeticiones (máximo - mínimo) de la línea base o de la medición actual
+FACTOR_DISPERSION = 3
+
+COLUMNAS_RIESGO = [
+    'Air Pollution', 'Alcohol use', 'Dust Allergy', 'OccuPational Hazards', 'Genetic Risk',
+    'chronic Lung Disease', 'Balanced Diet', 'Obesity', 'Smoking', 'Passive Smoker',
+    'Chest Pain', 'Coughing of Blood', 'Fatigue', 'Weight Loss', 'Shortness of Breath',
+    'Wheezing', 'Swallowing Difficulty', 'Clubbing of Finger Nails', 'Frequent Cold',
+    'Dry Cough', 'Snoring',
+]
+DIAGNOSTICOS = ['Healthy ageing', 'MCI', 'Dementia', 'Others']
+
+
+def _con_nans(df, columnas, rng, fraccion=0.01):
+    for col in columnas:
+        df.loc[rng.random(len(df)) < fraccion, col] = np.nan
+    return df
+
+
+def generar_csv_cancer(ruta, filas, rng):
+    """
+    Escribe un CSV sintético con las columnas del conjunto de pacientes con cáncer.
+    """
+    datos = {
+        'index': np.arange(filas),
+        'Patient Id': ['P' + str(i) for i in range(filas)],
+        'Age': rng.integers(14, 74, filas),
+        'Gender': rng.integers(1, 3, filas),
+    }
+    for col in COLUMNAS_RIESGO:
+        datos[col] = rng.integers(1, 9, filas)
+    datos['Level'] = rng.choice(['Low', 'Medium', 'High'], filas)
+    df = _con_nans(pd.DataFrame(datos), ['Age'] + COLUMNAS_RIESGO[:5], rng)
+    df.to_csv(ruta, index=False)
+
+
+def generar_csv_mmse(ruta, filas, rng):
+    """
+    Escribe un CSV sintético con las columnas de 'MMSE 1.csv'.
+    """
+    df = pd.DataFrame({
+        'ID': np.arange(1, filas + 1),
+        'diagnosis': rng.choice(DIAGNOSTICOS, filas),
+        'Age': rng.integers(50, 95, filas),
+        'Sex': rng.choice(['F', 'M'], filas),
+        'MMSE': rng.integers(10, 31, filas),
+        'FAB': rng.integers(5, 19, filas),
+    })
+    _con_nans(df, ['MMSE', 'FAB'], rng).to_csv(ruta, index=False)
+
+
+def generar_mat(ruta, canales, muestras, epocas, rng):
+    """
+    Escribe un archivo .mat con una matriz EEG sintética (canales x muestras x épocas).
+    """
+    sio.savemat(ruta, {'data': rng.standard_normal((canales, muestras, epocas))})
+
+
+def _csv_cargado(ruta):
+    lector = Read_CSV(ruta)
+    lector.load_csv()
+    return lector
+
+
+def _mat_cargado(ruta):
+    lector = Read_Mat(ruta)
+    lector.load_mat()
+    return lector
+
+
+def casos(carpeta, tamanos_csv, tamanos_eeg, rng):
+    """
+    Genera los datos sintéticos y devuelve la lista de casos a medir.
+
+    Cada caso es (nombre, preparar, ejecutar): preparar se llama fuera de la
+    medición y su resultado se pasa a ejecutar.
+    """
+    lista = []
+    for filas in tamanos_csv:
+        for tipo, generar, col1, col2 in (('cancer', generar_csv_cancer, 'Age', 'Smoking'),
+                                          ('mmse', generar_csv_mmse, 'MMSE', 'FAB')):
+            ruta = os.path.join(carpeta, f'{tipo}_{filas}.csv')
+            generar(ruta, filas, rng)
+            salida = os.path.join(carpeta, f'{tipo}_{filas}_salida.csv')
+            lista += [
+                (f'load_csv[{tipo},{filas}]', lambda r=ruta: Read_CSV(r), lambda l: l.load_csv()),
+                (f'nan_counter_and_cleanup[{tipo},{filas}]', lambda r=ruta: _csv_cargado(r),
+                 lambda l: l.nan_counter_and_cleanup()),
+                (f'multiplicar_columnas_y_guardar[{tipo},{filas}]', lambda r=ruta: _csv_cargado(r),
+                 lambda l, a=col1, b=col2, s=salida: l.multiplicar_columnas_y_guardar(a, b, s)),
+            ]
+    for canales, muestras, epocas in tamanos_eeg:
+        nombre = f'{canales}x{muestras}x{epocas}'
+        ruta = os.path.join(carpeta, f'eeg_{nombre}.mat')
+        generar_mat(ruta, canales, muestras, epocas, rng)
+        figura = os.path.join(carpeta, f'eeg_{nombre}.png')
+        lista += [
+            (f'load_mat[{nombre}]', lambda r=ruta: Read_Mat(r), lambda l: l.load_mat()),
+            (f'graficar_todos[{nombre}]', lambda r=ruta: _mat_cargado(r),
+             lambda l, f=figura: l.graficar_todos(ruta_salida=f)),
+            (f'graficar_ruido[{nombre}]', lambda r=ruta: _mat_cargado(r),
+             lambda l, f=figura: l.graficar_ruido(0, 1, 2, ruta_salida=f)),
+        ]
+    return lista
+
+
+def medir(preparar, ejecutar, repeticiones):
+    """
+    Mide el mejor tiempo de varias repeticiones y, aparte, la memoria pico.
+
+    La memoria se mide en una ejecución separada porque tracemalloc agrega
+    sobrecosto al tiempo.
+
+    :return: Diccionario con 'segundos' (el mejor), 'dispersion_segundos'
+             (máximo - mínimo de las repeticiones) y 'memoria_pico_mb'.
+    """
+    tiempos = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeticiones):
+            objeto = preparar()
+            inicio = time.perf_counter()
+            ejecutar(objeto)
+            tiempos.append(time.perf_counter() - inicio)
+
+        objeto = preparar()
+        tracemalloc.start()
+        ejecutar(objeto)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {'segundos': round(min(tiempos), 6), 'dispersion_segundos': round(max(tiempos) - min(tiempos), 6),
+            'memoria_pico_mb': round(pico / 1024 ** 2, 3)}
+
+
+def medir_importacion(modulo, repeticiones):
+    """
+    Mide el tiempo de importar un módulo en un intérprete nuevo, para que
+    el arranque del menú no vuelva a cargar librerías pesadas sin necesidad.
+
+    :return: Diccionario con 'segundos', 'memoria_pico_mb' y los módulos pesados cargados.
+    """
+    codigo = (
+        "import sys, time\n"
+        "inicio = time.perf_counter()\n"
+        f"import {modulo}\n"
+        "print(time.perf_counter() - inicio)\n"
+        "print(','.join(m for m in ('pandas', 'seaborn', 'matplotlib', 'scipy') if m in sys.modules))\n"
+    )
+    carpeta = os.path.dirname(os.path.abspath(__file__))
+    tiempos = []
+    for _ in range(repeticiones):
+        salida = subprocess.run([sys.executable, '-c', codigo], cwd=carpeta, capture_output=True,
+                                text=True, check=True).stdout.splitlines()
+        tiempos.append(float(salida[0]))
+    cargados = salida[1] if len(salida) > 1 else ''
+    return {'segundos': round(min(tiempos), 6), 'dispersion_segundos': round(max(tiempos) - min(tiempos), 6),
+            'memoria_pico_mb': 0.0,
+            'modulos_pesados': cargados.split(',') if cargados else []}
+
+
+def comparar(resultados, base, tolerancia, min_segundos=MIN_SEGUNDOS):
+    """
+    Compara los resultados con la línea base.
+
+    Un aumento cuenta como regresión si supera la tolerancia relativa y
+    además una diferencia mínima absoluta: min_segundos (o FACTOR_DISPERSION
+    veces la dispersión entre repeticiones, si es mayor) para el tiempo y
+    MIN_MEMORIA_MB para la memoria.
+
+    :return: Lista de mensajes de regresión (vacía si no hay).
+    """
+    regresiones = []
+    for nombre, actual in resultados.items():
+        if nombre not in base:
+            continue
+        dispersion = max(base[nombre].get('dispersion_segundos', 0.0), actual.get('dispersion_segundos', 0.0))
+        minimos = {'segundos': max(min_segundos, FACTOR_DISPERSION * dispersion),
+                   'memoria_pico_mb': MIN_MEMORIA_MB}
+        for metrica in ('segundos', 'memoria_pico_mb'):
+            anterior = base[nombre][metrica]
+            diferencia = actual[metrica] - anterior
+            if anterior > 0 and diferencia > anterior * tolerancia and diferencia > minimos[metrica]:
+                regresiones.append(f"{nombre}: {metrica} {anterior} -> {actual[metrica]} "
+                                   f"(+{100 * (actual[metrica] / anterior - 1):.0f} %)")
+    return regresiones
+
+
+def parsear_argumentos(argv):
+    parser = argparse.ArgumentParser(description="Benchmarks de clases.py.")
+    parser.add_argument('--filas', type=int, nargs='+', default=[10000, 100000],
+                        help="Tamaños de los CSV sintéticos (de 10k a 10M filas).")
+    parser.add_argument('--eeg', nargs='+', default=['32x2000x50'],
+                        help="Formas EEG como CANALESxMUESTRASxEPOCAS.")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--baseline', default=BASELINE, help="Archivo JSON con la línea base.")
+    parser.add_argument('--guardar', action='store_true', help="Guardar los resultados como línea base.")
+    parser.add_argument('--tolerancia', type=float, default=0.25,
+                        help="Aumento relativo permitido antes de marcar una regresión.")
+    parser.add_argument('--min-ms', type=float, default=MIN_SEGUNDOS * 1000,
+                        help="Aumento de tiempo mínimo (ms) para marcar una regresión.")
+    parser.add_argument('--semilla', type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parsear_argumentos(argv)
+    import matplotlib
+    matplotlib.use('Agg')
+
+    rng = np.random.default_rng(args.semilla)
+    tamanos_eeg = [tuple(int(v) for v in forma.split('x')) for forma in args.eeg]
+    resultados = {}
+    for modulo in ('clases', 'main'):
+        nombre = f'importar[{modulo}]'
+        resultados[nombre] = medir_importacion(modulo, args.repeticiones)
+        r = resultados[nombre]
+        pesados = ', '.join(r['modulos_pesados']) or 'ninguno'
+        print(f"{nombre:<55} {r['segundos']:>10.4f} s   (módulos pesados: {pesados})")
+    with tempfile.TemporaryDirectory() as carpeta:
+        for nombre, preparar, ejecutar in casos(carpeta, args.filas, tamanos_eeg, rng):
+            resultados[nombre] = medir(preparar, ejecutar, args.repeticiones)
+            r = resultados[nombre]
+            print(f"{nombre:<55} {r['segundos']:>10.4f} s {r['memoria_pico_mb']:>10.2f} MB")
+
+    if args.guardar:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+        print(f"Línea base guardada en: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No hay línea base para comparar; use --guardar para crearla.")
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        base = json.load(f)
+    regresiones = comparar(resultados, base, args.tolerancia, args.min_ms / 1000)
+    if regresiones:
+        print("\nRegresiones detectadas:")
+        for mensaje in regresiones:
+            print(f"- {mensaje}")
+        return 1
+    print("\nSin regresiones respecto a la línea base.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+from exportar_tablas import escritura_atomica
+from importacion_perezosa import importar_perezoso, disponible
+
+pd = importar_perezoso('pandas')
+
+# pyarrow es necesario para Parquet en pandas; se comprueba sin importarlo
+FORMATO_TABLAS = 'parquet' if disponible('pyarrow') else 'pickle'
+
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'parcial2_info2')
+
+
+class Cache_Disco:
+    """
+    Caché en disco de los datos ya cargados.
+
+    Cada entrada se identifica por la ruta, el tamaño y la fecha de
+    modificación del archivo original, de modo que un archivo modificado
+    nunca devuelve datos viejos. Los archivos se escriben de forma atómica
+    y meta.json se escribe al final: una entrada sin él está incompleta. Los DataFrames se guardan en Parquet (o
+    pickle si no está pyarrow) y las matrices MAT como archivos .npy que
+    se pueden abrir con memmap. Cuando se supera el tamaño máximo se
+    eliminan las entradas usadas hace más tiempo (LRU).
+    """
+
+    def __init__(self, directorio=CACHE_DIR, max_bytes=2 * 1024 ** 3, mmap=True):
+        """
+        :param directorio: Carpeta donde se guardan las entradas.
+        :param max_bytes: Tamaño máximo total de la caché.
+        :param mmap: Si es True, las matrices .npy se abren con memmap.
+        """
+        self.directorio = directorio
+        self.max_bytes = max_bytes
+        self.mmap = mmap
+        os.makedirs(self.directorio, exist_ok=True)
+
+    def _clave(self, file_path, tipo):
+        ruta = os.path.abspath(file_path)
+        info = os.stat(ruta)
+        texto = f"{tipo}|{ruta}|{info.st_size}|{info.st_mtime_ns}"
+        return hashlib.sha1(texto.encode('utf-8')).hexdigest()
+
+    def _entrada(self, file_path, tipo):
+        return os.path.join(self.directorio, self._clave(file_path, tipo))
+
+    def _tocar(self, entrada):
+        # La fecha de modificación de la carpeta marca el último uso (LRU)
+        os.utime(entrada)
+
+    def _guardar_meta(self, entrada, file_path, tipo, **extra):
+        with escritura_atomica(os.path.join(entrada, 'meta.json')) as temporal, \
+                open(temporal, 'w', encoding='utf-8') as f:
+            json.dump({'origen': os.path.abspath(file_path), 'tipo': tipo, **extra}, f)
+
+    def _abrir_entrada(self, file_path, tipo):
+        """
+        Carpeta de la entrada, vaciada de una versión anterior: sin meta.json
+        queda marcada como incompleta hasta terminar de escribirla.
+        """
+        entrada = self._entrada(file_path, tipo)
+        os.makedirs(entrada, exist_ok=True)
+        meta = os.path.join(entrada, 'meta.json')
+        if os.path.exists(meta):
+            os.remove(meta)
+        return entrada
+
+    def leer_tabla(self, file_path, tipo='csv'):
+        """
+        Devuelve el DataFrame guardado para el archivo o None si no hay entrada válida.
+
+        :param tipo: Variante de la tabla (por ejemplo 'csv_optimizado').
+        """
+        entrada = self._entrada(file_path, tipo)
+        if not os.path.exists(os.path.join(entrada, 'meta.json')):
+            return None
+        archivo = os.path.join(entrada, 'datos.' + FORMATO_TABLAS)
+        try:
+            data = pd.read_parquet(archivo) if FORMATO_TABLAS == 'parquet' else pd.read_pickle(archivo)
+        except Exception:
+            # Entrada dañada (p. ej. truncada): se descarta y se vuelve a leer el original
+            shutil.rmtree(entrada, ignore_errors=True)
+            return None
+        self._tocar(entrada)
+        return data
+
+    def guardar_tabla(self, file_path, data, tipo='csv'):
+        """
+        Guarda un DataFrame asociado al archivo de origen.
+
+        :param tipo: Variante de la tabla (por ejemplo 'csv_optimizado').
+        """
+        entrada = self._abrir_entrada(file_path, tipo)
+        with escritura_atomica(os.path.join(entrada, 'datos.' + FORMATO_TABLAS)) as temporal:
+            if FORMATO_TABLAS == 'parquet':
+                data.to_parquet(temporal)
+            else:
+                data.to_pickle(temporal)
+        # meta.json se escribe al final: marca la entrada como completa
+        self._guardar_meta(entrada, file_path, tipo)
+        self.evictar()
+
+    def leer_matrices(self, file_path):
+        """
+        Devuelve un diccionario {nombre: matriz} para el archivo o None si no hay entrada.
+        """
+        entrada = self._entrada(file_path, 'mat')
+        try:
+            with open(os.path.join(entrada, 'meta.json'), encoding='utf-8') as f:
+                nombres = json.load(f)['matrices']
+        except (OSError, ValueError, KeyError):
+            return None
+        self._tocar(entrada)
+        modo = 'r' if self.mmap else None
+        return {nombre: np.load(os.path.join(entrada, nombre + '.npy'), mmap_mode=modo) for nombre in nombres}
+
+    def guardar_matrices(self, file_path, matrices):
+        """
+        Guarda las matrices numéricas de un archivo MAT como archivos .npy.
+        """
+        entrada = self._abrir_entrada(file_path, 'mat')
+        nombres = []
+        for nombre, matriz in matrices.items():
+            if isinstance(matriz, np.ndarray) and matriz.dtype != object and not nombre.startswith('_'):
+                np.save(os.path.join(entrada, nombre + '.npy'), matriz)
+                nombres.append(nombre)
+        # meta.json se escribe al final: marca la entrada como completa
+        self._guardar_meta(entrada, file_path, 'mat', matrices=nombres)
+        self.evictar()
+
+    def _tamano(self, entrada):
+        return sum(os.path.getsize(os.path.join(entrada, f)) for f in os.listdir(entrada))
+
+    def evictar(self):
+        """
+        Elimina las entradas menos usadas hasta quedar por debajo de max_bytes.
+        """
+        entradas = [os.path.join(self.directorio, e) for e in os.listdir(self.directorio)]
+        entradas = [e for e in entradas if os.path.isdir(e)]
+        entradas.sort(key=os.path.getmtime)
+        tamanos = {e: self._tamano(e) for e in entradas}
+        total = sum(tamanos.values())
+        for entrada in entradas:
+            if total <= self.max_bytes:
+                break
+            total -= tamanos[entrada]
+            shutil.rmtree(entrada, ignore_errors=True)
+
+    def invalidar(self, file_path=None):
+        """
+        Elimina las entradas de un archivo o, si no se indica, toda la caché.
+
+        :param file_path: Archivo de origen cuyas entradas se descartan.
+        """
+        for nombre in os.listdir(self.directorio):
+            entrada = os.path.join(self.directorio, nombre)
+            if not os.path.isdir(entrada):
+                continue
+            if file_path is not None:
+                try:
+                    with open(os.path.join(entrada, 'meta.json'), encoding='utf-8') as f:
+                        origen = json.load(f)['origen']
+                except (OSError, ValueError, KeyError):
+                    origen = None
+                if origen != os.path.abspath(file_path):
+                    continue
+            shutil.rmtree(entrada, ignore_errors=True)
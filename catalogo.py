@@ -0,0 +1,257 @@
+"""
+Catálogo de los archivos CSV y MAT de una carpeta (cohortes de sujetos).
+
+El catálogo guarda por archivo las columnas y el número de filas (CSV) o
+las matrices con su forma (MAT), leídos solo de los encabezados. Con él se
+eligen subconjuntos y se cargan en paralelo en un único DataFrame o en una
+matriz (sujetos x canales x muestras x épocas).
+
+Uso:
+    catalogo = Catalogo('datos')
+    catalogo.escanear()
+    datos = catalogo.cargar_csv(catalogo.archivos('csv', columnas=['MMSE', 'FAB']))
+    eeg = catalogo.cargar_mat(catalogo.archivos('mat', forma=(8, 2000, 50)))
+"""
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+import mat_perezoso
+from cache import CACHE_DIR
+from importacion_perezosa import importar_perezoso
+
+pd = importar_perezoso('pandas')
+
+ARCHIVO_CATALOGO = os.path.join(CACHE_DIR, 'catalogo.json')
+
+TAMANO_LECTURA = 1024 ** 2
+
+
+def _contar_filas(ruta):
+    """
+    Cuenta las filas de datos de un CSV contando saltos de línea, sin
+    interpretar el contenido (no considera saltos de línea entre comillas).
+    """
+    lineas, ultimo = 0, b'\n'
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(TAMANO_LECTURA), b''):
+            lineas += bloque.count(b'\n')
+            ultimo = bloque[-1:]
+    if ultimo != b'\n':
+        lineas += 1  # Última línea sin salto de línea
+    return max(0, lineas - 1)
+
+
+def describir_archivo(ruta):
+    """
+    Lee los metadatos de un archivo sin cargar sus datos.
+
+    :return: Diccionario con 'ruta', 'tipo', 'bytes', 'mtime_ns' y, según el
+             tipo, 'columnas' y 'filas' o 'matrices' ({nombre: [forma, clase]}).
+    """
+    info = os.stat(ruta)
+    entrada = {'ruta': ruta, 'bytes': info.st_size, 'mtime_ns': info.st_mtime_ns, 'error': None}
+    try:
+        if ruta.lower().endswith('.mat'):
+            entrada['tipo'] = 'mat'
+            entrada['matrices'] = {nombre: [list(forma), clase]
+                                   for nombre, (forma, clase) in mat_perezoso.leer_encabezado(ruta).items()}
+        else:
+            entrada['tipo'] = 'csv'
+            entrada['columnas'] = pd.read_csv(ruta, index_col=0, nrows=0).columns.tolist()
+            entrada['filas'] = _contar_filas(ruta)
+    except Exception as e:
+        entrada['error'] = f"{type(e).__name__}: {e}"
+    return entrada
+
+
+def _leer_csv(ruta, columnas):
+    if columnas is None:
+        return pd.read_csv(ruta, index_col=0)
+    # Solo se interpretan el índice y las columnas pedidas
+    indice = pd.read_csv(ruta, nrows=0).columns[0]
+    data = pd.read_csv(ruta, index_col=0, usecols=[indice, *columnas])
+    return data[columnas]  # usecols no respeta el orden pedido
+
+
+def _copiar_matriz(ruta, nombre, destino):
+    """
+    Copia una matriz del archivo directamente en su lugar de la matriz apilada.
+    """
+    archivo_h5 = mat_perezoso.h5py.File(ruta, 'r') if mat_perezoso.es_mat_v73(ruta) else None
+    try:
+        destino[...] = mat_perezoso.abrir_matriz(ruta, nombre, archivo_h5)[...]
+    finally:
+        if archivo_h5 is not None:
+            archivo_h5.close()
+
+
+class Catalogo:
+    """
+    Metadatos de los archivos de una carpeta y carga en paralelo de subconjuntos.
+
+    Los metadatos se guardan en ARCHIVO_CATALOGO; al volver a escanear solo
+    se leen los archivos nuevos o modificados (según tamaño y fecha).
+    """
+
+    def __init__(self, directorio, patrones=('*.csv', '*.mat'), recursivo=False):
+        """
+        :param directorio: Carpeta con los archivos.
+        :param patrones: Patrones glob de los archivos a incluir.
+        :param recursivo: Si es True se buscan también en las subcarpetas.
+        """
+        self.directorio = os.path.abspath(directorio)
+        self.patrones = patrones
+        self.recursivo = recursivo
+        self.entradas = {}  # ruta -> metadatos
+
+    def _buscar(self):
+        rutas = set()
+        for patron in self.patrones:
+            partes = (self.directorio, '**', patron) if self.recursivo else (self.directorio, patron)
+            rutas.update(glob.glob(os.path.join(*partes), recursive=self.recursivo))
+        return sorted(rutas)
+
+    def escanear(self, workers=None):
+        """
+        Busca los archivos y lee los metadatos de los nuevos o modificados.
+
+        :param workers: Número de hilos para leer los encabezados.
+        :return: Lista de metadatos de todos los archivos.
+        """
+        try:
+            with open(ARCHIVO_CATALOGO, encoding='utf-8') as f:
+                guardado = json.load(f)
+        except (OSError, ValueError):
+            guardado = {}
+
+        rutas = self._buscar()
+        pendientes = []
+        self.entradas = {}
+        for ruta in rutas:
+            previa = guardado.get(ruta)
+            info = os.stat(ruta)
+            if previa and previa['bytes'] == info.st_size and previa['mtime_ns'] == info.st_mtime_ns:
+                self.entradas[ruta] = previa
+            else:
+                pendientes.append(ruta)
+
+        # Leer encabezados es sobre todo espera de disco: se usan hilos
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for entrada in pool.map(describir_archivo, pendientes):
+                self.entradas[entrada['ruta']] = entrada
+        self.entradas = {ruta: self.entradas[ruta] for ruta in rutas}
+
+        guardado.update(self.entradas)
+        os.makedirs(os.path.dirname(ARCHIVO_CATALOGO), exist_ok=True)
+        with open(ARCHIVO_CATALOGO, 'w', encoding='utf-8') as f:
+            json.dump(guardado, f, indent=2, ensure_ascii=False)
+        print(f"{len(rutas)} archivos en {self.directorio} ({len(pendientes)} leídos, "
+              f"{len(rutas) - len(pendientes)} sin cambios).")
+        return list(self.entradas.values())
+
+    def _entrada(self, ruta):
+        if ruta not in self.entradas:
+            self.entradas[ruta] = describir_archivo(os.path.abspath(ruta))
+        return self.entradas[ruta]
+
+    def archivos(self, tipo=None, columnas=None, matriz=None, forma=None):
+        """
+        Filtra los archivos del catálogo.
+
+        :param tipo: 'csv' o 'mat'.
+        :param columnas: Columnas que deben estar en el CSV.
+        :param matriz: Nombre de una matriz que debe estar en el MAT.
+        :param forma: Forma que debe tener la matriz (la indicada o la primera).
+        :return: Lista de rutas.
+        """
+        seleccion = []
+        for ruta, e in self.entradas.items():
+            if e['error'] is not None or (tipo is not None and e['tipo'] != tipo):
+                continue
+            if columnas is not None and (e['tipo'] != 'csv' or not set(columnas) <= set(e['columnas'])):
+                continue
+            if matriz is not None and (e['tipo'] != 'mat' or matriz not in e['matrices']):
+                continue
+            if forma is not None:
+                if e['tipo'] != 'mat' or not e['matrices']:
+                    continue
+                nombre = matriz if matriz is not None else next(iter(e['matrices']))
+                if tuple(e['matrices'][nombre][0]) != tuple(forma):
+                    continue
+            seleccion.append(ruta)
+        return seleccion
+
+    def tabla(self):
+        """
+        DataFrame con una fila por archivo del catálogo.
+        """
+        filas = []
+        for ruta, e in self.entradas.items():
+            if e['tipo'] == 'csv':
+                detalle = f"{len(e.get('columnas', []))} columnas"
+            else:
+                detalle = ', '.join(f"{n} {tuple(f)}" for n, (f, _) in e.get('matrices', {}).items())
+            filas.append({'archivo': os.path.relpath(ruta, self.directorio), 'tipo': e['tipo'],
+                          'filas': e.get('filas'), 'detalle': detalle, 'MB': round(e['bytes'] / 1024 ** 2, 2),
+                          'error': e['error']})
+        return pd.DataFrame(filas).astype({'filas': 'Int64'})
+
+    def cargar_csv(self, rutas=None, columnas=None, workers=None):
+        """
+        Carga varios CSV en paralelo y los une en un solo DataFrame.
+
+        Se agrega la columna categórica 'archivo' con el nombre de origen de
+        cada fila. Las columnas que falten en algún archivo quedan como NaN.
+
+        :param rutas: Archivos a cargar; por defecto todos los CSV.
+        :param columnas: Columnas a conservar de cada archivo.
+        :param workers: Número de procesos.
+        :return: DataFrame con todas las filas.
+        """
+        rutas = self.archivos('csv', columnas) if rutas is None else list(rutas)
+        if not rutas:
+            raise ValueError("No hay archivos CSV para cargar.")
+        if columnas is None and len({tuple(self._entrada(r).get('columnas', ())) for r in rutas}) > 1:
+            print("Los archivos tienen columnas distintas; las que falten quedan como NaN.")
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            tablas = list(pool.map(_leer_csv, rutas, [columnas] * len(rutas)))
+        data = pd.concat(tablas)
+        nombres = [os.path.relpath(r, self.directorio) for r in rutas]
+        codigos = np.repeat(np.arange(len(rutas)), [len(t) for t in tablas])
+        data['archivo'] = pd.Categorical.from_codes(codigos, categories=nombres)
+        return data
+
+    def cargar_mat(self, rutas=None, matriz=None, workers=None, dtype=np.float64):
+        """
+        Carga la misma matriz de varios archivos MAT en paralelo y la apila.
+
+        La matriz de salida se reserva una sola vez con la forma del catálogo
+        y cada hilo copia su sujeto directamente en su lugar.
+
+        :param rutas: Archivos a cargar; por defecto todos los MAT.
+        :param matriz: Nombre de la matriz; por defecto la primera de cada archivo.
+        :param workers: Número de hilos.
+        :param dtype: Tipo de la matriz apilada.
+        :return: Matriz (sujetos x canales x muestras x épocas).
+        """
+        rutas = self.archivos('mat', matriz=matriz) if rutas is None else list(rutas)
+        if not rutas:
+            raise ValueError("No hay archivos MAT para cargar.")
+        matrices = [self._entrada(r).get('matrices') or {} for r in rutas]
+        nombres = [matriz if matriz is not None else next(iter(m), None) for m in matrices]
+        faltan = [r for r, m, n in zip(rutas, matrices, nombres) if n not in m]
+        if faltan:
+            raise ValueError(f"La matriz no se encuentra en: {faltan}.")
+        formas = {tuple(m[n][0]) for m, n in zip(matrices, nombres)}
+        if len(formas) != 1:
+            raise ValueError(f"Las matrices de los sujetos tienen formas distintas: {sorted(formas)}.")
+
+        apilada = np.empty((len(rutas),) + formas.pop(), dtype=dtype)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_copiar_matriz, rutas, nombres, apilada))
+        return apilada
@@ -1,25 +1,147 @@
-import scipy.io as sio
-import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
+import hashlib
+import io
 import numpy as np
+import os
+from importacion_perezosa import importar_perezoso
 
+# Las librerías pesadas se cargan la primera vez que se usan
+sio = importar_perezoso('scipy.io')
+pd = importar_perezoso('pandas')
+sns = importar_perezoso('seaborn')
+plt = importar_perezoso('matplotlib.pyplot')
+
+import mat_perezoso
+from resumen_eeg import calcular_resumen, Estadistica_En_Linea, Resumen_EEG
+import exportar_figuras
+import tipos_optimos
+from decimacion import decimar_minmax, puntos_por_ancho
+from operaciones_canales import Operaciones_Canales
+import espectral
+import erp
+import columnas_derivadas
+import exportar_tablas
+import faltantes
+import consultas
+import estadisticas
+import perfilado
+
+
+# Bytes del inicio y del final de lo leído que se comparan para detectar si
+# un CSV fue reescrito en lugar de solo crecer
+BYTES_FIRMA = 64 * 1024
+
+
+def _firma_archivo(f, desplazamiento):
+    """
+    Huella del inicio y del final de los primeros ``desplazamiento`` bytes del archivo abierto.
+    """
+    f.seek(0)
+    h = hashlib.sha1(f.read(min(BYTES_FIRMA, desplazamiento)))
+    f.seek(max(0, desplazamiento - BYTES_FIRMA))
+    h.update(f.read(min(BYTES_FIRMA, desplazamiento)))
+    return h.hexdigest()
+
+
+def _crear_figura(figsize, ruta_salida=None):
+    """
+    Crea la figura en pyplot para mostrarla o, si hay ruta de salida, una
+    figura Agg reutilizable que no abre ventanas.
+    """
+    if ruta_salida is not None:
+        return exportar_figuras.nueva_figura(figsize)
+    return plt.figure(figsize=figsize)
+
+
+def _mostrar_o_guardar(fig, ruta_salida=None):
+    """
+    Guarda la figura en ruta_salida o la muestra en pantalla si no se indica.
+
+    :return: True; los métodos de gráficas lo devuelven para indicar que la
+             figura se generó (si no, devuelven None).
+    """
+    if ruta_salida is not None:
+        with perfilado.tramo('guardar_figura'):
+            exportar_figuras.guardar_figura(fig, ruta_salida)
+    else:
+        plt.show()
+    return True
+
+
+@perfilado.instrumentar
 class Read_CSV:
     """
     Clase para manipular archivos CSV.
     """
-    def __init__(self, file_path):
+    def __init__(self, file_path, chunksize=None, cache=None, max_puntos_dispersion=50000,
+                 optimizar=False, arrow=False):
+        """
+        :param file_path: Ruta al archivo CSV.
+        :param chunksize: Si se indica, el archivo se procesa por bloques de
+                          este número de filas sin cargarlo completo en memoria.
+        :param cache: Instancia de Cache_Disco para reutilizar cargas previas.
+        :param max_puntos_dispersion: A partir de este número de filas el
+                                      gráfico de dispersión se dibuja como
+                                      histograma hexagonal.
+        :param optimizar: Si es True se cargan los datos con tipos compactos
+                          (enteros pequeños y categorías).
+        :param arrow: Con optimizar, usa tipos respaldados por pyarrow.
+        """
         self.file_path = file_path
+        self.chunksize = chunksize
+        self.cache = cache
+        self.max_puntos_dispersion = max_puntos_dispersion
+        self.optimizar = optimizar
+        self.arrow = arrow
         self.data = None
         self.columnas_disponibles = []
+        self._indices = {}  # Índices secundarios por columna (se crean al consultar)
+        self._consultas = consultas.Cache_Consultas()  # Resultados de filtros y agregados
+        self._reiniciar_estado()
+
+    def _reiniciar_estado(self):
+        """
+        Olvida lo que se sabe de la última lectura del archivo.
+        """
+        self._desplazamiento = None  # Bytes del archivo ya leídos
+        self._firma = None
+        self._termina_en_linea = True
+        self._columnas_archivo = []  # Columnas del archivo (sin las derivadas)
+        self._mascara = None  # Mascara_Nulos de self.data (se calcula al pedirla)
+        self._historial = []  # Cambios que se pueden deshacer, del más antiguo al más reciente
+        self._limpio = False  # Si ya se eliminaron las filas con NaN
+        self._derivadas = {}  # columna derivada -> definición (ver columnas_derivadas)
+        self._salidas = {}  # archivo generado -> columnas guardadas
 
     def load_csv(self):
         """
         Carga el archivo CSV en un DataFrame de Pandas y guarda las columnas disponibles.
+
+        En modo por bloques solo se leen los encabezados; los datos se
+        recorren en cada operación.
         """
         try:
-            self.data = pd.read_csv(self.file_path, index_col=0)
+            if self.chunksize is not None:
+                encabezado = pd.read_csv(self.file_path, index_col=0, nrows=0)
+                self.columnas_disponibles = encabezado.columns.tolist()
+                print(f"Archivo {self.file_path} abierto en modo por bloques ({self.chunksize} filas).")
+                return
+            tipo = ('csv_arrow' if self.arrow else 'csv_optimizado') if self.optimizar else 'csv'
+            self.data = self.cache.leer_tabla(self.file_path, tipo) if self.cache is not None else None
+            if self.data is None:
+                if self.optimizar:
+                    self.data, antes, despues = tipos_optimos.cargar_optimizado(self.file_path, self.arrow)
+                    print(f"Memoria: {antes / 1024 ** 2:.2f} MB -> {despues / 1024 ** 2:.2f} MB "
+                          f"(ahorro de {antes - despues:,} bytes).")
+                else:
+                    with perfilado.tramo('pd.read_csv'):
+                        self.data = pd.read_csv(self.file_path, index_col=0)
+                if self.cache is not None:
+                    self.cache.guardar_tabla(self.file_path, self.data, tipo)
+            self._invalidar_consultas()
             self.columnas_disponibles = self.data.columns.tolist()  # Guardar las columnas
+            self._reiniciar_estado()
+            self._columnas_archivo = list(self.columnas_disponibles)
+            self._marcar_lectura()
             print(f"Archivo {self.file_path} cargado exitosamente.")
         except FileNotFoundError:
             print(f"Error: El archivo {self.file_path} no fue encontrado.")
@@ -28,11 +150,175 @@ class Read_CSV:
         except Exception as e:
             print(f"Ocurrió un error al cargar el archivo: {e}")
 
+    def cargar_dataframe(self, data):
+        """
+        Usa un DataFrame ya cargado, por ejemplo varios archivos unidos con
+        Catalogo.cargar_csv.
+        """
+        self.data = data
+        self._invalidar_consultas()
+        self._reiniciar_estado()
+        self.columnas_disponibles = data.columns.tolist()
+        self._columnas_archivo = list(self.columnas_disponibles)
+        print(f"Datos cargados: {len(data)} filas y {len(self.columnas_disponibles)} columnas.")
+
+    def _marcar_lectura(self, desplazamiento=None):
+        """
+        Guarda hasta qué byte se leyó el archivo y una huella de lo leído,
+        para que recargar() pueda comprobar que después solo se agregaron filas.
+        """
+        with open(self.file_path, 'rb') as f:
+            if desplazamiento is None:
+                desplazamiento = f.seek(0, os.SEEK_END)
+            f.seek(max(0, desplazamiento - 1))
+            self._termina_en_linea = f.read(1) in (b'\n', b'')
+            self._firma = _firma_archivo(f, desplazamiento)
+        self._desplazamiento = desplazamiento
+
+    def _ajustar_tipos(self, nuevas):
+        """
+        Convierte las filas nuevas a los tipos de las columnas ya cargadas
+        (categorías, enteros compactos) para que al unirlas no cambien los tipos.
+        Si un valor nuevo no cabe en el entero compacto de su columna, se
+        amplía la columna cargada en lugar de convertir (astype desbordaría).
+        """
+        for col in nuevas.columns:
+            tipo = self.data[col].dtype
+            if isinstance(tipo, pd.CategoricalDtype):
+                faltantes = pd.Index(nuevas[col].dropna().unique()).difference(tipo.categories)
+                if len(faltantes):
+                    self.data[col] = self.data[col].cat.add_categories(faltantes)
+                    tipo = self.data[col].dtype
+            elif tipos_optimos.es_entero_angosto(tipo) and pd.api.types.is_numeric_dtype(nuevas[col]):
+                valores = nuevas[col].dropna()
+                if (valores % 1 != 0).any():
+                    continue  # Con decimales pandas elige un tipo flotante al unir
+                if len(valores):
+                    ancho = tipos_optimos.ampliar_entero(tipo, valores.min(), valores.max())
+                    if ancho is not tipo:
+                        self.data[col] = self.data[col].astype(ancho)
+                        tipo = self.data[col].dtype
+            try:
+                nuevas[col] = nuevas[col].astype(tipo)
+            except (ValueError, TypeError, OverflowError):
+                pass  # p. ej. un NaN en una columna entera: pandas elige el tipo al unir
+
+    def recargar(self):
+        """
+        Lee solo las filas agregadas al final del archivo desde la última carga.
+
+        Las filas nuevas se suman a los datos con los mismos tipos; se
+        actualizan para ellas los conteos de NaN, la limpieza (si ya se hizo)
+        y la columna 'multiplicacion' (también en el CSV generado). Si el
+        archivo fue reescrito, y no solo creció, se carga de nuevo completo.
+
+        :return: Número de filas nuevas agregadas.
+        """
+        if self.chunksize is not None:
+            print("En modo por bloques el archivo se lee completo en cada operación; no hace falta recargar.")
+            return 0
+        if self.data is None:
+            print("No se han cargado datos.")
+            return 0
+        if self._desplazamiento is None:
+            print("Los datos no se leyeron de un único archivo; no se pueden recargar.")
+            return 0
+
+        try:
+            with open(self.file_path, 'rb') as f:
+                tamano = f.seek(0, os.SEEK_END)
+                reescrito = tamano < self._desplazamiento or _firma_archivo(f, self._desplazamiento) != self._firma
+                if not reescrito:
+                    f.seek(self._desplazamiento)
+                    nuevos = f.read()
+        except FileNotFoundError:
+            print(f"Error: El archivo {self.file_path} no fue encontrado.")
+            return 0
+
+        # Si la última línea leída no tenía salto de línea y ahora continúa, estaba a medio escribir
+        if reescrito or (nuevos and not self._termina_en_linea and nuevos[:1] not in (b'\n', b'\r')):
+            return self._recargar_completo()
+
+        # Solo se procesan líneas completas; una fila a medio escribir queda para la próxima vez
+        fin = nuevos.rfind(b'\n') + 1
+        if not nuevos[:fin].strip():
+            if fin:
+                self._marcar_lectura(self._desplazamiento + fin)
+            print("No hay filas nuevas.")
+            return 0
+        try:
+            nuevas = pd.read_csv(io.BytesIO(nuevos[:fin]), header=None, index_col=0,
+                                 names=['__indice__'] + self._columnas_archivo)
+        except Exception:
+            return self._recargar_completo()
+        nuevas.index.name = self.data.index.name
+        self._ajustar_tipos(nuevas)
+
+        columnas_derivadas.evaluar(nuevas, self._derivadas)
+        mascara = faltantes.Mascara_Nulos.desde(nuevas)
+        conteo = mascara.por_columna()
+        if conteo.sum():
+            print("Valores NaN en las filas nuevas:")
+            print(conteo[conteo > 0])
+        if self._limpio:
+            completas = ~mascara.filas_con_nulos()
+            nuevas, mascara = nuevas[completas], mascara.seleccionar_filas(completas)
+        if self._mascara is not None and self._mascara.columnas == mascara.columnas:
+            self._mascara = self._mascara.extender(mascara)
+        else:
+            self._mascara = None
+
+        self.data = pd.concat([self.data, nuevas])
+        self._invalidar_consultas()
+        if self._historial:
+            # Las posiciones guardadas ya no corresponden a los datos con filas nuevas
+            self._historial.clear()
+            print("El historial para deshacer se reinició al agregar filas.")
+        for ruta, columnas in self._salidas.items():
+            if exportar_tablas.formato_de(ruta) == 'csv' and os.path.exists(ruta):
+                exportar_tablas.agregar_filas_csv(nuevas[columnas], ruta)
+            else:
+                exportar_tablas.exportar(self.data[columnas], ruta)
+        self._marcar_lectura(self._desplazamiento + fin)
+        print(f"Filas nuevas agregadas: {len(nuevas)} (total: {len(self.data)}).")
+        return len(nuevas)
+
+    def _recargar_completo(self):
+        """
+        Vuelve a cargar el archivo completo y repite la limpieza y las
+        columnas derivadas que ya se habían aplicado.
+        """
+        print("El archivo fue reescrito; se carga de nuevo completo.")
+        limpio, derivadas, salidas = self._limpio, self._derivadas, self._salidas
+        filas_antes = len(self.data)
+        self.load_csv()
+        if self.data is None:
+            return 0
+        for definicion in derivadas.values():
+            if isinstance(definicion, columnas_derivadas.ZScore):
+                definicion.reiniciar()  # Con el archivo nuevo se recalculan las estadísticas
+        columnas_derivadas.evaluar(self.data, derivadas)
+        if limpio:
+            self.data.dropna(inplace=True)
+        for ruta, columnas in salidas.items():
+            exportar_tablas.exportar(self.data[columnas], ruta)
+        self._limpio, self._derivadas, self._salidas = limpio, derivadas, salidas
+        return max(0, len(self.data) - filas_antes)
+
+    def _leer_bloques(self):
+        """
+        Recorre el archivo CSV en bloques de ``chunksize`` filas.
+        """
+        return pd.read_csv(self.file_path, index_col=0, chunksize=self.chunksize)
+
+    def _hay_datos(self):
+        return self.data is not None or (self.chunksize is not None and bool(self.columnas_disponibles))
+
     def obtener_columnas(self):
         """
         Devuelve las columnas disponibles.
         """
-        if self.data is not None:
+        if self._hay_datos():
             return self.columnas_disponibles
         else:
             print("No se han cargado datos.")
@@ -56,37 +342,350 @@ class Read_CSV:
             print("No se han cargado datos.")
             return None, None
 
-    def graficar_barras(self):
+    def _columnas_a_graficar(self, columna_x, columna_y):
+        """
+        Usa las columnas indicadas o, si faltan, las solicita al usuario.
+        """
+        if columna_x is None or columna_y is None:
+            return self.solicitar_columnas()
+        if self.data is None:
+            print("No se han cargado datos.")
+            return None, None
+        if columna_x in self.columnas_disponibles and columna_y in self.columnas_disponibles:
+            return columna_x, columna_y
+        print(f"Error: Las columnas '{columna_x}' o '{columna_y}' no existen en los datos.")
+        return None, None
+
+    def _invalidar_consultas(self):
+        """
+        Descarta los índices y los resultados guardados; se llama cada vez
+        que cambian los datos.
+        """
+        self._indices.clear()
+        self._consultas.limpiar()
+
+    def indice(self, columna):
+        """
+        Devuelve el índice secundario de la columna, creándolo la primera vez.
+        """
+        if columna not in self._indices:
+            self._indices[columna] = consultas.Indice(self.data[columna])
+        return self._indices[columna]
+
+    def filtrar(self, condiciones=None, **por_nombre):
+        """
+        Devuelve las filas que cumplen todas las condiciones usando los
+        índices de cada columna. El resultado se guarda, así que repetir la
+        misma consulta no vuelve a calcularla (no se debe modificar).
+
+        Ejemplo::
+
+            lector.filtrar({'Level': 'High', 'Gender': [1, 2], 'Age': (30, 50)})
+            lector.filtrar(diagnosis='MCI', Sex='F')
+
+        :param condiciones: Diccionario {columna: condición}. Un valor pide
+                            igualdad, una lista o conjunto pide pertenencia y
+                            una tupla (mínimo, máximo) un rango inclusivo.
+        :param por_nombre: Condiciones adicionales para columnas sin espacios.
+        :return: DataFrame con las filas seleccionadas.
+        """
+        if self.data is None:
+            print("No se han cargado datos.")
+            return None
+        condiciones = {**(condiciones or {}), **por_nombre}
+        faltan = [c for c in condiciones if c not in self.data.columns]
+        if faltan:
+            print(f"Error: Las columnas {faltan} no existen en los datos.")
+            return None
+
+        def calcular():
+            posiciones = None
+            for columna, condicion in condiciones.items():
+                indice = self.indice(columna)
+                if isinstance(condicion, tuple):
+                    filas = indice.entre(*condicion)
+                elif isinstance(condicion, (list, set, frozenset)):
+                    filas = indice.posiciones(condicion)
+                else:
+                    filas = indice.posiciones([condicion])
+                posiciones = filas if posiciones is None else np.intersect1d(posiciones, filas, assume_unique=True)
+            return self.data if posiciones is None else self.data.iloc[posiciones]
+
+        return self._consultas.obtener(('filtrar', consultas.clave_condiciones(condiciones)), calcular)
+
+    def agregar(self, columna_x, columna_y):
+        """
+        Calcula (y guarda) la media, el conteo y la desviación estándar de
+        columna_y para cada valor de columna_x, usando el índice de columna_x.
+
+        :return: DataFrame con columnas 'mean', 'count' y 'std' indexado por categoría.
+        """
+        return self._consultas.obtener(
+            ('agregar', columna_x, columna_y),
+            lambda: consultas.agrupar(self.indice(columna_x), self.data[columna_y]))
+
+    def _columnas_estadisticas(self, columnas, por=None):
+        """
+        Valida las columnas pedidas o, si no se indican, elige las numéricas
+        (en modo por bloques, según el primer bloque).
+        """
+        if not self._hay_datos():
+            print("No se han cargado datos.")
+            return None
+        faltan = [c for c in (columnas or []) + ([por] if por is not None else [])
+                  if c not in self.columnas_disponibles]
+        if faltan:
+            print(f"Error: Las columnas {faltan} no existen en los datos.")
+            return None
+        if columnas is None:
+            muestra = self.data if self.data is not None else next(iter(self._leer_bloques()))
+            columnas = [c for c in estadisticas.columnas_numericas(muestra) if c != por]
+        if not columnas:
+            print("No hay columnas numéricas para calcular estadísticas.")
+            return None
+        return list(columnas)
+
+    def _parcial(self, columnas, por=None, frecuencias=True, correlacion=False, tablas_rangos=None,
+                 workers=None):
+        """
+        Calcula por bloques los agregados de las columnas y los guarda por
+        conjunto de columnas hasta que cambien los datos.
+        """
+        def calcular():
+            if self.data is not None:
+                bloques = estadisticas.partir(self.data, workers=workers)
+            else:
+                bloques = self._leer_bloques()
+            return estadisticas.calcular(bloques, columnas, por, frecuencias, correlacion, tablas_rangos,
+                                         workers)
+
+        clave = ('parcial', tuple(columnas), por, frecuencias, correlacion, tablas_rangos is not None)
+        if self.data is None:
+            # En modo por bloques nada invalida la caché: se usa la versión del archivo
+            info = os.stat(self.file_path)
+            clave += (info.st_size, info.st_mtime_ns)
+        return self._consultas.obtener(clave, calcular)
+
+    def estadisticas(self, columnas=None, por=None, workers=None):
+        """
+        Resumen descriptivo (count, mean, std, min, cuartiles y max) con el
+        formato de DataFrame.describe(), calculado por bloques que se
+        reparten entre procesos. Funciona también en modo por bloques sin
+        cargar el archivo completo. Los cuartiles son exactos en columnas con
+        hasta estadisticas.MAX_VALORES_DISTINTOS valores distintos y
+        aproximados en las demás.
+
+        :param columnas: Columnas a resumir; por defecto las numéricas (las de
+                         texto con marcas como 'NAN' se convierten a número).
+        :param por: Columna de grupos (por ejemplo 'Level'); se devuelve un
+                    resumen por grupo.
+        :param workers: Número de procesos; por defecto uno solo.
+        :return: DataFrame con el resumen (con índice (grupo, columna) si se
+                 agrupa) o None.
+        """
+        columnas = self._columnas_estadisticas(columnas, por)
+        if columnas is None:
+            return None
+        parcial = self._parcial(columnas, por, workers=workers)
+        if por is None:
+            return parcial.describir()
+        grupos = sorted(parcial)
+        return pd.concat([parcial[g].describir().T for g in grupos], keys=grupos, names=[por, None])
+
+    def correlacion(self, columnas=None, metodo='pearson', workers=None):
+        """
+        Matriz de correlación de Pearson o Spearman entre columnas, con las
+        filas que tienen ambos valores de cada par (como DataFrame.corr).
+
+        Spearman usa dos pasadas: la primera cuenta los valores para conocer
+        los rangos globales y la segunda acumula Pearson sobre los rangos.
+        Los rangos se calculan con todos los valores de cada columna, así que
+        si hay faltantes puede diferir un poco de pandas, que vuelve a
+        ordenar cada par por separado. En columnas con más de
+        estadisticas.MAX_VALORES_DISTINTOS valores distintos los rangos son
+        aproximados.
+
+        :param columnas: Columnas a correlacionar; por defecto las numéricas.
+        :param metodo: 'pearson' o 'spearman'.
+        :param workers: Número de procesos; por defecto uno solo.
+        :return: DataFrame (columnas x columnas) o None.
+        """
+        if metodo not in estadisticas.METODOS:
+            print(f"Error: Método '{metodo}' no soportado. Use uno de {estadisticas.METODOS}.")
+            return None
+        columnas = self._columnas_estadisticas(columnas)
+        if columnas is None:
+            return None
+        tablas_rangos = None
+        if metodo == 'spearman':
+            tablas_rangos = self._parcial(columnas, workers=workers).rangos()
+        return self._parcial(columnas, frecuencias=False, correlacion=True, tablas_rangos=tablas_rangos,
+                             workers=workers).pearson()
+
+    def graficar_barras(self, columna_x=None, columna_y=None, ruta_salida=None):
         """
         Genera un gráfico de barras usando Seaborn, solicitando las columnas al usuario.
+
+        :param columna_x: Columna del eje X; si no se indica se solicita.
+        :param columna_y: Columna del eje Y; si no se indica se solicita.
+        :param ruta_salida: Si se indica, la figura se guarda (PNG, SVG o PDF)
+                            en lugar de mostrarse en pantalla.
+        :return: True si la figura se guardó o se mostró; None si no se pudo graficar.
         """
-        columna_x, columna_y = self.solicitar_columnas()
+        columna_x, columna_y = self._columnas_a_graficar(columna_x, columna_y)
         if columna_x and columna_y:
-            plt.figure(figsize=(10, 6))
-            sns.barplot(x=self.data[columna_x], y=self.data[columna_y])
-            plt.xlabel(columna_x)
-            plt.ylabel(columna_y)
-            plt.title(f'Gráfico de barras: {columna_y} vs {columna_x}')
-            plt.xticks(rotation=45)
-            plt.show()
+            fig = _crear_figura((10, 6), ruta_salida)
+            ax = fig.add_subplot()
+            if pd.api.types.is_numeric_dtype(self.data[columna_y]):
+                # Las barras se dibujan desde los agregados: una fila por categoría
+                agregado = self.agregar(columna_x, columna_y)
+                with perfilado.tramo('sns.barplot'):
+                    sns.barplot(x=agregado.index.astype(str), y=agregado['mean'].to_numpy(), errorbar=None, ax=ax)
+                ic = 1.96 * agregado['std'].fillna(0) / np.sqrt(agregado['count'])  # Intervalo de confianza del 95 %
+                ax.errorbar(np.arange(len(agregado)), agregado['mean'], yerr=ic, fmt='none', color='black')
+            else:
+                with perfilado.tramo('sns.barplot'):
+                    sns.barplot(x=self.data[columna_x], y=self.data[columna_y], ax=ax)
+            ax.set_xlabel(columna_x)
+            ax.set_ylabel(columna_y)
+            ax.set_title(f'Gráfico de barras: {columna_y} vs {columna_x}')
+            ax.tick_params(axis='x', rotation=45)
+            return _mostrar_o_guardar(fig, ruta_salida)
 
-    def graficar_dispersion(self):
+    def graficar_dispersion(self, columna_x=None, columna_y=None, ruta_salida=None):
         """
         Genera un gráfico de dispersión usando Seaborn, solicitando las columnas al usuario.
+
+        :param columna_x: Columna del eje X; si no se indica se solicita.
+        :param columna_y: Columna del eje Y; si no se indica se solicita.
+        :param ruta_salida: Si se indica, la figura se guarda (PNG, SVG o PDF)
+                            en lugar de mostrarse en pantalla.
+        :return: True si la figura se guardó o se mostró; None si no se pudo graficar.
         """
-        columna_x, columna_y = self.solicitar_columnas()
+        columna_x, columna_y = self._columnas_a_graficar(columna_x, columna_y)
         if columna_x and columna_y:
-            plt.figure(figsize=(10, 6))
-            sns.scatterplot(x=self.data[columna_x], y=self.data[columna_y])
-            plt.xlabel(columna_x)
-            plt.ylabel(columna_y)
-            plt.title(f'Gráfico de dispersión: {columna_y} vs {columna_x}')
-            plt.show()
-
-    def nan_counter_and_cleanup(self):
+            fig = _crear_figura((10, 6), ruta_salida)
+            ax = fig.add_subplot()
+            x, y = self.data[columna_x], self.data[columna_y]
+            numericas = pd.api.types.is_numeric_dtype(x) and pd.api.types.is_numeric_dtype(y)
+            if numericas and len(self.data) > self.max_puntos_dispersion:
+                # Con muchas filas se agrupan los puntos en celdas hexagonales
+                celdas = ax.hexbin(x, y, gridsize=60, mincnt=1, bins='log', cmap='viridis')
+                fig.colorbar(celdas, ax=ax, label='Número de filas')
+            else:
+                with perfilado.tramo('sns.scatterplot'):
+                    sns.scatterplot(x=x, y=y, ax=ax)
+            ax.set_xlabel(columna_x)
+            ax.set_ylabel(columna_y)
+            ax.set_title(f'Gráfico de dispersión: {columna_y} vs {columna_x}')
+            return _mostrar_o_guardar(fig, ruta_salida)
+
+    def mascara_nulos(self):
+        """
+        Devuelve la máscara de bits de valores faltantes (Mascara_Nulos),
+        calculándola solo la primera vez.
+        """
+        if self._mascara is None:
+            self._mascara = faltantes.Mascara_Nulos.desde(self.data)
+        return self._mascara
+
+    def reporte_nulos(self):
+        """
+        Faltantes y porcentaje por columna, y filas con algún faltante.
+        """
+        if self.data is None:
+            print("No se han cargado datos.")
+            return None
+        mascara = self.mascara_nulos()
+        reporte = mascara.reporte()
+        print(reporte)
+        print(f"Filas con algún valor faltante: {int(mascara.filas_con_nulos().sum())} de {len(mascara)}.")
+        return reporte
+
+    def filas_completas(self):
+        """
+        Filas sin valores faltantes, sin modificar los datos.
+        """
+        if self.data is None:
+            print("No se han cargado datos.")
+            return None
+        return self.data[~self.mascara_nulos().filas_con_nulos()]
+
+    def imputar_nulos(self, estrategia, columnas=None, por=None):
+        """
+        Llena los valores faltantes en los mismos datos (solo se escriben las
+        celdas vacías) y guarda lo necesario para deshacerlo.
+
+        :param estrategia: 'media', 'mediana', 'moda', 'anterior' o 'posterior'.
+        :param columnas: Columnas a llenar; por defecto las que tienen faltantes.
+        :param por: Columna de grupos, por ejemplo 'diagnosis' o 'Level'.
+        :return: Diccionario {columna: valores llenados}.
+        """
+        if self.data is None:
+            print("No se han cargado datos.")
+            return {}
+        if por is not None and por not in self.data.columns:
+            print(f"Error: La columna '{por}' no se encuentra en los datos.")
+            return {}
+        mascara = self.mascara_nulos()
+        try:
+            llenadas = faltantes.imputar(self.data, mascara, estrategia, columnas, por)
+        except (ValueError, TypeError) as e:
+            print(f"Error al imputar los valores faltantes: {e}")
+            return {}
+        if not llenadas:
+            print("No hay valores faltantes para imputar.")
+            return {}
+        self._historial.append(('imputar', llenadas, mascara))
+        self._mascara = mascara.reemplazar_columnas(self.data[list(llenadas)])
+        self._invalidar_consultas()
+        conteo = {c: len(filas) for c, filas in llenadas.items()}
+        print(f"Valores imputados ({estrategia}{' por ' + por if por else ''}):")
+        for c, n in conteo.items():
+            print(f"  {c}: {n}")
+        return conteo
+
+    def deshacer(self):
+        """
+        Deshace el último cambio (limpieza de NaN, imputación o columnas
+        derivadas) sin volver a leer el archivo.
+
+        :return: True si se deshizo un cambio.
+        """
+        if not self._historial:
+            print("No hay cambios para deshacer.")
+            return False
+        accion = self._historial.pop()
+        if accion[0] == 'eliminar':
+            _, eliminadas, pos_conservadas, pos_eliminadas, mascara, limpio = accion
+            # Se devuelven las filas a su posición original
+            orden = np.argsort(np.concatenate([pos_conservadas, pos_eliminadas]), kind='stable')
+            self.data = pd.concat([self.data, eliminadas]).iloc[orden]
+            self._limpio = limpio
+            print(f"Se recuperaron {len(eliminadas)} filas eliminadas.")
+        elif accion[0] == 'imputar':
+            _, llenadas, mascara = accion
+            faltantes.restaurar(self.data, llenadas)
+            print(f"Se deshizo la imputación de {sum(len(f) for f in llenadas.values())} valores.")
+        else:
+            _, columnas, reemplazadas, derivadas, mascara = accion
+            self.data = self.data.drop(columns=columnas)
+            for c in reemplazadas.columns:
+                self.data[c] = reemplazadas[c]
+            self._derivadas = derivadas
+            print(f"Se eliminaron las columnas derivadas: {columnas}")
+        self._mascara = mascara
+        self._invalidar_consultas()
+        return True
+
+    def nan_counter_and_cleanup(self, new_file_name=None):
+        if self.chunksize is not None:
+            self._nan_counter_por_bloques(new_file_name)
+            return
         if self.data is not None:
-            # Contar los valores NaN por columna
-            nan_counts = self.data.isna().sum()
+            # Contar los valores NaN por columna a partir de la máscara de bits
+            mascara = self.mascara_nulos()
+            nan_counts = mascara.por_columna()
             print("Valores NaN por columna:")
             print(nan_counts)
 
@@ -97,39 +696,204 @@ class Read_CSV:
             else:
                 print(f"Total de valores NaN en el DataFrame: {total_nans}")
 
-                # Limpiar las filas que contienen valores NaN
-                self.data.dropna(inplace=True)
+                # Limpiar las filas que contienen valores NaN; se guardan para poder deshacer
+                con_nan = mascara.filas_con_nulos()
+                self._historial.append(('eliminar', self.data[con_nan], np.flatnonzero(~con_nan),
+                                        np.flatnonzero(con_nan), mascara, self._limpio))
+                self.data = self.data[~con_nan]
+                self._mascara = mascara.seleccionar_filas(~con_nan)
+                self._invalidar_consultas()
                 print("Filas con valores NaN eliminadas.")
+            self._limpio = True
         else:
             print("No se han cargado datos.")
-            
+
+    def _nan_counter_por_bloques(self, new_file_name=None):
+        """
+        Cuenta los NaN y elimina las filas con NaN bloque a bloque.
+
+        Las filas limpias se escriben de forma incremental en ``new_file_name``
+        (por defecto ``<archivo>_limpio.csv``), que pasa a ser el archivo de
+        trabajo para las siguientes operaciones.
+        """
+        if not self._hay_datos():
+            print("No se han cargado datos.")
+            return
+
+        if new_file_name is None:
+            base, _ = os.path.splitext(self.file_path)
+            new_file_name = base + '_limpio.csv'
+
+        nan_counts = None
+        filas_eliminadas = 0
+        with exportar_tablas.escritura_atomica(new_file_name) as temporal, \
+                open(temporal, 'w', newline='', encoding='utf-8') as salida:
+            for i, bloque in enumerate(self._leer_bloques()):
+                conteo = bloque.isna().sum()
+                nan_counts = conteo if nan_counts is None else nan_counts + conteo
+                limpio = bloque.dropna()
+                filas_eliminadas += len(bloque) - len(limpio)
+                limpio.to_csv(salida, header=(i == 0))
+
+        if nan_counts is None:
+            print("Error: El archivo está vacío.")
+            return
+
+        print("Valores NaN por columna:")
+        print(nan_counts)
+        total_nans = nan_counts.sum()
+        if total_nans == 0:
+            print("No hay valores NaN en el DataFrame.")
+        else:
+            print(f"Total de valores NaN en el DataFrame: {total_nans}")
+            print(f"Filas con valores NaN eliminadas: {filas_eliminadas}.")
+        self.file_path = new_file_name
+        print(f"Datos limpios guardados en: {new_file_name}")
+
+    def _derivar_por_bloques(self, definiciones, new_file_name):
+        """
+        Calcula las columnas derivadas bloque a bloque y escribe cada bloque
+        en el nuevo archivo CSV a medida que se procesa.
+
+        Los puntajes z necesitan la media y la desviación de todo el archivo,
+        así que antes se hace una pasada para acumularlas.
+        """
+        zscores = [d for d in definiciones.values()
+                   if isinstance(d, columnas_derivadas.ZScore) and d.media is None]
+        if zscores:
+            for bloque in self._leer_bloques():
+                for z in zscores:
+                    z.acumular(bloque)
+        formato = exportar_tablas.formato_de(new_file_name)
+        if not formato.startswith('csv'):
+            print("En modo por bloques solo se puede escribir CSV (también .csv.gz o .csv.zst).")
+            return False
+        try:
+            with exportar_tablas.escritura_atomica(new_file_name) as temporal, open(temporal, 'wb') as salida:
+                for i, bloque in enumerate(self._leer_bloques()):
+                    columnas_derivadas.evaluar(bloque, definiciones)
+                    salida.write(exportar_tablas._serializar_csv(bloque, i == 0, False, formato))
+        except Exception as e:
+            print(f"Error al calcular las columnas derivadas: {e}")
+            return False
+        print(f"Nuevo archivo creado: {new_file_name}")
+        return True
+
+    def derivar_columnas(self, definiciones, new_file_name=None):
+        """
+        Crea varias columnas derivadas a la vez y, si se indica, guarda el
+        resultado en un nuevo CSV con una sola escritura.
+
+        Ejemplo::
+
+            lector.derivar_columnas({
+                'razon': 'MMSE / FAB',
+                'producto': 'MMSE * FAB',
+                'mmse_z': columnas_derivadas.ZScore('MMSE'),
+                'rango_mmse': columnas_derivadas.Discretizar('MMSE', [0, 9, 18, 23, 30]),
+            }, 'derivadas.csv')
+
+        :param definiciones: Diccionario {nombre: expresión de DataFrame.eval,
+                             ZScore o Discretizar}; ver columnas_derivadas.
+        :param new_file_name: Archivo de salida (opcional en memoria, obligatorio
+                              en modo por bloques). El formato sale de la
+                              extensión (ver exportar_tablas); sin ella se usa CSV.
+        :return: True si las columnas se calcularon.
+        """
+        if new_file_name is not None and exportar_tablas.formato_de(new_file_name) is None:
+            new_file_name += '.csv'
+
+        if self.chunksize is not None and self._hay_datos():
+            if new_file_name is None:
+                print("En modo por bloques se debe indicar el archivo de salida.")
+                return False
+            return self._derivar_por_bloques(definiciones, new_file_name)
+
+        if self.data is None:
+            print("No se han cargado datos.")
+            return False
+
+        # Se evalúa sobre una copia superficial para no dejar columnas a medias si hay un error
+        data = self.data.copy(deep=False)
+        try:
+            nuevas = columnas_derivadas.evaluar(data, definiciones)
+        except Exception as e:
+            print(f"Error al calcular las columnas derivadas: {e}")
+            return False
+        reemplazadas = [c for c in nuevas if c in self.data.columns]
+        self._historial.append(('derivar', [c for c in nuevas if c not in self.data.columns],
+                                self.data[reemplazadas], self._derivadas.copy(), self._mascara))
+        self.data = data
+        self._invalidar_consultas()
+        self._derivadas.update(definiciones)
+        if self._mascara is not None:
+            self._mascara = self._mascara.reemplazar_columnas(self.data[nuevas])
+
+        if new_file_name is not None:
+            if not self.exportar(new_file_name):
+                return False
+            self._salidas[new_file_name] = self.data.columns.tolist()
+        return True
+
+    def exportar(self, ruta, formato=None, particionar_por=None, workers=None):
+        """
+        Guarda los datos en CSV (opcionalmente .csv.gz o .csv.zst), Parquet o
+        Feather, en un solo archivo o particionados por una columna.
+
+        :param ruta: Archivo de salida (o carpeta si se particiona).
+        :param formato: Formato; por defecto se deduce de la extensión.
+        :param particionar_por: Columna por cuyos valores se separan los archivos
+                                (por ejemplo 'diagnosis' o 'Level').
+        :param workers: Número de procesos para serializar CSV grandes.
+        :return: True si se guardaron los datos.
+        """
+        if self.data is None:
+            print("No se han cargado datos.")
+            return False
+        try:
+            exportar_tablas.exportar(self.data, ruta, formato, particionar_por, workers=workers)
+        except (ValueError, OSError) as e:
+            print(f"Error al exportar los datos: {e}")
+            return False
+        print(f"Nuevo archivo creado: {ruta}")
+        return True
+
     def multiplicar_columnas_y_guardar(self, col1, col2, new_file_name):
+        """
+        Agrega la columna 'multiplicacion' (col1 * col2) y guarda el resultado en new_file_name.
+
+        :return: True si se calculó y guardó; False si no (el error se muestra).
+        """
         print("Columnas disponibles:", self.columnas_disponibles)
-        
+        producto = {'multiplicacion': f"`{col1}` * `{col2}`"}
+
+        if self.chunksize is not None and self._hay_datos():
+            if col1 in self.columnas_disponibles and col2 in self.columnas_disponibles:
+                # Los tipos se revisan en el primer bloque
+                bloque = next(iter(self._leer_bloques()))
+                if pd.api.types.is_numeric_dtype(bloque[col1]) and pd.api.types.is_numeric_dtype(bloque[col2]):
+                    return self.derivar_columnas(producto, new_file_name)
+                print(f"Una o ambas columnas '{col1}' o '{col2}' no son numéricas.")
+            else:
+                print(f"Una o ambas columnas '{col1}' o '{col2}' no se encuentran en los datos.")
+            return False
+
         if self.data is not None:
             # Verificar que las columnas existan en el DataFrame
             if col1 in self.data.columns and col2 in self.data.columns:
                 # Verificar que las columnas sean numéricas
                 if pd.api.types.is_numeric_dtype(self.data[col1]) and pd.api.types.is_numeric_dtype(self.data[col2]):
-                    # Crear una nueva columna como la multiplicación de col1 y col2
-                    self.data['multiplicacion'] = self.data[col1] * self.data[col2]
-
-                    # Asegurarse de que el nuevo archivo tenga la extensión .csv
-                    if not new_file_name.endswith('.csv'):
-                        new_file_name += '.csv'
-                    
-                    # Guardar el DataFrame actualizado en un nuevo archivo CSV
-                    self.data.to_csv(new_file_name, index=False)
-                    print(f"Nuevo archivo CSV creado: {new_file_name}")
-                else:
-                    print(f"Una o ambas columnas '{col1}' o '{col2}' no son numéricas.")
+                    # Crear una nueva columna como la multiplicación de col1 y col2 y guardar en un nuevo CSV
+                    return self.derivar_columnas(producto, new_file_name)
+                print(f"Una o ambas columnas '{col1}' o '{col2}' no son numéricas.")
             else:
                 print(f"Una o ambas columnas '{col1}' o '{col2}' no se encuentran en los datos.")
         else:
             print("No se han cargado datos.")
+        return False
 
 
-
+@perfilado.instrumentar
 class Read_Mat:
     """
     Clase para manipular archivos MAT.
@@ -139,15 +903,26 @@ class Read_Mat:
     los nombres de las matrices disponibles.
     """
 
-    def __init__(self, file_path):
+    def __init__(self, file_path, lazy=False, cache=None, decimar=True):
         """
         Inicializa la clase con la ruta del archivo.
 
         :param file_path: Ruta al archivo .mat que se va a cargar.
+        :param lazy: Si es True, solo se lee el encabezado y las matrices se
+                     leen bajo demanda (memmap o HDF5) al pedirlas.
+        :param cache: Instancia de Cache_Disco para reutilizar cargas previas.
+        :param decimar: Si es True, las señales largas se reducen a mínimo y
+                        máximo por píxel antes de graficarlas. Con False se
+                        grafican todas las muestras.
         """
         self.file_path = file_path
+        self.lazy = lazy
+        self.cache = cache
+        self.decimar = decimar
         self.data = None
         self.matrix_names = []  # Atributo para guardar los nombres de las matrices
+        self.matrix_info = {}  # Forma y clase de cada matriz (modo perezoso)
+        self._archivo_h5 = None
 
     def load_mat(self):
         """
@@ -155,10 +930,22 @@ class Read_Mat:
 
         Este método intenta cargar el archivo .mat especificado en la
         ruta proporcionada. Si tiene éxito, almacena los datos y los
-        nombres de las matrices disponibles.
+        nombres de las matrices disponibles. En modo perezoso solo se
+        leen los nombres y formas desde el encabezado.
         """
         try:
-            self.data = sio.loadmat(self.file_path)
+            if self.lazy:
+                self.matrix_info = mat_perezoso.leer_encabezado(self.file_path)
+                if mat_perezoso.es_mat_v73(self.file_path):
+                    self._archivo_h5 = mat_perezoso.h5py.File(self.file_path, 'r')
+                self.data = {}  # Las vistas se crean al pedir cada matriz
+            else:
+                self.data = self.cache.leer_matrices(self.file_path) if self.cache is not None else None
+                if self.data is None:
+                    with perfilado.tramo('sio.loadmat'):
+                        self.data = sio.loadmat(self.file_path)
+                    if self.cache is not None:
+                        self.cache.guardar_matrices(self.file_path, self.data)
             print("Archivo cargado correctamente.")
             self.matrix_names = self.get_matrix_names()  # Almacena los nombres de las matrices
         except FileNotFoundError:
@@ -166,27 +953,49 @@ class Read_Mat:
         except Exception as e:
             print(f"Error al cargar el archivo: {e}")
 
+    def cerrar(self):
+        """
+        Cierra el archivo HDF5 abierto en modo perezoso, si existe.
+        """
+        if self._archivo_h5 is not None:
+            self._archivo_h5.close()
+            self._archivo_h5 = None
+        if self.lazy:
+            self.data = {}
+
     def get_matrix_names(self):
         """
         Devuelve una lista con los nombres de las matrices disponibles.
 
         :return: Lista de nombres de matrices en el archivo .mat.
         """
+        if self.lazy and self.data is not None:
+            return list(self.matrix_info.keys())
         if self.data is not None:
             return [key for key in self.data.keys() if isinstance(self.data[key], np.ndarray) and key[0] != '_']
         else:
             print("No se han cargado datos.")
             return []
 
-    def get_matrix(self, name):
+    def get_matrix(self, name, indices=None):
         """
         Devuelve una matriz específica por su nombre.
 
+        En modo perezoso devuelve una vista que no lee los datos hasta que se
+        indexa. Si se pasan índices, solo se lee y devuelve esa porción.
+
         :param name: Nombre de la matriz que se desea obtener.
+        :param indices: Índices o slices a extraer (por ejemplo
+                        ``(slice(0, 2), slice(None), slice(-5, None))``).
         :return: La matriz correspondiente o None si no existe.
         """
         if self.data is not None and name in self.matrix_names:
-            return self.data[name]
+            if self.lazy and name not in self.data:
+                self.data[name] = mat_perezoso.abrir_matriz(self.file_path, name, self._archivo_h5)
+            matriz = self.data[name]
+            if indices is not None:
+                return np.asarray(matriz[indices])
+            return matriz
         else:
             print(f"Matriz '{name}' no encontrada o no se han cargado datos.")
             return None
@@ -200,7 +1009,11 @@ class Read_Mat:
         if self.matrix_names:
             print("Matrices disponibles:")
             for name in self.matrix_names:
-                print(f"- {name}")
+                if name in self.matrix_info:
+                    forma, clase = self.matrix_info[name]
+                    print(f"- {name} {forma} ({clase})")
+                else:
+                    print(f"- {name}")
         else:
             print("No hay matrices disponibles.")
 
@@ -214,34 +1027,135 @@ class Read_Mat:
         """
         return np.mean(matriz, axis=axis)
 
-    def graficar_todos(self):
+    def resumen(self, name=None):
+        """
+        Calcula en un solo recorrido todas las reducciones de una matriz EEG.
+
+        :param name: Nombre de la matriz; por defecto, la primera disponible.
+        :return: Instancia de Resumen_EEG o None si la matriz no existe.
+        """
+        if not self.matrix_names:
+            print("No hay matrices disponibles.")
+            return None
+        name = name if name is not None else self.matrix_names[0]
+        matriz = self.get_matrix(name)
+        if matriz is None:
+            return None
+        with perfilado.tramo('calcular_resumen'):  # Las reducciones np.mean / var / min / max
+            return calcular_resumen(matriz, nombre=name)
+
+    def _trazo(self, ax, y):
+        """
+        Devuelve los puntos (x, y) a graficar en el eje, decimados al ancho
+        del eje en píxeles si la decimación está activada.
+        """
+        if self.decimar:
+            return decimar_minmax(y, puntos_por_ancho(ax))
+        y = np.asarray(y)
+        return np.broadcast_to(np.arange(y.shape[-1]), y.shape), y
+
+    def iterar_epocas(self, name=None, bloque=1):
+        """
+        Recorre las épocas de una matriz en bloques, leyendo del archivo solo
+        el bloque actual cuando se usa el modo perezoso.
+
+        :param name: Nombre de la matriz; por defecto, la primera disponible.
+        :param bloque: Número de épocas por bloque.
+        :return: Generador de tuplas (índice de la primera época, bloque) con
+                 bloques de forma (canales x muestras x épocas).
+        """
+        name = name if name is not None else (self.matrix_names[0] if self.matrix_names else None)
+        matriz = self.get_matrix(name) if name is not None else None
+        if matriz is None:
+            return
+        num_epocas = matriz.shape[-1]
+        for ini in range(0, num_epocas, bloque):
+            yield ini, np.asarray(matriz[..., ini:min(ini + bloque, num_epocas)])
+
+    def ultimas_epocas(self, n, name=None):
+        """
+        Devuelve solo las últimas n épocas de una matriz.
+
+        :param n: Número de épocas.
+        :param name: Nombre de la matriz; por defecto, la primera disponible.
+        """
+        name = name if name is not None else (self.matrix_names[0] if self.matrix_names else None)
+        if name is None:
+            print("No hay matrices disponibles.")
+            return None
+        return self.get_matrix(name, (Ellipsis, slice(-n, None)))
+
+    def resumen_en_linea(self, name=None, bloque=16):
+        """
+        Calcula el mismo resumen que ``resumen`` recorriendo las épocas por
+        bloques, con memoria acotada por el tamaño de un bloque.
+
+        La media y la varianza por muestra se actualizan con el algoritmo de
+        Welford; solo los promedios por época crecen con el número de épocas.
+
+        :param name: Nombre de la matriz; por defecto, la primera disponible.
+        :param bloque: Número de épocas leídas a la vez.
+        :return: Instancia de Resumen_EEG o None si la matriz no existe.
+        """
+        name = name if name is not None else (self.matrix_names[0] if self.matrix_names else None)
+        estadistica = Estadistica_En_Linea()
+        promedio_canales, promedio_tiempo = [], []
+        forma = None
+        for _, epocas in self.iterar_epocas(name, bloque):
+            forma = epocas.shape[:2]
+            estadistica.actualizar(epocas)
+            promedio_canales.append(epocas.mean(axis=0))
+            promedio_tiempo.append(epocas.mean(axis=1))
+        if forma is None:
+            print("No hay matrices disponibles.")
+            return None
+
+        # Varianza por canal: media de las varianzas por muestra más la varianza de las medias
+        varianza = estadistica.varianza.mean(axis=1) + estadistica.media.var(axis=1)
+        return Resumen_EEG(forma + (estadistica.n,), estadistica.media,
+                           np.concatenate(promedio_canales, axis=1),
+                           np.concatenate(promedio_tiempo, axis=1), varianza,
+                           estadistica.minimo.min(axis=1), estadistica.maximo.max(axis=1), nombre=name)
+
+    def graficar_todos(self, resumen=None, ruta_salida=None):
         """
         Grafica todos los datos: la señal EEG, el promedio en el eje 0 vs tiempo
         y el promedio en el eje 1 vs épocas (con recorte a las últimas 5 épocas),
         organizados según un diseño específico.
+
+        Las gráficas se construyen a partir de un Resumen_EEG, sin volver a
+        recorrer la matriz original.
+
+        :param resumen: Resumen ya calculado (por ejemplo, un sujeto de un lote).
+                        Si no se indica se calcula para la primera matriz.
+        :param ruta_salida: Si se indica, la figura se guarda (PNG, SVG o PDF)
+                            en lugar de mostrarse en pantalla.
+        :return: True si la figura se guardó o se mostró; None si no se pudo graficar.
         """
-        if not self.matrix_names:
-            print("No hay matrices disponibles para graficar.")
-            return
+        if resumen is None:
+            if not self.matrix_names:
+                print("No hay matrices disponibles para graficar.")
+                return
+            resumen = self.resumen()
 
-        matriz_nombre = self.matrix_names[0]
-        matriz = self.get_matrix(matriz_nombre)
+        if resumen is not None:
+            matriz_nombre = resumen.nombre
+            num_canales, num_epocas = resumen.num_canales, resumen.num_epocas
 
-        if matriz is not None:
-            num_canales, num_muestras, num_epocas = matriz.shape  # Se asume que la matriz tiene 3 dimensiones
-            
             # Crear la figura y los ejes usando gridspec
-            fig = plt.figure(figsize=(15, 10))
+            fig = _crear_figura((15, 10), ruta_salida)
             gs = fig.add_gridspec(3, 3)  # Crear una cuadrícula de 3x3
 
             # 1. Gráfica de la señal EEG (canales vs tiempo, promediando sobre las épocas)
-            matriz_2d = self.reduce_to_2d(matriz, axis=2)  # Reducir a 2D promediando sobre las épocas
             ax1 = fig.add_subplot(gs[1:3, 0:2])  # Subgráfico en la posición (2, 1) ocupando las dos columnas
 
             # Desplazamiento vertical para cada canal
             offset = 5  # Ajusta el desplazamiento según sea necesario
-            for i in range(num_canales):
-                ax1.plot(matriz_2d[i, :] + (i * offset), label=f'Canal {i + 1}')  # Sumar el desplazamiento vertical
+            desplazada = resumen.promedio_epocas + offset * np.arange(num_canales)[:, np.newaxis]
+            x, y = self._trazo(ax1, desplazada)
+            lineas = ax1.plot(x.T, y.T)  # Una línea por canal en una sola llamada
+            for i, linea in enumerate(lineas):
+                linea.set_label(f'Canal {i + 1}')
             ax1.set_title(f"Señal EEG de '{matriz_nombre}' (Canales vs Tiempo)")
             ax1.set_xlabel("Muestras (Tiempo)")
             ax1.set_ylabel("Amplitud")
@@ -249,8 +1163,7 @@ class Read_Mat:
 
             # 2. Gráfico del promedio en el eje 0 vs tiempo
             ax2 = fig.add_subplot(gs[0, 2])  # Subgráfico en la posición (1, 3)
-            promedio_tiempo = np.mean(matriz, axis=0)  # Promedio a lo largo de los canales
-            ax2.plot(promedio_tiempo[:, 0], label='Promedio (Canales)', color='blue')
+            ax2.plot(*self._trazo(ax2, resumen.promedio_canales[:, 0]), label='Promedio (Canales)', color='blue')
             ax2.set_title(f"Promedio de la señal EEG de '{matriz_nombre}' vs Tiempo")
             ax2.set_xlabel("Muestras (Tiempo)")
             ax2.set_ylabel("Amplitud (Promedio)")
@@ -260,12 +1173,12 @@ class Read_Mat:
             # 3. Gráfico del promedio en el eje 1 (canales) vs últimas 5 épocas
             ax3 = fig.add_subplot(gs[2, 2])  # Subgráfico en la posición (3, 3)
             if num_epocas >= 5:
-                matriz_recortada = matriz[:, :, -5:]  # Recortar las últimas 5 épocas
-                promedio_canales = np.mean(matriz_recortada, axis=1)  # Promediar a lo largo del tiempo
-                for i in range(5):
-                    ax3.plot(promedio_canales[:, i], label=f'Época {num_epocas - 5 + i + 1}')
+                ultimas = resumen.promedio_tiempo[:, -5:]  # Promedio en el tiempo de las últimas 5 épocas
+                lineas = ax3.plot(ultimas)
+                for i, linea in enumerate(lineas):
+                    linea.set_label(f'Época {num_epocas - 5 + i + 1}')
             else:
-                ax3.plot(np.mean(matriz, axis=1), label='Promedio (Todo)', color='orange')
+                ax3.plot(resumen.promedio_tiempo, label='Promedio (Todo)', color='orange')
 
             ax3.set_title(f"Promedio de la señal EEG de '{matriz_nombre}' vs Últimas 5 Épocas")
             ax3.set_xlabel("Canales")
@@ -273,12 +1186,200 @@ class Read_Mat:
             ax3.axhline(0, color='black', linewidth=0.5, linestyle='--')
             ax3.legend(loc='upper right')
 
-            plt.tight_layout()  # Ajustar el diseño para que no se superpongan
-            plt.show()
+            with perfilado.tramo('tight_layout'):
+                fig.tight_layout()  # Ajustar el diseño para que no se superpongan
+            return _mostrar_o_guardar(fig, ruta_salida)
         else:
-            print(f"No se pudo graficar la matriz '{matriz_nombre}' porque no fue encontrada.")
+            print("No se pudo graficar la matriz porque no fue encontrada.")
     
-    def graficar_ruido(self):
+    def espectro(self, fs, name=None, nperseg=None, workers=None):
+        """
+        Calcula la densidad espectral de potencia (Welch) de cada canal y época.
+
+        :param fs: Frecuencia de muestreo en Hz.
+        :param name: Nombre de la matriz; por defecto, la primera disponible.
+        :param nperseg: Muestras por segmento de Welch.
+        :param workers: Número de hilos para las FFT.
+        :return: Tupla (frecuencias, psd) con psd de forma (canales x frecuencias x épocas),
+                 o (None, None) si la matriz no existe.
+        """
+        name = name if name is not None else (self.matrix_names[0] if self.matrix_names else None)
+        matriz = self.get_matrix(name) if name is not None else None
+        if matriz is None:
+            return None, None
+        return espectral.welch(matriz, fs, nperseg=nperseg, workers=workers)
+
+    def potencia_bandas(self, fs, name=None, bandas=None, nperseg=None, workers=None):
+        """
+        Calcula la potencia por banda (delta, theta, alfa, beta, gamma) de cada canal y época.
+
+        :param fs: Frecuencia de muestreo en Hz.
+        :param name: Nombre de la matriz; por defecto, la primera disponible.
+        :param bandas: Diccionario {nombre: (f_min, f_max)}; por defecto espectral.BANDAS.
+        :return: Diccionario {banda: potencia (canales x épocas)} o None.
+        """
+        frecuencias, psd = self.espectro(fs, name, nperseg, workers)
+        if psd is None:
+            return None
+        return espectral.potencia_bandas(frecuencias, psd, bandas)
+
+    def graficar_espectro(self, fs, name=None, nperseg=None, workers=None, ruta_salida=None):
+        """
+        Grafica el espectro de la señal EEG: la PSD de cada canal promediada
+        sobre las épocas, la potencia por banda de cada canal y la potencia
+        por banda de las últimas 5 épocas.
+
+        :param fs: Frecuencia de muestreo en Hz.
+        :param name: Nombre de la matriz; por defecto, la primera disponible.
+        :param ruta_salida: Si se indica, la figura se guarda (PNG, SVG o PDF)
+                            en lugar de mostrarse en pantalla.
+        :return: True si la figura se guardó o se mostró; None si no se pudo graficar.
+        """
+        name = name if name is not None else (self.matrix_names[0] if self.matrix_names else None)
+        frecuencias, psd = self.espectro(fs, name, nperseg, workers)
+        if psd is None:
+            print("No hay matrices disponibles para graficar.")
+            return
+        bandas = espectral.potencia_bandas(frecuencias, psd)
+        num_canales, _, num_epocas = psd.shape
+
+        fig = _crear_figura((15, 10), ruta_salida)
+        gs = fig.add_gridspec(3, 3)
+
+        # 1. PSD de cada canal promediada sobre las épocas
+        ax1 = fig.add_subplot(gs[1:3, 0:2])
+        lineas = ax1.semilogy(frecuencias, psd.mean(axis=2).T)
+        for i, linea in enumerate(lineas):
+            linea.set_label(f'Canal {i + 1}')
+        ax1.set_title(f"Densidad espectral de '{name}' (Welch)")
+        ax1.set_xlabel("Frecuencia (Hz)")
+        ax1.set_ylabel("PSD (unidades²/Hz)")
+        ax1.legend(loc='upper right')
+
+        # 2. Potencia por banda de cada canal (promedio sobre épocas)
+        ax2 = fig.add_subplot(gs[0, 2])
+        potencias = np.array([p.mean(axis=1) for p in bandas.values()])  # (bandas, canales)
+        imagen = ax2.imshow(potencias, aspect='auto', cmap='viridis')
+        ax2.set_yticks(range(len(bandas)), list(bandas.keys()))
+        ax2.set_title(f"Potencia por banda de '{name}'")
+        ax2.set_xlabel("Canales")
+        fig.colorbar(imagen, ax=ax2)
+
+        # 3. Potencia por banda (promedio sobre canales) en las últimas 5 épocas
+        ax3 = fig.add_subplot(gs[2, 2])
+        ultimas = min(5, num_epocas)
+        for banda, potencia in bandas.items():
+            ax3.plot(range(num_epocas - ultimas + 1, num_epocas + 1), potencia[:, -ultimas:].mean(axis=0),
+                     marker='o', label=banda)
+        ax3.set_title(f"Potencia por banda de '{name}' vs Últimas {ultimas} Épocas")
+        ax3.set_xlabel("Época")
+        ax3.set_ylabel("Potencia")
+        ax3.legend(loc='upper right')
+
+        with perfilado.tramo('tight_layout'):
+            fig.tight_layout()
+        return _mostrar_o_guardar(fig, ruta_salida)
+
+    def erp(self, etiquetas, name=None, recorte=erp.RECORTE, num_bootstrap=erp.NUM_BOOTSTRAP, alfa=erp.ALFA,
+            semilla=None, workers=None):
+        """
+        Calcula los promedios relacionados a eventos por condición: promedio,
+        media recortada y banda de confianza bootstrap de cada canal.
+
+        :param etiquetas: Condición de cada época (largo = número de épocas).
+        :param name: Nombre de la matriz; por defecto, la primera disponible.
+        :param recorte: Fracción de épocas que se descarta en cada extremo para la media recortada.
+        :param num_bootstrap: Número de remuestreos bootstrap.
+        :param alfa: Nivel de la banda de confianza (0.05 para el 95 %).
+        :param semilla: Semilla de los remuestreos.
+        :param workers: Número de procesos (leen la matriz desde memoria compartida).
+        :return: Instancia de erp.Resultado_ERP o None.
+        """
+        name = name if name is not None else (self.matrix_names[0] if self.matrix_names else None)
+        matriz = self.get_matrix(name) if name is not None else None
+        if matriz is None:
+            print("No hay matrices disponibles.")
+            return None
+        try:
+            return erp.calcular_erp(matriz, etiquetas, recorte, num_bootstrap, alfa, semilla, workers)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return None
+
+    def graficar_erp(self, etiquetas, canal=0, name=None, resultado=None, workers=None, ruta_salida=None):
+        """
+        Grafica el promedio de cada condición en un canal con su banda de
+        confianza bootstrap y la media recortada (línea punteada).
+
+        :param etiquetas: Condición de cada época.
+        :param canal: Canal a graficar.
+        :param resultado: Resultado_ERP ya calculado; si no se indica se calcula.
+        :param ruta_salida: Si se indica, la figura se guarda (PNG, SVG o PDF)
+                            en lugar de mostrarse en pantalla.
+        :return: True si la figura se guardó o se mostró; None si no se pudo graficar.
+        """
+        resultado = resultado if resultado is not None else self.erp(etiquetas, name, workers=workers)
+        if resultado is None:
+            return
+        if not 0 <= canal < resultado.media.shape[1]:
+            print(f"El canal debe estar entre 0 y {resultado.media.shape[1] - 1}.")
+            return
+
+        fig = _crear_figura((12, 6), ruta_salida)
+        ax = fig.add_subplot()
+        for k, condicion in enumerate(resultado.condiciones):
+            linea, = ax.plot(*self._trazo(ax, resultado.media[k, canal]),
+                             label=f"{condicion} (n = {resultado.num_epocas[k]})")
+            # Cada borde de la banda se decima por separado; fill_between necesita las mismas x
+            x_inf, inferior = self._trazo(ax, resultado.ic_inferior[k, canal])
+            x_sup, superior = self._trazo(ax, resultado.ic_superior[k, canal])
+            x = np.union1d(x_inf, x_sup)
+            ax.fill_between(x, np.interp(x, x_inf, inferior), np.interp(x, x_sup, superior),
+                            color=linea.get_color(), alpha=0.25, linewidth=0)
+            ax.plot(*self._trazo(ax, resultado.media_recortada[k, canal]), color=linea.get_color(), linestyle=':')
+        ax.axhline(0, color='black', linewidth=0.5, linestyle='--')
+        ax.set_title(f"ERP del canal {canal + 1} por condición "
+                     f"(banda del {100 * (1 - resultado.alfa):.0f} %, bootstrap)")
+        ax.set_xlabel("Muestras (Tiempo)")
+        ax.set_ylabel("Amplitud")
+        ax.legend(loc='upper right')
+        with perfilado.tramo('tight_layout'):
+            fig.tight_layout()
+        return _mostrar_o_guardar(fig, ruta_salida)
+
+    def _solicitar_canales(self, num_canales):
+        """
+        Solicita al usuario 2 canales diferentes y 1 canal para el ruido.
+        """
+        canal1 = int(input("Ingrese el número del canal 1 (0 a {}): ".format(num_canales - 1)))
+        canal2 = int(input("Ingrese el número del canal 2 (0 a {}): ".format(num_canales - 1)))
+        canal_ruido = int(input("Ingrese el número del canal para agregar ruido (0 a {}): ".format(num_canales - 1)))
+        return canal1, canal2, canal_ruido
+
+    def operaciones_canales(self, name=None, semilla=None):
+        """
+        Devuelve un objeto Operaciones_Canales sobre una matriz del archivo.
+
+        :param name: Nombre de la matriz; por defecto, la primera disponible.
+        :param semilla: Semilla o Generator para el ruido.
+        """
+        name = name if name is not None else (self.matrix_names[0] if self.matrix_names else None)
+        matriz = self.get_matrix(name) if name is not None else None
+        return Operaciones_Canales(matriz, semilla) if matriz is not None else None
+
+    def graficar_ruido(self, canal1=None, canal2=None, canal_ruido=None, ruta_salida=None, semilla=None):
+        """
+        Grafica la resta y la multiplicación entre dos canales y un canal con
+        ruido gaussiano agregado, para la primera época.
+
+        :param canal1: Primer canal; si no se indican los canales se solicitan.
+        :param canal2: Segundo canal.
+        :param canal_ruido: Canal al que se agrega ruido.
+        :param semilla: Semilla del ruido, para obtener gráficas reproducibles.
+        :param ruta_salida: Si se indica, la figura se guarda (PNG, SVG o PDF)
+                            en lugar de mostrarse en pantalla.
+        :return: True si la figura se guardó o se mostró; None si no se pudo graficar.
+        """
         if not self.matrix_names:
             print("No hay matrices disponibles para graficar.")
             return
@@ -291,9 +1392,8 @@ class Read_Mat:
 
             # Solicitar 2 canales diferentes y 1 canal para el ruido
             try:
-                canal1 = int(input("Ingrese el número del canal 1 (0 a {}): ".format(num_canales - 1)))
-                canal2 = int(input("Ingrese el número del canal 2 (0 a {}): ".format(num_canales - 1)))
-                canal_ruido = int(input("Ingrese el número del canal para agregar ruido (0 a {}): ".format(num_canales - 1)))
+                if None in (canal1, canal2, canal_ruido):
+                    canal1, canal2, canal_ruido = self._solicitar_canales(num_canales)
 
                 if not all(0 <= canal < num_canales for canal in [canal1, canal2, canal_ruido]):
                     print("Los números de canal deben estar dentro del rango válido.")
@@ -303,19 +1403,19 @@ class Read_Mat:
                 print("Entrada no válida. Asegúrese de ingresar números enteros.")
                 return
 
-            # Realizar operaciones entre los canales
-            resta = matriz[canal1, :, :] - matriz[canal2, :, :]
-            multiplicacion = matriz[canal1, :, :] * matriz[canal2, :, :]
-            ruido = np.random.normal(0, 1, size=matriz[canal_ruido, :, :].shape)  # Agregar ruido al canal seleccionado
-            canal_con_ruido = matriz[canal_ruido, :, :] + ruido
+            # Realizar operaciones entre los canales, solo para la época graficada
+            operaciones = Operaciones_Canales(matriz, semilla)
+            resta = operaciones.resta([(canal1, canal2)], epocas=0)[0]
+            multiplicacion = operaciones.multiplicacion([(canal1, canal2)], epocas=0)[0]
+            canal_con_ruido = operaciones.con_ruido([canal_ruido], [1.0], epocas=0)[0, 0]  # Agregar ruido al canal seleccionado
 
             # Crear la figura y los ejes usando gridspec
-            fig = plt.figure(figsize=(15, 10))
+            fig = _crear_figura((15, 10), ruta_salida)
             gs = fig.add_gridspec(3, 2)  # Crear una cuadrícula de 3 filas y 2 columnas
 
             # 1. Gráfica del canal con ruido ocupando las dos filas de la izquierda
             ax3 = fig.add_subplot(gs[0:2, 0])  # Subgráfico en las dos filas de la primera columna
-            ax3.plot(canal_con_ruido[:, 0], label='Canal con Ruido', color='blue')
+            ax3.plot(*self._trazo(ax3, canal_con_ruido[:, 0]), label='Canal con Ruido', color='blue')
             ax3.set_title(f"Canal {canal_ruido + 1} con Ruido de '{matriz_nombre}' vs Tiempo")
             ax3.set_xlabel("Tiempo (segundos)")
             ax3.set_ylabel("Amplitud (Canal + Ruido)")
@@ -324,7 +1424,7 @@ class Read_Mat:
 
             # 2. Gráfica de la multiplicación vs tiempo (en la primera fila de la derecha)
             ax2 = fig.add_subplot(gs[0, 1])  # Subgráfico en la primera fila de la segunda columna
-            ax2.plot(multiplicacion[:, 0], label='Multiplicación', color='green')
+            ax2.plot(*self._trazo(ax2, multiplicacion[:, 0]), label='Multiplicación', color='green')
             ax2.set_title(f"Multiplicación entre Canales de '{matriz_nombre}' vs Tiempo")
             ax2.set_xlabel("Tiempo (segundos)")
             ax2.set_ylabel("Amplitud (Multiplicación)")
@@ -333,14 +1433,15 @@ class Read_Mat:
 
             # 3. Gráfica de la resta vs tiempo (en la segunda fila de la derecha)
             ax1 = fig.add_subplot(gs[1, 1])  # Subgráfico en la segunda fila de la segunda columna
-            ax1.plot(resta[:, 0], label='Resta', color='red')
+            ax1.plot(*self._trazo(ax1, resta[:, 0]), label='Resta', color='red')
             ax1.set_title(f"Resta entre Canales de '{matriz_nombre}' vs Tiempo")
             ax1.set_xlabel("Tiempo (segundos)")
             ax1.set_ylabel("Amplitud (Resta)")
             ax1.axhline(0, color='black', linewidth=0.5, linestyle='--')
             ax1.legend(loc='upper right')
 
-            plt.tight_layout()  # Ajustar el diseño para que no se superpongan
-            plt.show()
+            with perfilado.tramo('tight_layout'):
+                fig.tight_layout()  # Ajustar el diseño para que no se superpongan
+            return _mostrar_o_guardar(fig, ruta_salida)
         else:
             print(f"No se pudo graficar la matriz '{matriz_nombre}' porque no fue encontrada.")
\ No newline at end of file
@@ -0,0 +1,63 @@
+"""
+Cliente del servidor de sesión (servidor.py).
+
+Solo usa la biblioteca estándar: importarlo no carga pandas, matplotlib
+ni los lectores de datos.
+
+Cada petición lleva la clave de la sesión que el servidor muestra al
+iniciar; por defecto se lee del archivo que el servidor deja en la carpeta
+de caché (solo legible por el usuario).
+
+Uso:
+    from cliente import enviar
+    enviar('nan', archivo='MMSE 1.csv')
+    enviar('multiplicar', archivo='MMSE 1.csv', col1='MMSE', col2='FAB', salida='otro.csv')
+    enviar('derivar', archivo='MMSE 1.csv', definiciones=['razon = MMSE / FAB', 'mmse_z = zscore(MMSE)'])
+    enviar('correlacion', archivo='cancer patient data sets.csv', metodo='spearman')
+"""
+import json
+import os
+import urllib.error
+import urllib.request
+
+PUERTO = 8765
+
+# Encabezado HTTP con la clave de la sesión
+ENCABEZADO_CLAVE = 'X-Clave-Sesion'
+
+
+def archivo_clave(puerto=PUERTO):
+    """
+    Archivo donde el servidor guarda la clave de la sesión de un puerto.
+    """
+    return os.path.join(os.path.expanduser('~'), '.cache', 'parcial2_info2', f'servidor_{puerto}.clave')
+
+
+def leer_clave(puerto=PUERTO):
+    with open(archivo_clave(puerto), encoding='ascii') as f:
+        return f.read().strip()
+
+
+def enviar(operacion, puerto=PUERTO, clave=None, **params):
+    """
+    Envía una operación al servidor de sesión y devuelve el resultado.
+
+    :param operacion: Nombre de la operación (columnas, matrices, nan,
+                      multiplicar, derivar, exportar, recargar, resumen, figura, estado, descargar).
+    :param puerto: Puerto del servidor.
+    :param clave: Clave de la sesión; por defecto la que guardó el servidor.
+    :param params: Parámetros de la operación. Las rutas 'salida' son
+                   relativas a la carpeta de salida del servidor.
+    """
+    datos = json.dumps({'operacion': operacion, **params}).encode('utf-8')
+    peticion = urllib.request.Request(f'http://127.0.0.1:{puerto}', data=datos,
+                                      headers={'Content-Type': 'application/json',
+                                               ENCABEZADO_CLAVE: clave or leer_clave(puerto)})
+    try:
+        with urllib.request.urlopen(peticion) as respuesta:
+            cuerpo = json.loads(respuesta.read())
+    except urllib.error.HTTPError as e:
+        cuerpo = json.loads(e.read())
+    if not cuerpo['ok']:
+        raise RuntimeError(cuerpo['error'])
+    return cuerpo['resultado']
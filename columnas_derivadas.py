@@ -0,0 +1,146 @@
+"""
+Columnas derivadas a partir de expresiones.
+
+Las definiciones son un diccionario {nombre: definición} donde cada
+definición es:
+
+- Una expresión de DataFrame.eval, por ejemplo 'MMSE / FAB' o
+  '(`Air Pollution` + Smoking) / 2' (los nombres con espacios van entre
+  comillas invertidas). Puede usar columnas definidas antes.
+- Un objeto ZScore o Discretizar, para lo que eval no puede expresar.
+
+Las expresiones seguidas se evalúan juntas en una sola llamada a
+DataFrame.eval; con numexpr instalado cada una se calcula en una pasada,
+sin arreglos intermedios.
+"""
+import numpy as np
+
+import tipos_optimos
+from importacion_perezosa import importar_perezoso
+from resumen_eeg import Estadistica_En_Linea
+
+pd = importar_perezoso('pandas')
+
+
+class ZScore:
+    """
+    Puntaje z de una columna: (x - media) / desviación estándar.
+
+    La media y la desviación se fijan la primera vez que se calcula (o se
+    acumulan bloque a bloque con acumular), de modo que las filas que se
+    agreguen después se normalizan con las mismas estadísticas.
+    """
+
+    def __init__(self, columna):
+        self.columna = columna
+        self.reiniciar()
+
+    def reiniciar(self):
+        """
+        Olvida las estadísticas para volver a calcularlas.
+        """
+        self.media = None
+        self.desviacion = None
+        self._estadistica = Estadistica_En_Linea()
+
+    def acumular(self, data):
+        """
+        Suma un bloque de filas a las estadísticas (para el modo por bloques).
+        Los bloques se unen con Welford/Chan, que no pierde precisión cuando
+        la media es grande respecto de la dispersión.
+        """
+        valores = data[self.columna].dropna().to_numpy(dtype=np.float64)
+        e = self._estadistica
+        e.actualizar(valores.reshape(1, 1, -1))  # Un canal y una muestra; los valores son las "épocas"
+        self.media = e.media.item() if e.n else np.nan
+        self.desviacion = np.sqrt(e.m2.item() / (e.n - 1)) if e.n > 1 else np.nan
+
+    def __call__(self, data):
+        if self.media is None:
+            # Con la columna completa en memoria basta con pandas
+            self.media = data[self.columna].mean()
+            self.desviacion = data[self.columna].std()
+        return (data[self.columna] - self.media) / self.desviacion
+
+    def __repr__(self):
+        return f"ZScore({self.columna!r})"
+
+
+class Discretizar:
+    """
+    Asigna cada valor de una columna a un intervalo (pd.cut), por ejemplo
+    rangos de puntaje del MMSE.
+    """
+
+    def __init__(self, columna, bordes, etiquetas=None):
+        """
+        :param columna: Columna a discretizar.
+        :param bordes: Bordes de los intervalos (cerrados a la derecha).
+        :param etiquetas: Nombre de cada intervalo; por defecto el intervalo.
+        """
+        self.columna = columna
+        self.bordes = list(bordes)
+        self.etiquetas = etiquetas
+
+    def __call__(self, data):
+        return pd.cut(data[self.columna], self.bordes, labels=self.etiquetas)
+
+    def __repr__(self):
+        return f"Discretizar({self.columna!r}, {self.bordes})"
+
+
+def evaluar(data, definiciones):
+    """
+    Agrega al DataFrame (en el mismo objeto) las columnas definidas.
+
+    :param data: DataFrame al que se agregan las columnas.
+    :param definiciones: Diccionario {nombre: expresión u objeto invocable}.
+    :return: Lista con los nombres de las columnas creadas.
+    """
+    pendientes = []
+
+    def evaluar_pendientes():
+        if pendientes:
+            texto = '\n'.join(pendientes)
+            # Los enteros compactos (tipos_optimos) desbordarían en silencio:
+            # se usan ampliados a 64 bits, sin cambiar las columnas de data
+            asignadas = {linea.split('`')[1] for linea in pendientes}
+            anchas = {c: data[c].astype(tipos_optimos.tipo_ancho(data[c].dtype)) for c in data.columns
+                      if c not in asignadas and tipos_optimos.es_entero_angosto(data[c].dtype) and str(c) in texto}
+            # Una sola llamada para todas las expresiones seguidas
+            data.eval(texto, inplace=True, resolvers=(anchas,) if anchas else ())
+            pendientes.clear()
+
+    for nombre, definicion in definiciones.items():
+        if isinstance(definicion, str):
+            pendientes.append(f"`{nombre}` = {definicion}")
+        else:
+            evaluar_pendientes()
+            data[nombre] = definicion(data)
+    evaluar_pendientes()
+    return list(definiciones)
+
+
+def parsear_definiciones(lineas):
+    """
+    Convierte líneas 'nombre = expresión' en un diccionario de definiciones.
+
+    Las formas 'zscore(columna)' y 'discretizar(columna, b1, b2, ...)' se
+    convierten en ZScore y Discretizar.
+    """
+    definiciones = {}
+    for linea in lineas:
+        if not linea.strip():
+            continue
+        if '=' not in linea:
+            raise ValueError(f"La definición '{linea}' debe tener la forma 'nombre = expresión'.")
+        nombre, expresion = (parte.strip() for parte in linea.split('=', 1))
+        funcion, _, argumentos = expresion.partition('(')
+        argumentos = [a.strip().strip('`') for a in argumentos.rstrip(')').split(',')]
+        if funcion.strip() == 'zscore':
+            definiciones[nombre] = ZScore(argumentos[0])
+        elif funcion.strip() == 'discretizar':
+            definiciones[nombre] = Discretizar(argumentos[0], [float(b) for b in argumentos[1:]])
+        else:
+            definiciones[nombre] = expresion
+    return definiciones
@@ -0,0 +1,122 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from importacion_perezosa import importar_perezoso
+
+pd = importar_perezoso('pandas')
+
+# Número máximo de resultados de consultas que se guardan (LRU)
+MAX_CONSULTAS = 128
+
+
+class Indice:
+    """
+    Índice secundario de una columna: las posiciones de las filas ordenadas
+    por valor y el desplazamiento donde empieza cada valor distinto.
+
+    Con él, las filas de un valor (o de un rango de valores) se obtienen con
+    un corte del arreglo de posiciones en lugar de comparar toda la columna.
+    """
+
+    def __init__(self, serie):
+        """
+        :param serie: Columna a indexar; los faltantes no se indexan.
+        """
+        codigos, self.valores = pd.factorize(serie, sort=True, use_na_sentinel=True)
+        self.nombre = serie.name
+        self.codigos = codigos
+        self.orden = np.argsort(codigos, kind='stable')
+        conteos = np.bincount(codigos[codigos >= 0], minlength=len(self.valores))
+        inicio_validos = int(np.count_nonzero(codigos < 0))  # Los faltantes (-1) quedan al inicio
+        self.desplazamientos = np.concatenate([[0], np.cumsum(conteos)]) + inicio_validos
+        self._codigo = {v: k for k, v in enumerate(self.valores)}
+
+    def __len__(self):
+        return len(self.codigos)
+
+    def _tramos(self, codigos):
+        partes = [self.orden[self.desplazamientos[k]:self.desplazamientos[k + 1]] for k in codigos]
+        if not partes:
+            return np.empty(0, dtype=np.intp)
+        # Se devuelven en el orden original de las filas
+        return np.sort(np.concatenate(partes))
+
+    def posiciones(self, valores):
+        """
+        Posiciones de las filas cuyo valor está en ``valores``.
+        """
+        return self._tramos([self._codigo[v] for v in valores if v in self._codigo])
+
+    def entre(self, minimo, maximo):
+        """
+        Posiciones de las filas con minimo <= valor <= maximo (columnas ordenables).
+        """
+        ini = np.searchsorted(self.valores, minimo, side='left')
+        fin = np.searchsorted(self.valores, maximo, side='right')
+        if ini >= fin:
+            return np.empty(0, dtype=np.intp)
+        return np.sort(self.orden[self.desplazamientos[ini]:self.desplazamientos[fin]])
+
+
+def agrupar(indice, valores):
+    """
+    Media, conteo y desviación estándar de ``valores`` para cada grupo del
+    índice, con np.bincount en lugar de recorrer los grupos.
+
+    :param indice: Indice de la columna de grupos.
+    :param valores: Columna numérica (Serie) alineada con el índice.
+    :return: DataFrame con columnas 'mean', 'count' y 'std' indexado por grupo.
+    """
+    y = valores.to_numpy(dtype=np.float64, na_value=np.nan)
+    validos = (indice.codigos >= 0) & ~np.isnan(y)
+    codigos, y = indice.codigos[validos], y[validos]
+    num_grupos = len(indice.valores)
+    conteo = np.bincount(codigos, minlength=num_grupos)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = np.bincount(codigos, weights=y, minlength=num_grupos) / conteo
+        desviacion = y - media[codigos]
+        varianza = np.bincount(codigos, weights=desviacion * desviacion, minlength=num_grupos) / (conteo - 1)
+    varianza[conteo < 2] = np.nan
+    resultado = pd.DataFrame({'mean': media, 'count': conteo, 'std': np.sqrt(varianza)},
+                             index=pd.Index(indice.valores, name=indice.nombre))
+    # Igual que groupby(observed=True): solo los grupos con alguna fila
+    return resultado[np.bincount(indice.codigos[indice.codigos >= 0], minlength=num_grupos) > 0]
+
+
+class Cache_Consultas:
+    """
+    Resultados de consultas ya calculadas, con desalojo LRU.
+    """
+
+    def __init__(self, maximo=MAX_CONSULTAS):
+        self.maximo = maximo
+        self.resultados = OrderedDict()
+
+    def obtener(self, clave, calcular):
+        if clave in self.resultados:
+            self.resultados.move_to_end(clave)
+            return self.resultados[clave]
+        resultado = calcular()
+        self.resultados[clave] = resultado
+        if len(self.resultados) > self.maximo:
+            self.resultados.popitem(last=False)
+        return resultado
+
+    def limpiar(self):
+        self.resultados.clear()
+
+
+def clave_condiciones(condiciones):
+    """
+    Convierte las condiciones de un filtro en una clave que se puede guardar.
+    """
+    clave = []
+    for columna, condicion in sorted(condiciones.items(), key=lambda par: str(par[0])):
+        if isinstance(condicion, tuple):
+            clave.append((columna, 'entre', condicion))
+        elif isinstance(condicion, (list, set, frozenset)):
+            clave.append((columna, 'en', tuple(sorted(condicion, key=str))))
+        else:
+            clave.append((columna, 'igual', condicion))
+    return tuple(clave)
@@ -0,0 +1,49 @@
+import numpy as np
+
+
+def puntos_por_ancho(ax):
+    """
+    Número de columnas de píxeles que ocupa un eje de la figura.
+
+    :param ax: Eje de matplotlib.
+    :return: Ancho del eje en píxeles (al menos 1).
+    """
+    return max(1, int(ax.get_window_extent().width))
+
+
+def decimar_minmax(y, num_buckets):
+    """
+    Reduce una o varias señales conservando su envolvente visual.
+
+    La señal se divide en num_buckets tramos y de cada uno se conservan el
+    mínimo y el máximo, en el orden en que aparecen. Con un tramo por píxel
+    la gráfica resultante es visualmente igual a la original.
+
+    :param y: Señal 1D o matriz 2D (una señal por fila).
+    :param num_buckets: Número de tramos (normalmente el ancho en píxeles).
+    :return: Tupla (x, y) con los índices de muestra y los valores conservados,
+             con la misma cantidad de dimensiones que la entrada.
+    """
+    y = np.asarray(y)
+    n = y.shape[-1]
+    if n <= 2 * num_buckets:
+        x = np.broadcast_to(np.arange(n), y.shape)
+        return x, y
+
+    tam = -(-n // num_buckets)  # Muestras por tramo (redondeo hacia arriba)
+    num_tramos = -(-n // tam)
+    relleno = num_tramos * tam - n
+    if relleno:
+        # Se repite el último valor: no altera el mínimo ni el máximo del tramo
+        y_relleno = np.pad(y, [(0, 0)] * (y.ndim - 1) + [(0, relleno)], mode='edge')
+    else:
+        y_relleno = y
+    tramos = y_relleno.reshape(y.shape[:-1] + (num_tramos, tam))
+
+    i_min = tramos.argmin(axis=-1)
+    i_max = tramos.argmax(axis=-1)
+    # Se ordenan los dos puntos de cada tramo según su posición en el tiempo
+    indices = np.stack([np.minimum(i_min, i_max), np.maximum(i_min, i_max)], axis=-1)
+    indices = indices + (np.arange(num_tramos) * tam)[:, np.newaxis]
+    indices = np.minimum(indices.reshape(y.shape[:-1] + (2 * num_tramos,)), n - 1)
+    return indices, np.take_along_axis(y, indices, axis=-1)
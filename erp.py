@@ -0,0 +1,171 @@
+"""
+Potenciales relacionados a eventos (ERP): promedios por condición.
+
+Cada época de la matriz EEG (canales x muestras x épocas) tiene una
+etiqueta de condición. Para cada condición y canal se calcula el promedio,
+la media recortada y la banda de confianza bootstrap del promedio.
+
+Con varios procesos la matriz se copia una sola vez a memoria compartida
+(multiprocessing.shared_memory); cada proceso la lee desde ahí sin recibir
+copias y escribe sus canales en otra matriz compartida de resultados.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Fracción de épocas que se descarta en cada extremo para la media recortada
+RECORTE = 0.1
+NUM_BOOTSTRAP = 1000
+ALFA = 0.05
+
+# Orden de las estadísticas en la matriz de resultados
+ESTADISTICAS = ('media', 'media_recortada', 'ic_inferior', 'ic_superior')
+
+
+class Resultado_ERP:
+    """
+    Estadísticas por condición de una matriz EEG.
+
+    Atributos:
+        condiciones: Etiquetas de las condiciones, ordenadas.
+        num_epocas: Épocas de cada condición.
+        media, media_recortada: Promedios (condiciones x canales x muestras).
+        ic_inferior, ic_superior: Banda de confianza bootstrap del promedio
+                                  al nivel 1 - alfa (misma forma).
+    """
+
+    def __init__(self, condiciones, num_epocas, estadisticas, recorte, alfa, num_bootstrap):
+        self.condiciones = list(condiciones)
+        self.num_epocas = list(num_epocas)
+        self.media, self.media_recortada, self.ic_inferior, self.ic_superior = estadisticas
+        self.recorte = recorte
+        self.alfa = alfa
+        self.num_bootstrap = num_bootstrap
+
+    def condicion(self, condicion):
+        """
+        Devuelve un diccionario con las estadísticas (canales x muestras) de una condición.
+        """
+        k = self.condiciones.index(condicion)
+        return {nombre: getattr(self, nombre)[k] for nombre in ESTADISTICAS}
+
+
+def media_recortada(x, recorte, axis=-1):
+    """
+    Media descartando int(recorte * n) valores en cada extremo (como scipy.stats.trim_mean).
+    """
+    n = x.shape[axis]
+    k = int(recorte * n)
+    if k == 0:
+        return x.mean(axis=axis)
+    ordenado = np.sort(x, axis=axis)
+    return np.take(ordenado, np.arange(k, n - k), axis=axis).mean(axis=axis)
+
+
+def _estadisticas_canales(x, grupos, pesos, recorte, alfa, salida):
+    """
+    Calcula las estadísticas de un bloque de canales.
+
+    :param x: Canales (canales x muestras x épocas).
+    :param grupos: Posiciones de las épocas de cada condición.
+    :param pesos: Para cada condición, cuántas veces entra cada época en cada
+                  remuestreo bootstrap (remuestreos x épocas). Son los mismos
+                  para todos los canales.
+    :param salida: Matriz (estadísticas x condiciones x canales x muestras).
+    """
+    for k, (epocas, w) in enumerate(zip(grupos, pesos)):
+        datos = np.asarray(x[:, :, epocas], dtype=np.float64)
+        salida[0, k] = datos.mean(axis=2)
+        salida[1, k] = media_recortada(datos, recorte, axis=2)
+        for c in range(datos.shape[0]):
+            # Los promedios de todos los remuestreos en un solo producto de matrices
+            medias = datos[c] @ w.T / len(epocas)  # (muestras x remuestreos)
+            salida[2:4, k, c] = np.quantile(medias, [alfa / 2, 1 - alfa / 2], axis=1)
+
+
+_compartido = {}  # Estado de cada proceso trabajador (ver _iniciar_proceso)
+
+
+def _iniciar_proceso(nombre_entrada, forma, nombre_salida, forma_salida, grupos, pesos, recorte, alfa):
+    # Los trabajadores solo se conectan; el proceso principal crea y libera la memoria
+    entrada = shared_memory.SharedMemory(name=nombre_entrada)
+    salida = shared_memory.SharedMemory(name=nombre_salida)
+    _compartido.update(
+        memorias=(entrada, salida),
+        x=np.ndarray(forma, dtype=np.float64, buffer=entrada.buf),
+        salida=np.ndarray(forma_salida, dtype=np.float64, buffer=salida.buf),
+        argumentos=(grupos, pesos, recorte, alfa),
+    )
+
+
+def _calcular_canales(ini, fin):
+    grupos, pesos, recorte, alfa = _compartido['argumentos']
+    _estadisticas_canales(_compartido['x'][ini:fin], grupos, pesos, recorte, alfa,
+                          _compartido['salida'][:, :, ini:fin])
+
+
+def calcular_erp(matriz, etiquetas, recorte=RECORTE, num_bootstrap=NUM_BOOTSTRAP, alfa=ALFA,
+                 semilla=None, workers=None):
+    """
+    Promedio, media recortada y banda bootstrap por condición y canal.
+
+    Los canales se reparten entre procesos que leen la matriz desde memoria
+    compartida. Los remuestreos bootstrap se sortean una vez por condición,
+    así el resultado no depende del número de procesos.
+
+    :param matriz: Matriz EEG (canales x muestras x épocas), también memmap o vista perezosa.
+    :param etiquetas: Condición de cada época (largo = número de épocas).
+    :param recorte: Fracción que se descarta en cada extremo para la media recortada.
+    :param num_bootstrap: Número de remuestreos bootstrap.
+    :param alfa: La banda cubre el 100 * (1 - alfa) % central de los promedios remuestreados.
+    :param semilla: Semilla de los remuestreos.
+    :param workers: Número de procesos; por defecto el número de CPUs.
+    :return: Resultado_ERP.
+    """
+    num_canales, num_muestras, num_epocas = matriz.shape
+    etiquetas = np.asarray(etiquetas)
+    if etiquetas.shape != (num_epocas,):
+        raise ValueError(f"Se esperaban {num_epocas} etiquetas (una por época) y hay {etiquetas.size}.")
+    if not 0 <= recorte < 0.5:
+        raise ValueError("El recorte debe estar entre 0 y 0.5.")
+    condiciones = np.unique(etiquetas)
+    grupos = [np.flatnonzero(etiquetas == c) for c in condiciones]
+    rng = np.random.default_rng(semilla)
+    pesos = [rng.multinomial(len(g), np.full(len(g), 1 / len(g)), size=num_bootstrap).astype(np.float64)
+             for g in grupos]
+    forma_salida = (len(ESTADISTICAS), len(condiciones), num_canales, num_muestras)
+
+    workers = min(workers or os.cpu_count() or 1, num_canales)
+    if workers == 1:
+        salida = np.empty(forma_salida)
+        _estadisticas_canales(matriz, grupos, pesos, recorte, alfa, salida)
+    else:
+        salida = _calcular_en_procesos(matriz, forma_salida, grupos, pesos, recorte, alfa, workers)
+    return Resultado_ERP(condiciones.tolist(), [len(g) for g in grupos], salida, recorte, alfa, num_bootstrap)
+
+
+def _calcular_en_procesos(matriz, forma_salida, grupos, pesos, recorte, alfa, workers):
+    forma = matriz.shape
+    entrada = shared_memory.SharedMemory(create=True, size=int(np.prod(forma)) * 8)
+    resultados = shared_memory.SharedMemory(create=True, size=int(np.prod(forma_salida)) * 8)
+    x = None
+    try:
+        x = np.ndarray(forma, dtype=np.float64, buffer=entrada.buf)
+        for c in range(forma[0]):
+            x[c:c + 1] = matriz[c:c + 1]  # Canal por canal, también desde un memmap o archivo v7.3
+        tam = -(-forma[0] // workers)
+        inicios = list(range(0, forma[0], tam))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_proceso,
+                                 initargs=(entrada.name, forma, resultados.name, forma_salida,
+                                           grupos, pesos, recorte, alfa)) as pool:
+            list(pool.map(_calcular_canales, inicios, [min(i + tam, forma[0]) for i in inicios]))
+        salida = np.ndarray(forma_salida, dtype=np.float64, buffer=resultados.buf).copy()
+    finally:
+        del x  # La memoria no se puede cerrar mientras haya arreglos que la usen
+        entrada.close()
+        entrada.unlink()
+        resultados.close()
+        resultados.unlink()
+    return salida
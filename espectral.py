@@ -0,0 +1,103 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+from importacion_perezosa import importar_perezoso
+
+fft = importar_perezoso('scipy.fft')
+
+# Bandas clásicas de EEG en Hz
+BANDAS = {
+    'delta': (1.0, 4.0),
+    'theta': (4.0, 8.0),
+    'alpha': (8.0, 13.0),
+    'beta': (13.0, 30.0),
+    'gamma': (30.0, 45.0),
+}
+
+
+@lru_cache(maxsize=32)
+def ventana_hann(nperseg):
+    """
+    Ventana de Hann periódica (igual a la que usa scipy.signal.welch).
+
+    Se guarda en caché para no recalcularla en cada llamada.
+    """
+    ventana = 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(nperseg) / nperseg)
+    ventana.flags.writeable = False
+    return ventana
+
+
+def _welch_bloque(bloque, fs, nperseg, paso):
+    """
+    PSD de Welch de un bloque (canales x muestras x épocas) en una sola
+    llamada vectorizada a la FFT.
+
+    :return: Arreglo (canales x frecuencias x épocas).
+    """
+    x = np.moveaxis(np.asarray(bloque, dtype=np.float64), 1, -1)  # (canales, épocas, muestras)
+    segmentos = np.lib.stride_tricks.sliding_window_view(x, nperseg, axis=-1)[..., ::paso, :]
+    ventana = ventana_hann(nperseg)
+    segmentos = (segmentos - segmentos.mean(axis=-1, keepdims=True)) * ventana
+    # scipy.fft guarda internamente los planes de la FFT entre llamadas y libera el GIL
+    espectro = fft.rfft(segmentos, axis=-1)
+    psd = (espectro.real ** 2 + espectro.imag ** 2).mean(axis=-2)
+    psd /= fs * (ventana ** 2).sum()
+    if nperseg % 2:
+        psd[..., 1:] *= 2
+    else:
+        psd[..., 1:-1] *= 2
+    return np.moveaxis(psd, -1, 1)
+
+
+def welch(matriz, fs, nperseg=None, solapamiento=0.5, workers=None):
+    """
+    Densidad espectral de potencia de Welch para cada canal y época.
+
+    Los canales se reparten entre hilos; cada hilo calcula las FFT de todos
+    sus segmentos y épocas a la vez.
+
+    :param matriz: Matriz EEG (canales x muestras x épocas), también memmap o vista perezosa.
+    :param fs: Frecuencia de muestreo en Hz.
+    :param nperseg: Muestras por segmento; por defecto min(256, muestras).
+    :param solapamiento: Fracción de solapamiento entre segmentos.
+    :param workers: Número de hilos; por defecto el número de CPUs.
+    :return: Tupla (frecuencias, psd) con psd de forma (canales x frecuencias x épocas).
+    """
+    num_canales, num_muestras, num_epocas = matriz.shape
+    nperseg = min(nperseg or 256, num_muestras)
+    paso = max(1, nperseg - int(nperseg * solapamiento))
+    frecuencias = np.fft.rfftfreq(nperseg, d=1.0 / fs)
+    psd = np.empty((num_canales, len(frecuencias), num_epocas))
+
+    workers = workers or os.cpu_count() or 1
+    tam = -(-num_canales // workers)
+    grupos = [(ini, min(ini + tam, num_canales)) for ini in range(0, num_canales, tam)]
+
+    def calcular(grupo):
+        ini, fin = grupo
+        psd[ini:fin] = _welch_bloque(matriz[ini:fin], fs, nperseg, paso)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(calcular, grupos))
+    return frecuencias, psd
+
+
+def potencia_bandas(frecuencias, psd, bandas=None):
+    """
+    Integra la PSD en cada banda de frecuencia.
+
+    :param frecuencias: Frecuencias devueltas por welch.
+    :param psd: PSD (canales x frecuencias x épocas).
+    :param bandas: Diccionario {nombre: (f_min, f_max)}; por defecto BANDAS.
+    :return: Diccionario {banda: potencia (canales x épocas)}.
+    """
+    bandas = bandas or BANDAS
+    df = frecuencias[1] - frecuencias[0]
+    resultado = {}
+    for nombre, (f_min, f_max) in bandas.items():
+        mascara = (frecuencias >= f_min) & (frecuencias < f_max)
+        resultado[nombre] = psd[:, mascara, :].sum(axis=1) * df
+    return resultado
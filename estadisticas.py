@@ -0,0 +1,328 @@
+"""
+Estadísticas descriptivas y correlaciones calculadas por bloques.
+
+Cada bloque de filas produce un Parcial (conteos, medias, sumas de
+cuadrados, extremos, frecuencias de valores y co-momentos) que se puede
+unir con otros. Así el cálculo se reparte entre procesos o recorre un
+archivo por bloques sin cargarlo completo, y el resultado es el mismo que
+con todos los datos a la vez.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from importacion_perezosa import importar_perezoso
+
+pd = importar_perezoso('pandas')
+
+METODOS = ('pearson', 'spearman')
+
+# Fracción mínima de valores numéricos para tratar una columna de texto como número
+MIN_FRACCION_NUMERICA = 0.9
+
+# Filas por bloque al repartir un DataFrame en memoria entre procesos
+FILAS_POR_BLOQUE = 100000
+
+# Máximo de valores distintos que se cuentan por columna. Por encima (p. ej.
+# mediciones continuas) la tabla se compacta y cuartiles y rangos de Spearman
+# pasan a ser aproximados
+MAX_VALORES_DISTINTOS = 10000
+
+
+def columnas_numericas(data):
+    """
+    Columnas numéricas del bloque, incluyendo las de texto con números y
+    marcas de faltante como 'NAN' (casi todos sus valores son números).
+    """
+    columnas = []
+    for col in data.columns:
+        serie = data[col]
+        if pd.api.types.is_bool_dtype(serie):
+            continue
+        if pd.api.types.is_numeric_dtype(serie):
+            columnas.append(col)
+        elif pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie):
+            validos = serie.dropna()
+            if len(validos) and pd.to_numeric(validos, errors='coerce').notna().mean() >= MIN_FRACCION_NUMERICA:
+                columnas.append(col)
+    return columnas
+
+
+def _matriz(data, columnas):
+    """
+    Columnas como matriz float64; el texto que no es número queda como NaN.
+    """
+    return np.column_stack([pd.to_numeric(data[c], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+                            for c in columnas]) if columnas else np.empty((len(data), 0))
+
+
+class Parcial:
+    """
+    Agregados combinables de un bloque de filas.
+
+    - n, media, m2, minimo, maximo por columna (media y varianza con las
+      fórmulas de Chan para unir bloques).
+    - frecuencias: conteo de cada valor distinto por columna, para los
+      cuantiles exactos y los rangos de Spearman. Con más de
+      MAX_VALORES_DISTINTOS valores la tabla se compacta (ver _compactar) y
+      la columna queda marcada en ``aproximadas``.
+    - por pares de columnas (solo filas con ambos valores): conteo, medias,
+      sumas de cuadrados y co-momento centrados, para la correlación de
+      Pearson. Se unen con las mismas fórmulas de Chan, sin sumas de
+      potencias que pierden precisión con medias grandes.
+    """
+
+    def __init__(self, columnas, x=None, frecuencias=True, correlacion=False):
+        """
+        :param columnas: Nombres de las columnas.
+        :param x: Matriz (filas x columnas) del bloque; None para un parcial vacío.
+        :param frecuencias: Si es True se cuentan los valores distintos.
+        :param correlacion: Si es True se acumulan los co-momentos.
+        """
+        k = len(columnas)
+        self.columnas = list(columnas)
+        self.n = np.zeros(k)
+        self.media = np.zeros(k)
+        self.m2 = np.zeros(k)
+        self.minimo = np.full(k, np.inf)
+        self.maximo = np.full(k, -np.inf)
+        self.frecuencias = [pd.Series(dtype=np.float64) for _ in range(k)] if frecuencias else None
+        self.aproximadas = np.zeros(k, dtype=bool)
+        self.pares = None
+        if correlacion:
+            # En [i, j], con las filas que tienen x_i y x_j: n, media de x_i,
+            # suma de (x_i - media)² y suma de (x_i - media_i)·(x_j - media_j)
+            self.pares = {'n': np.zeros((k, k)), 'media': np.zeros((k, k)), 'm2': np.zeros((k, k)),
+                          'c': np.zeros((k, k))}
+        if x is not None:
+            self._agregar(x)
+
+    def _agregar(self, x):
+        validos = ~np.isnan(x)
+        n = validos.sum(axis=0).astype(np.float64)
+        ceros = np.where(validos, x, 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            media = np.where(n > 0, ceros.sum(axis=0) / n, 0.0)
+        desvio = np.where(validos, x - media, 0.0)
+        parcial_m2 = (desvio * desvio).sum(axis=0)
+        self._unir_momentos(n, media, parcial_m2)
+        if x.shape[0]:
+            np.fmin(self.minimo, np.nanmin(np.where(validos, x, np.inf), axis=0), out=self.minimo)
+            np.fmax(self.maximo, np.nanmax(np.where(validos, x, -np.inf), axis=0), out=self.maximo)
+        if self.frecuencias is not None:
+            for j in range(x.shape[1]):
+                conteo = pd.Series(x[validos[:, j], j]).value_counts()
+                self._guardar_frecuencias(j, self.frecuencias[j].add(conteo, fill_value=0))
+        if self.pares is not None:
+            # Dentro del bloque se resta antes la media de cada columna; así
+            # las sumas quedan del orden de la dispersión y no de la media
+            v = validos.astype(np.float64)
+            n = v.T @ v
+            sx = desvio.T @ v
+            with np.errstate(invalid='ignore', divide='ignore'):
+                media_par = np.where(n > 0, sx / n, 0.0)
+                m2 = (desvio * desvio).T @ v - np.where(n > 0, sx * sx / n, 0.0)
+                c = desvio.T @ desvio - np.where(n > 0, sx * sx.T / n, 0.0)
+            self._unir_pares(n, media[:, None] + media_par, m2, c)
+
+    def _guardar_frecuencias(self, j, frecuencias):
+        if len(frecuencias) > MAX_VALORES_DISTINTOS:
+            frecuencias = _compactar(frecuencias)
+            self.aproximadas[j] = True
+        self.frecuencias[j] = frecuencias
+
+    def _unir_momentos(self, n, media, m2):
+        total = self.n + n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = media - self.media
+            peso = np.where(total > 0, n / total, 0.0)
+        self.m2 = self.m2 + m2 + delta * delta * self.n * peso
+        self.media = self.media + delta * peso
+        self.n = total
+
+    def _unir_pares(self, n, media, m2, c):
+        p = self.pares
+        total = p['n'] + n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = media - p['media']
+            peso = np.where(total > 0, n / total, 0.0)
+        # delta.T[i, j] es el cambio de la media de x_j en las filas del par (i, j)
+        p['c'] = p['c'] + c + delta * delta.T * p['n'] * peso
+        p['m2'] = p['m2'] + m2 + delta * delta * p['n'] * peso
+        p['media'] = p['media'] + delta * peso
+        p['n'] = total
+
+    def unir(self, otra):
+        """
+        Suma a este parcial los agregados de otro con las mismas columnas.
+        """
+        self._unir_momentos(otra.n, otra.media, otra.m2)
+        np.fmin(self.minimo, otra.minimo, out=self.minimo)
+        np.fmax(self.maximo, otra.maximo, out=self.maximo)
+        if self.frecuencias is not None:
+            self.aproximadas |= otra.aproximadas
+            for j, frecuencias in enumerate(otra.frecuencias):
+                self._guardar_frecuencias(j, self.frecuencias[j].add(frecuencias, fill_value=0))
+        if self.pares is not None:
+            self._unir_pares(otra.pares['n'], otra.pares['media'], otra.pares['m2'], otra.pares['c'])
+        return self
+
+    def cuantil(self, j, q):
+        """
+        Cuantil de la columna j a partir de las frecuencias, con la misma
+        interpolación lineal que pandas (aproximado si la tabla se compactó).
+        """
+        frecuencias = self.frecuencias[j].sort_index()
+        if not len(frecuencias):
+            return np.nan
+        acumulado = frecuencias.to_numpy().cumsum()
+        posicion = q * (acumulado[-1] - 1)
+        valores = frecuencias.index.to_numpy(dtype=np.float64)
+        abajo = valores[np.searchsorted(acumulado, np.floor(posicion), side='right')]
+        arriba = valores[np.searchsorted(acumulado, np.ceil(posicion), side='right')]
+        return abajo + (arriba - abajo) * (posicion - np.floor(posicion))
+
+    def describir(self):
+        """
+        Resumen con el formato de DataFrame.describe().
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            desviacion = np.sqrt(np.where(self.n > 1, self.m2 / (self.n - 1), np.nan))
+        filas = {
+            'count': self.n,
+            'mean': np.where(self.n > 0, self.media, np.nan),
+            'std': desviacion,
+            'min': np.where(self.n > 0, self.minimo, np.nan),
+        }
+        if self.frecuencias is not None:
+            for q, nombre in ((0.25, '25%'), (0.5, '50%'), (0.75, '75%')):
+                filas[nombre] = [self.cuantil(j, q) for j in range(len(self.columnas))]
+        filas['max'] = np.where(self.n > 0, self.maximo, np.nan)
+        return pd.DataFrame(filas, index=self.columnas).T
+
+    def pearson(self):
+        """
+        Matriz de correlación de Pearson con pares completos (como DataFrame.corr).
+        """
+        p = self.pares
+        n, m2 = p['n'], p['m2']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = p['c'] / np.sqrt(m2 * m2.T)
+        corr[n < 2] = np.nan
+        np.fill_diagonal(corr, np.where(np.diag(n) > 1, 1.0, np.nan))
+        return pd.DataFrame(np.clip(corr, -1, 1), index=self.columnas, columns=self.columnas)
+
+    def rangos(self):
+        """
+        Para cada columna, la función que lleva un valor a su rango promedio
+        en todos los datos (los empates reciben el promedio, como en pandas).
+        """
+        tablas = []
+        for frecuencias in self.frecuencias:
+            frecuencias = frecuencias.sort_index()
+            acumulado = frecuencias.to_numpy().cumsum()
+            promedio = acumulado - (frecuencias.to_numpy() - 1) / 2
+            tablas.append((frecuencias.index.to_numpy(dtype=np.float64), promedio))
+        return tablas
+
+
+def _compactar(frecuencias, maximo=MAX_VALORES_DISTINTOS):
+    """
+    Reduce una tabla de frecuencias a maximo / 2 grupos de valores vecinos
+    con cantidades parecidas de datos; cada grupo queda como su promedio
+    ponderado con la suma de los conteos. Un cuantil o un rango calculado
+    con la tabla compactada se aleja a lo sumo 2 / maximo (en proporción de
+    los datos) del exacto. Los valores muy repetidos conservan su grupo.
+    """
+    frecuencias = frecuencias.sort_index()
+    conteos = frecuencias.to_numpy()
+    valores = frecuencias.index.to_numpy(dtype=np.float64)
+    antes = conteos.cumsum() - conteos
+    grupo = (antes * (maximo // 2) // conteos.sum()).astype(np.int64)
+    pesos = np.bincount(grupo, conteos)
+    usados = pesos > 0
+    centros = np.bincount(grupo, conteos * valores)[usados] / pesos[usados]
+    return pd.Series(pesos[usados], index=centros)
+
+
+def a_rangos(x, tablas):
+    """
+    Reemplaza cada valor por su rango global (los NaN se conservan). Con una
+    tabla compactada el rango se interpola entre los grupos vecinos.
+    """
+    r = np.full(x.shape, np.nan)
+    for j, (valores, promedio) in enumerate(tablas):
+        validos = ~np.isnan(x[:, j])
+        r[validos, j] = np.interp(x[validos, j], valores, promedio)
+    return r
+
+
+def parcial_de(bloque, columnas, por=None, frecuencias=True, correlacion=False, tablas_rangos=None):
+    """
+    Calcula el Parcial de un bloque (o uno por grupo si se indica ``por``).
+
+    :param tablas_rangos: Si se indica, los valores se convierten a rangos
+                          antes de acumular (segunda pasada de Spearman).
+    :return: Parcial o diccionario {grupo: Parcial}.
+    """
+    x = _matriz(bloque, columnas)
+    if tablas_rangos is not None:
+        x = a_rangos(x, tablas_rangos)
+    if por is None:
+        return Parcial(columnas, x, frecuencias, correlacion)
+    codigos, grupos = pd.factorize(bloque[por], sort=True)
+    return {g: Parcial(columnas, x[codigos == k], frecuencias, correlacion) for k, g in enumerate(grupos)}
+
+
+def unir(parciales):
+    """
+    Une una secuencia de parciales (o de diccionarios de parciales por grupo).
+    """
+    total = None
+    for p in parciales:
+        if p is None:
+            continue
+        if total is None:
+            total = p
+        elif isinstance(p, dict):
+            for g, parcial in p.items():
+                total[g] = total[g].unir(parcial) if g in total else parcial
+        else:
+            total.unir(p)
+    return total
+
+
+def calcular(bloques, columnas, por=None, frecuencias=True, correlacion=False, tablas_rangos=None, workers=None):
+    """
+    Calcula y une los parciales de una secuencia de bloques.
+
+    Con workers > 1 los bloques se reparten en un pool de procesos a medida
+    que se leen; como mucho hay 2 * workers bloques en memoria a la vez.
+
+    :param bloques: Iterable de DataFrames (p. ej. pd.read_csv con chunksize).
+    :return: Parcial o diccionario {grupo: Parcial}.
+    """
+    argumentos = (columnas, por, frecuencias, correlacion, tablas_rangos)
+    workers = workers or 1
+    if workers == 1:
+        return unir(parcial_de(b, *argumentos) for b in bloques)
+
+    total, pendientes = None, []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for bloque in bloques:
+            pendientes.append(pool.submit(parcial_de, bloque, *argumentos))
+            if len(pendientes) >= 2 * workers:
+                total = unir([total, pendientes.pop(0).result()])
+        for futuro in pendientes:
+            total = unir([total, futuro.result()])
+    return total
+
+
+def partir(data, filas=FILAS_POR_BLOQUE, workers=None):
+    """
+    Divide un DataFrame en bloques (vistas) para repartirlos entre procesos.
+    """
+    workers = workers or os.cpu_count() or 1
+    filas = max(1, min(filas, -(-len(data) // workers)))
+    return (data.iloc[i:i + filas] for i in range(0, max(len(data), 1), filas))
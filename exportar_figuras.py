@@ -0,0 +1,105 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from importacion_perezosa import importar_perezoso
+
+figure = importar_perezoso('matplotlib.figure')
+backend_agg = importar_perezoso('matplotlib.backends.backend_agg')
+
+FORMATOS = ('png', 'svg', 'pdf')
+
+# Figuras reutilizables por tamaño dentro de cada proceso
+_figuras = {}
+
+
+def nueva_figura(figsize, reutilizar=True):
+    """
+    Devuelve una figura con el backend Agg, sin ventana ni pyplot.
+
+    Si reutilizar es True, la figura del mismo tamaño se limpia y se vuelve a
+    usar en lugar de crear una nueva en cada gráfica.
+
+    :param figsize: Tamaño de la figura en pulgadas.
+    :param reutilizar: Si es True se reutiliza la figura ya creada.
+    :return: Instancia de matplotlib.figure.Figure.
+    """
+    clave = tuple(figsize)
+    if reutilizar and clave in _figuras:
+        fig = _figuras[clave]
+        fig.clf()
+        return fig
+    fig = figure.Figure(figsize=figsize)
+    backend_agg.FigureCanvasAgg(fig)
+    if reutilizar:
+        _figuras[clave] = fig
+    return fig
+
+
+def guardar_figura(fig, ruta_salida, dpi=100):
+    """
+    Guarda la figura en PNG, SVG o PDF según la extensión de la ruta.
+
+    :param fig: Figura a guardar.
+    :param ruta_salida: Ruta del archivo de salida.
+    :param dpi: Resolución para formatos rasterizados.
+    """
+    extension = os.path.splitext(ruta_salida)[1].lstrip('.').lower()
+    if extension not in FORMATOS:
+        raise ValueError(f"Formato '{extension}' no soportado. Use uno de {FORMATOS}.")
+    carpeta = os.path.dirname(ruta_salida)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+    fig.savefig(ruta_salida, format=extension, dpi=dpi)
+    print(f"Figura guardada en: {ruta_salida}")
+
+
+def _renderizar(tarea):
+    """
+    Renderiza una figura en un proceso aparte.
+
+    :param tarea: Diccionario con 'archivo', 'grafica', 'salida' y 'opciones'.
+    """
+    from clases import Read_CSV, Read_Mat
+
+    inicio = time.perf_counter()
+    try:
+        if tarea['archivo'].lower().endswith('.mat'):
+            lector = Read_Mat(tarea['archivo'], lazy=True)
+            lector.load_mat()
+        else:
+            lector = Read_CSV(tarea['archivo'])
+            lector.load_csv()
+        # Los métodos de gráficas devuelven True solo si guardaron la figura
+        if not getattr(lector, tarea['grafica'])(ruta_salida=tarea['salida'], **tarea.get('opciones', {})):
+            raise ValueError(f"No se generó la figura {tarea['salida']}.")
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return {'salida': tarea['salida'], 'segundos': round(time.perf_counter() - inicio, 4), 'error': error}
+
+
+def renderizar_en_paralelo(tareas, workers=None):
+    """
+    Renderiza muchas figuras en procesos paralelos.
+
+    Cada tarea es un diccionario con:
+        - 'archivo': ruta del CSV o MAT.
+        - 'grafica': método a llamar (por ejemplo 'graficar_todos').
+        - 'salida': ruta del PNG/SVG/PDF a generar.
+        - 'opciones': argumentos adicionales del método (opcional).
+
+    :param tareas: Lista de tareas.
+    :param workers: Número de procesos.
+    :return: Lista de resultados con el tiempo y el error de cada figura.
+    """
+    resultados = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for futuro in as_completed([pool.submit(_renderizar, t) for t in tareas]):
+            r = futuro.result()
+            resultados.append(r)
+            if r['error'] is None:
+                print(f"[OK] {r['salida']} ({r['segundos']:.2f} s)")
+            else:
+                print(f"[ERROR] {r['salida']}: {r['error']}")
+    return resultados
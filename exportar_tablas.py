@@ -0,0 +1,211 @@
+import contextlib
+import gzip
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from importacion_perezosa import importar_perezoso, disponible
+
+pd = importar_perezoso('pandas')
+zstandard = importar_perezoso('zstandard') if disponible('zstandard') else None
+
+HAY_ARROW = disponible('pyarrow')
+
+# Formato según la terminación del archivo (las más largas primero)
+EXTENSIONES = (
+    ('.csv.gz', 'csv.gz'), ('.csv.zst', 'csv.zst'), ('.gz', 'csv.gz'), ('.zst', 'csv.zst'),
+    ('.csv', 'csv'), ('.parquet', 'parquet'), ('.feather', 'feather'), ('.arrow', 'feather'),
+)
+FORMATOS = ('csv', 'csv.gz', 'csv.zst', 'parquet', 'feather')
+
+# A partir de este número de filas el CSV se serializa por bloques en varios procesos
+FILAS_POR_BLOQUE = 200000
+
+# Nombre de la partición para los valores faltantes (convención de Hive)
+PARTICION_NA = '__HIVE_DEFAULT_PARTITION__'
+
+
+def formato_de(ruta):
+    """
+    Devuelve el formato que corresponde a la extensión de la ruta o None.
+    """
+    ruta = ruta.lower()
+    for extension, formato in EXTENSIONES:
+        if ruta.endswith(extension):
+            return formato
+    return None
+
+
+def _extension(formato):
+    return '.' + formato
+
+
+def _comprobar_formato(formato):
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato '{formato}' no soportado. Use uno de {FORMATOS}.")
+    if formato in ('parquet', 'feather') and not HAY_ARROW:
+        raise ValueError(f"El formato '{formato}' necesita pyarrow, que no está instalado.")
+    if formato == 'csv.zst' and zstandard is None:
+        raise ValueError("El formato 'csv.zst' necesita el paquete zstandard, que no está instalado.")
+
+
+def _leer_umask():
+    # os.umask solo se puede leer cambiándola; se hace una vez al importar,
+    # antes de que haya hilos (precarga, servidor) creando archivos
+    mascara = os.umask(0)
+    os.umask(mascara)
+    return mascara
+
+
+_UMASK = _leer_umask()
+
+
+def _permisos_por_defecto(ruta, modo):
+    """
+    Da a un archivo o carpeta temporal los permisos que tendría al crearlo
+    normalmente (mkstemp y mkdtemp los dejan solo para el dueño).
+    """
+    os.chmod(ruta, modo & ~_UMASK)
+
+
+@contextlib.contextmanager
+def escritura_atomica(ruta):
+    """
+    Entrega una ruta temporal en la misma carpeta y, si todo sale bien, la
+    renombra a la ruta final. Quien lea el archivo ve la versión anterior o
+    la nueva completa, nunca un archivo a medias.
+    """
+    carpeta = os.path.dirname(os.path.abspath(ruta))
+    os.makedirs(carpeta, exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=carpeta, prefix='.' + os.path.basename(ruta) + '.', suffix='.tmp')
+    os.close(descriptor)
+    try:
+        yield temporal
+        _permisos_por_defecto(temporal, 0o666)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def agregar_filas_csv(data, ruta):
+    """
+    Agrega filas al final de un CSV existente sin exponer un archivo a
+    medias: se copia a un temporal, se agregan ahí y se renombra.
+    """
+    with escritura_atomica(ruta) as temporal:
+        shutil.copyfile(ruta, temporal)
+        data.to_csv(temporal, mode='a', header=False, index=False)
+
+
+def _comprimir(texto, formato):
+    datos = texto.encode('utf-8')
+    if formato == 'csv.gz':
+        return gzip.compress(datos, compresslevel=6)
+    if formato == 'csv.zst':
+        return zstandard.ZstdCompressor().compress(datos)
+    return datos
+
+
+def _serializar_csv(bloque, encabezado, index, formato):
+    """
+    Convierte un bloque de filas en bytes de CSV (comprimidos si corresponde).
+
+    Los miembros gzip y los marcos zstd concatenados forman un archivo
+    válido, así que cada bloque se comprime por separado.
+    """
+    return _comprimir(bloque.to_csv(header=encabezado, index=index), formato)
+
+
+def _escribir_csv(data, ruta, formato, index, workers):
+    bloques = [data.iloc[i:i + FILAS_POR_BLOQUE] for i in range(0, max(len(data), 1), FILAS_POR_BLOQUE)]
+    with open(ruta, 'wb') as salida:
+        if len(bloques) == 1 or workers == 1:
+            for i, bloque in enumerate(bloques):
+                salida.write(_serializar_csv(bloque, i == 0, index, formato))
+            return
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # map conserva el orden de los bloques
+            partes = pool.map(_serializar_csv, bloques, [i == 0 for i in range(len(bloques))],
+                              [index] * len(bloques), [formato] * len(bloques))
+            for parte in partes:
+                salida.write(parte)
+
+
+def _escribir(data, ruta, formato, index, workers):
+    with escritura_atomica(ruta) as temporal:
+        if formato == 'parquet':
+            # pyarrow escribe las columnas en varios hilos
+            data.to_parquet(temporal, index=index)
+        elif formato == 'feather':
+            data = data.reset_index() if index else data.reset_index(drop=True)
+            data.to_feather(temporal)
+        else:
+            _escribir_csv(data, temporal, formato, index, workers)
+
+
+def _nombre_particion(columna, valor):
+    texto = PARTICION_NA if pd.isna(valor) else str(valor)
+    for caracter in (os.sep, '/', '\\', ':'):
+        texto = texto.replace(caracter, '_')
+    return f"{columna}={texto}"
+
+
+def exportar(data, ruta, formato=None, particionar_por=None, index=False, workers=None):
+    """
+    Guarda un DataFrame en CSV (opcionalmente comprimido), Parquet o Feather.
+
+    La escritura es atómica: se escribe en un temporal y se renombra. Los CSV
+    grandes se serializan por bloques en varios procesos.
+
+    Con particionar_por, ruta es una carpeta y se escribe un archivo por cada
+    valor de la columna, con la estructura de Hive::
+
+        ruta/diagnosis=MCI/datos.parquet
+        ruta/diagnosis=Dementia/datos.parquet
+
+    La carpeta completa se arma aparte y luego reemplaza a la anterior.
+
+    :param data: DataFrame a guardar.
+    :param ruta: Archivo de salida (o carpeta si se particiona).
+    :param formato: 'csv', 'csv.gz', 'csv.zst', 'parquet' o 'feather'; por
+                    defecto se deduce de la extensión (y 'csv' si no la hay).
+    :param particionar_por: Columna por la que se separan los archivos.
+    :param index: Si es True se guarda también el índice.
+    :param workers: Número de procesos para los CSV grandes.
+    :return: Ruta escrita.
+    """
+    formato = formato or formato_de(ruta) or 'csv'
+    _comprobar_formato(formato)
+
+    if particionar_por is None:
+        _escribir(data, ruta, formato, index, workers)
+        return ruta
+
+    if particionar_por not in data.columns:
+        raise ValueError(f"La columna '{particionar_por}' no se encuentra en los datos.")
+    ruta = os.path.abspath(ruta)
+    padre = os.path.dirname(ruta)
+    os.makedirs(padre, exist_ok=True)
+    temporal = tempfile.mkdtemp(dir=padre, prefix='.' + os.path.basename(ruta) + '.')
+    try:
+        for valor, grupo in data.groupby(particionar_por, observed=True, dropna=False, sort=True):
+            carpeta = os.path.join(temporal, _nombre_particion(particionar_por, valor))
+            os.makedirs(carpeta, exist_ok=True)
+            # La columna queda implícita en el nombre de la carpeta
+            _escribir(grupo.drop(columns=particionar_por), os.path.join(carpeta, 'datos' + _extension(formato)),
+                      formato, index, workers)
+        _permisos_por_defecto(temporal, 0o777)
+        anterior = None
+        if os.path.exists(ruta):
+            anterior = temporal + '.anterior'
+            os.replace(ruta, anterior)
+        os.replace(temporal, ruta)
+        if anterior is not None:
+            shutil.rmtree(anterior, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(temporal, ignore_errors=True)
+        raise
+    return ruta
@@ -0,0 +1,181 @@
+import numpy as np
+
+from importacion_perezosa import importar_perezoso
+
+pd = importar_perezoso('pandas')
+
+ESTRATEGIAS = ('media', 'mediana', 'moda', 'anterior', 'posterior')
+
+
+class Mascara_Nulos:
+    """
+    Máscara de valores faltantes de un DataFrame, guardada como bits.
+
+    Cada fila ocupa ceil(columnas / 8) bytes (np.packbits), ocho veces menos
+    que el DataFrame booleano de isna(). Se calcula una vez y se reutiliza
+    para los conteos, el filtrado de filas y los reportes.
+    """
+
+    def __init__(self, bits, columnas):
+        """
+        :param bits: Arreglo uint8 (filas x ceil(columnas / 8)) de np.packbits.
+        :param columnas: Nombres de las columnas, en el orden de los bits.
+        """
+        self.bits = bits
+        self.columnas = list(columnas)
+
+    @classmethod
+    def desde(cls, data):
+        """
+        Calcula la máscara de un DataFrame.
+        """
+        return cls(np.packbits(data.isna().to_numpy(), axis=1), data.columns)
+
+    def __len__(self):
+        return self.bits.shape[0]
+
+    def _desempacar(self):
+        return np.unpackbits(self.bits, axis=1, count=len(self.columnas)).astype(bool)
+
+    def columna(self, nombre):
+        """
+        Arreglo booleano con True en las filas donde falta la columna.
+        """
+        j = self.columnas.index(nombre)
+        return (self.bits[:, j >> 3] >> (7 - (j & 7))) & 1 == 1
+
+    def por_columna(self):
+        """
+        Número de valores faltantes de cada columna.
+        """
+        conteo = np.zeros(len(self.columnas), dtype=np.int64)
+        # Se desempaca por tramos para no crear la matriz booleana completa
+        for ini in range(0, len(self), 65536):
+            tramo = np.unpackbits(self.bits[ini:ini + 65536], axis=1, count=len(self.columnas))
+            conteo += tramo.sum(axis=0, dtype=np.int64)
+        return pd.Series(conteo, index=self.columnas)
+
+    def filas_con_nulos(self):
+        """
+        Arreglo booleano con True en las filas que tienen algún faltante.
+        """
+        return self.bits.any(axis=1)
+
+    def seleccionar_filas(self, filas):
+        """
+        Máscara solo con las filas indicadas (booleano o posiciones).
+        """
+        return Mascara_Nulos(self.bits[filas], self.columnas)
+
+    def extender(self, otra):
+        """
+        Agrega al final las filas de otra máscara con las mismas columnas.
+        """
+        return Mascara_Nulos(np.concatenate([self.bits, otra.bits]), self.columnas)
+
+    def reemplazar_columnas(self, data):
+        """
+        Recalcula (o agrega) las columnas de data sin tocar las demás.
+        """
+        nulos = self._desempacar()
+        nuevas = [c for c in data.columns if c not in self.columnas]
+        if nuevas:
+            nulos = np.hstack([nulos, np.zeros((len(self), len(nuevas)), dtype=bool)])
+        columnas = self.columnas + nuevas
+        for c in data.columns:
+            nulos[:, columnas.index(c)] = data[c].isna().to_numpy()
+        return Mascara_Nulos(np.packbits(nulos, axis=1), columnas)
+
+    def reporte(self):
+        """
+        DataFrame con los faltantes y el porcentaje por columna.
+        """
+        conteo = self.por_columna()
+        porcentaje = 100 * conteo / len(self) if len(self) else conteo * 0.0
+        return pd.DataFrame({'faltantes': conteo, 'porcentaje': porcentaje.round(2)})
+
+
+def _moda(data, columna, por):
+    if por is None:
+        moda = data[columna].mode()
+        return pd.Series(moda.iloc[0] if len(moda) else np.nan, index=data.index)
+    # La categoría más frecuente de cada grupo a partir de un solo conteo
+    conteos = data.groupby([por, columna], observed=True).size()
+    if conteos.empty:
+        return pd.Series(np.nan, index=data.index)
+    modas = conteos.groupby(level=0, observed=True).idxmax().map(lambda par: par[1])
+    return data[por].map(modas)
+
+
+def valores_imputacion(data, columnas, estrategia, por=None):
+    """
+    Calcula, para todas las filas, el valor con que se llenaría cada columna.
+
+    :param data: DataFrame con los datos.
+    :param columnas: Columnas a llenar.
+    :param estrategia: 'media', 'mediana', 'moda', 'anterior' (último valor
+                       conocido) o 'posterior' (siguiente valor conocido).
+    :param por: Columna de grupos (por ejemplo 'diagnosis'); el valor se
+                calcula dentro de cada grupo.
+    :return: DataFrame con los valores de relleno.
+    """
+    if estrategia not in ESTRATEGIAS:
+        raise ValueError(f"Estrategia '{estrategia}' no soportada. Use una de {ESTRATEGIAS}.")
+    if estrategia == 'moda':
+        return pd.DataFrame({c: _moda(data, c, por) for c in columnas}, index=data.index)
+
+    fuente = data.groupby(por, observed=True)[columnas] if por is not None else data[columnas]
+    if estrategia in ('media', 'mediana'):
+        funcion = 'mean' if estrategia == 'media' else 'median'
+        if por is not None:
+            return fuente.transform(funcion)
+        return pd.DataFrame({c: np.full(len(data), getattr(data[c], funcion)()) for c in columnas},
+                            index=data.index)
+    return fuente.ffill() if estrategia == 'anterior' else fuente.bfill()
+
+
+def imputar(data, mascara, estrategia, columnas=None, por=None):
+    """
+    Llena los faltantes en el mismo DataFrame, escribiendo solo las celdas vacías.
+
+    :param data: DataFrame a modificar.
+    :param mascara: Mascara_Nulos de data.
+    :param estrategia: Ver valores_imputacion.
+    :param columnas: Columnas a llenar; por defecto todas las que tienen faltantes
+                     (solo las numéricas con 'media' y 'mediana').
+    :param por: Columna de grupos.
+    :return: Diccionario {columna: posiciones llenadas}, para poder deshacer.
+    """
+    if columnas is None:
+        conteo = mascara.por_columna()
+        columnas = [c for c in conteo.index[conteo > 0] if c != por]
+        if estrategia in ('media', 'mediana'):
+            columnas = [c for c in columnas if pd.api.types.is_numeric_dtype(data[c])]
+    faltan = [c for c in columnas if c not in data.columns]
+    if faltan:
+        raise ValueError(f"Las columnas {faltan} no se encuentran en los datos.")
+    if not columnas:
+        return {}
+
+    valores = valores_imputacion(data, columnas, estrategia, por)
+    llenadas = {}
+    for c in columnas:
+        filas = np.flatnonzero(mascara.columna(c) & valores[c].notna().to_numpy())
+        if not len(filas):
+            continue
+        relleno = valores[c].iloc[filas]
+        if pd.api.types.is_integer_dtype(data[c]) or isinstance(data[c].dtype, pd.CategoricalDtype):
+            # Enteros y categorías solo admiten valores de su tipo
+            relleno = relleno.round() if pd.api.types.is_float_dtype(relleno) else relleno
+            relleno = relleno.astype(data[c].dtype)
+        data.iloc[filas, data.columns.get_loc(c)] = relleno.to_numpy()
+        llenadas[c] = filas
+    return llenadas
+
+
+def restaurar(data, llenadas):
+    """
+    Vuelve a dejar como faltantes las celdas que se llenaron con imputar.
+    """
+    for c, filas in llenadas.items():
+        data.iloc[filas, data.columns.get_loc(c)] = None
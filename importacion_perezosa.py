@@ -0,0 +1,48 @@
+import importlib
+import importlib.util
+import sys
+
+
+class _ModuloPerezoso:
+    """
+    Sustituto de un módulo que lo importa al acceder al primer atributo.
+    """
+
+    def __init__(self, nombre):
+        self._nombre = nombre
+        self._modulo = None
+
+    def __getattr__(self, atributo):
+        if self._modulo is None:
+            self._modulo = importlib.import_module(self._nombre)
+        return getattr(self._modulo, atributo)
+
+    def __repr__(self):
+        estado = 'cargado' if self._modulo is not None else 'sin cargar'
+        return f"<módulo perezoso '{self._nombre}' ({estado})>"
+
+
+def importar_perezoso(nombre):
+    """
+    Devuelve el módulo indicado sin importarlo todavía.
+
+    El módulo se importa de verdad la primera vez que se accede a uno de sus
+    atributos, así las librerías pesadas (pandas, seaborn, matplotlib, scipy)
+    solo se cargan cuando el código que las usa se ejecuta.
+
+    :param nombre: Nombre completo del módulo, por ejemplo 'matplotlib.pyplot'.
+    :return: El módulo si ya estaba importado o un sustituto perezoso.
+    """
+    if nombre in sys.modules:
+        return sys.modules[nombre]
+    return _ModuloPerezoso(nombre)
+
+
+def disponible(nombre):
+    """
+    Indica si un módulo opcional de primer nivel está instalado, sin importarlo.
+    """
+    try:
+        return importlib.util.find_spec(nombre) is not None
+    except (ImportError, ValueError):
+        return False
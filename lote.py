@@ -0,0 +1,170 @@
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import perfilado
+
+OPERACIONES_CSV = ('nan', 'multiplicar')
+OPERACIONES_MAT = ('resumen', 'figuras')
+
+
+def _nombre_base(file_path):
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+
+def procesar_csv(file_path, operaciones, columnas, carpeta_salida, formato='csv'):
+    """
+    Aplica las operaciones de CSV a un archivo. Se ejecuta en un proceso aparte.
+
+    :param formato: Formato de la tabla generada (ver exportar_tablas.FORMATOS).
+
+    :return: Diccionario con los resultados de cada operación.
+    """
+    from clases import Read_CSV
+
+    lector = Read_CSV(file_path)
+    lector.load_csv()
+    if lector.data is None:
+        raise ValueError(f"No se pudo cargar el archivo {file_path}.")
+
+    resultado = {}
+    if 'nan' in operaciones:
+        resultado['nan'] = int(lector.mascara_nulos().por_columna().sum())
+        lector.nan_counter_and_cleanup()
+        resultado['filas'] = len(lector.data)
+    if 'multiplicar' in operaciones:
+        if not columnas:
+            raise ValueError("La operación 'multiplicar' necesita --columnas COL1 COL2.")
+        col1, col2 = columnas
+        nuevo = os.path.join(carpeta_salida, _nombre_base(file_path) + '_multiplicacion.' + formato)
+        if not lector.multiplicar_columnas_y_guardar(col1, col2, nuevo):
+            raise ValueError(f"No se pudo multiplicar '{col1}' por '{col2}'.")
+        resultado['multiplicar'] = nuevo
+    return resultado
+
+
+def procesar_mat(file_path, operaciones, carpeta_salida):
+    """
+    Aplica las operaciones de MAT a un archivo. Se ejecuta en un proceso aparte.
+
+    :return: Diccionario con los resultados de cada operación.
+    """
+    from clases import Read_Mat
+
+    # El modo perezoso evita cargar matrices que no se usan y admite MAT v7.3
+    lector = Read_Mat(file_path, lazy=True)
+    lector.load_mat()
+    if not lector.matrix_names:
+        raise ValueError(f"No se pudo cargar el archivo {file_path}.")
+
+    resultado = {}
+    resumen = lector.resumen()
+    if 'resumen' in operaciones:
+        resultado['resumen'] = {
+            'matriz': resumen.nombre,
+            'forma': list(resumen.forma),
+            'media': float(resumen.promedio_epocas.mean()),
+            'varianza_canal': resumen.varianza.tolist(),
+            'minimo': float(resumen.minimo.min()),
+            'maximo': float(resumen.maximo.max()),
+        }
+    if 'figuras' in operaciones:
+        ruta = os.path.join(carpeta_salida, _nombre_base(file_path) + '_todos.png')
+        if not lector.graficar_todos(resumen, ruta_salida=ruta):
+            raise ValueError(f"No se pudo generar la figura {ruta}.")
+        resultado['figuras'] = ruta
+    lector.cerrar()
+    return resultado
+
+
+def _ejecutar(tipo, file_path, operaciones, columnas, carpeta_salida, formato='csv'):
+    """
+    Ejecuta un archivo midiendo el tiempo y capturando cualquier error,
+    para que un fallo no detenga el resto del lote.
+    """
+    inicio = time.perf_counter()
+    try:
+        if tipo == 'csv':
+            resultado = procesar_csv(file_path, operaciones, columnas, carpeta_salida, formato)
+        else:
+            resultado = procesar_mat(file_path, operaciones, carpeta_salida)
+        estado, error = 'ok', None
+    except Exception as e:
+        resultado, estado, error = {}, 'error', f"{type(e).__name__}: {e}"
+    return {
+        'archivo': file_path,
+        'tipo': tipo,
+        'estado': estado,
+        'segundos': round(time.perf_counter() - inicio, 4),
+        'resultado': resultado,
+        'error': error,
+        # Los tiempos de este proceso vuelven al principal, que es el que los guarda
+        'perfil': perfilado.extraer() if perfilado.activo() else [],
+    }
+
+
+def expandir_patrones(patrones):
+    """
+    Expande una lista de patrones glob a una lista ordenada de archivos sin repetir.
+    """
+    archivos = []
+    for patron in patrones or []:
+        for archivo in sorted(glob.glob(patron)):
+            if archivo not in archivos:
+                archivos.append(archivo)
+    return archivos
+
+
+def ejecutar_lote(patrones_csv, patrones_mat, operaciones, columnas=None,
+                  carpeta_salida='.', workers=None, reporte=None, formato='csv'):
+    """
+    Procesa muchos archivos en paralelo usando un pool de procesos.
+
+    :param patrones_csv: Patrones glob de archivos CSV.
+    :param patrones_mat: Patrones glob de archivos MAT.
+    :param operaciones: Lista de operaciones (nan, multiplicar, resumen, figuras).
+    :param columnas: Par de columnas para la operación 'multiplicar'.
+    :param carpeta_salida: Carpeta donde se escriben los archivos generados.
+    :param workers: Número de procesos (por defecto, el número de CPUs).
+    :param reporte: Ruta opcional de un archivo JSON con el resultado por archivo.
+    :param formato: Formato de las tablas generadas ('csv', 'csv.gz', 'csv.zst', 'parquet' o 'feather').
+    :return: Lista de resultados por archivo.
+    """
+    os.makedirs(carpeta_salida, exist_ok=True)
+    ops_csv = [op for op in operaciones if op in OPERACIONES_CSV]
+    ops_mat = [op for op in operaciones if op in OPERACIONES_MAT]
+    tareas = []
+    if ops_csv:
+        tareas += [('csv', archivo, ops_csv) for archivo in expandir_patrones(patrones_csv)]
+    if ops_mat:
+        tareas += [('mat', archivo, ops_mat) for archivo in expandir_patrones(patrones_mat)]
+
+    if not tareas:
+        print("No se encontraron archivos para las operaciones indicadas.")
+        return []
+
+    inicio = time.perf_counter()
+    resultados = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futuros = [pool.submit(_ejecutar, tipo, archivo, ops, columnas, carpeta_salida, formato)
+                   for tipo, archivo, ops in tareas]
+        for futuro in as_completed(futuros):
+            r = futuro.result()
+            perfilado.agregar(r.pop('perfil'))
+            resultados.append(r)
+            if r['estado'] == 'ok':
+                print(f"[OK] {r['archivo']} ({r['segundos']:.2f} s)")
+            else:
+                print(f"[ERROR] {r['archivo']} ({r['segundos']:.2f} s): {r['error']}")
+
+    fallidos = sum(r['estado'] != 'ok' for r in resultados)
+    print(f"\n{len(resultados)} archivos procesados en {time.perf_counter() - inicio:.2f} s, "
+          f"{fallidos} con errores.")
+
+    if reporte:
+        with open(reporte, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f"Reporte guardado en: {reporte}")
+    return resultados
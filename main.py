@@ -1,5 +1,16 @@
 import sys
-from clases import Read_CSV, Read_Mat  # Asegúrate de que las clases estén en el archivo 'clases.py'
+import argparse
+import numpy as np
+from clases import Read_CSV  # Asegúrate de que las clases estén en el archivo 'clases.py'
+from cache import Cache_Disco
+from catalogo import Catalogo
+from resumen_eeg import calcular_resumen
+import columnas_derivadas
+import exportar_tablas
+import faltantes
+import lote
+import perfilado
+import precarga
 
 archivos_csv = [
     r'C:\Users\VICTUS\Desktop\UdeA\Cuarto Semestre\Informática 2\P2 repository\Parcial2_info2\cancer patient data sets.csv',
@@ -26,7 +37,7 @@ def mostrar_opciones(archivos, tipo_archivo):
         except ValueError:
             print("Opción inválida, por favor ingrese un número válido.")
 
-def menu_principal():
+def menu_principal(max_precargas=precarga.MAX_PRECARGAS):
     menu = """
     MENÚ PRINCIPAL
     1. Cargar archivo CSV
@@ -38,84 +49,211 @@ def menu_principal():
     7. Graficar datos de una matriz con ruido (MAT)
     8. Contar y limpiar valores NaN en CSV
     9. Multiplicar columnas y guardar en nuevo CSV
-    10. Salir
+    10. Recargar filas nuevas del CSV
+    11. Crear columnas derivadas (CSV)
+    12. Exportar datos del CSV (CSV comprimido, Parquet, Feather o particionado)
+    13. Imputar valores NaN en CSV
+    14. Deshacer el último cambio en CSV
+    15. Catálogo de una carpeta (cargar varios archivos)
+    16. Estadísticas descriptivas y correlaciones (CSV)
+    17. Salir
     """
     lector_csv = None
     lector_mat = None
+    cache = Cache_Disco()
+    # Los archivos de las listas se cargan en segundo plano mientras se muestra el menú
+    with precarga.Precarga(archivos_csv, archivos_mat, cache=cache, max_datos=max_precargas) as precargas:
+        while True:
+            print(menu)
+            opcion = input("Seleccione una opción: ")
 
-    while True:
-        print(menu)
-        opcion = input("Seleccione una opción: ")
+            try:
+                if opcion == "1":
+                    ruta_csv = mostrar_opciones(archivos_csv, "archivo CSV")
+                    lector_csv = precargas.obtener('csv', ruta_csv)
 
-        try:
-            if opcion == "1":
-                ruta_csv = mostrar_opciones(archivos_csv, "archivo CSV")
-                lector_csv = Read_CSV(ruta_csv)
-                lector_csv.load_csv()
-
-            elif opcion == "2":
-                ruta_mat = mostrar_opciones(archivos_mat, "archivo MAT")
-                lector_mat = Read_Mat(ruta_mat)
-                lector_mat.load_mat()
-
-            elif opcion == "3":
-                if lector_csv is not None:
-                    lector_csv.graficar_barras()
-                else:
-                    raise ValueError("Primero debe cargar un archivo CSV.")
+                elif opcion == "2":
+                    ruta_mat = mostrar_opciones(archivos_mat, "archivo MAT")
+                    lector_mat = precargas.obtener('mat', ruta_mat)
 
-            elif opcion == "4":
-                if lector_csv is not None:
-                    lector_csv.graficar_dispersion()
-                else:
-                    raise ValueError("Primero debe cargar un archivo CSV.")
+                elif opcion == "3":
+                    if lector_csv is not None:
+                        lector_csv.graficar_barras()
+                    else:
+                        raise ValueError("Primero debe cargar un archivo CSV.")
 
-            elif opcion == "5":
-                if lector_mat is not None:
-                    lector_mat.display_matrices()
-                else:
-                    raise ValueError("Primero debe cargar un archivo MAT.")
+                elif opcion == "4":
+                    if lector_csv is not None:
+                        lector_csv.graficar_dispersion()
+                    else:
+                        raise ValueError("Primero debe cargar un archivo CSV.")
 
-            elif opcion == "6":
-                if lector_mat is not None:
-                    lector_mat.graficar_todos()
-                else:
-                    raise ValueError("Primero debe cargar un archivo MAT.")
+                elif opcion == "5":
+                    if lector_mat is not None:
+                        lector_mat.display_matrices()
+                    else:
+                        raise ValueError("Primero debe cargar un archivo MAT.")
 
-            elif opcion == "7":
-                if lector_mat is not None:
-                    lector_mat.graficar_ruido()
-                else:
-                    raise ValueError("Primero debe cargar un archivo MAT.")
+                elif opcion == "6":
+                    if lector_mat is not None:
+                        lector_mat.graficar_todos()
+                    else:
+                        raise ValueError("Primero debe cargar un archivo MAT.")
+
+                elif opcion == "7":
+                    if lector_mat is not None:
+                        lector_mat.graficar_ruido()
+                    else:
+                        raise ValueError("Primero debe cargar un archivo MAT.")
+
+                elif opcion == "8":
+                    if lector_csv is not None:
+                        lector_csv.nan_counter_and_cleanup()
+                    else:
+                        raise ValueError("Primero debe cargar un archivo CSV.")
+
+                elif opcion == "9":
+                    if lector_csv is not None:
+                        col1 = input("Ingrese el nombre de la columna 1: ")
+                        col2 = input("Ingrese el nombre de la columna 2: ")
+                        new_file_name = input("Ingrese el nombre del nuevo archivo CSV: ")
+                        lector_csv.multiplicar_columnas_y_guardar(col1, col2, new_file_name)
+                    else:
+                        raise ValueError("Primero debe cargar un archivo CSV.")
+
+                elif opcion == "10":
+                    if lector_csv is not None:
+                        lector_csv.recargar()
+                    else:
+                        raise ValueError("Primero debe cargar un archivo CSV.")
+
+                elif opcion == "11":
+                    if lector_csv is not None:
+                        print("Columnas disponibles:", lector_csv.obtener_columnas())
+                        print("Ingrese una definición por línea (nombre = expresión); línea vacía para terminar.")
+                        print("Ejemplos: razon = MMSE / FAB, mmse_z = zscore(MMSE), rango = discretizar(MMSE, 0, 18, 24, 30)")
+                        lineas = iter(lambda: input("> "), "")
+                        definiciones = columnas_derivadas.parsear_definiciones(lineas)
+                        new_file_name = input("Ingrese el nombre del nuevo archivo CSV (vacío para no guardar): ")
+                        lector_csv.derivar_columnas(definiciones, new_file_name or None)
+                    else:
+                        raise ValueError("Primero debe cargar un archivo CSV.")
+
+                elif opcion == "12":
+                    if lector_csv is not None:
+                        print("Formatos según la extensión:", ', '.join(e for e, _ in exportar_tablas.EXTENSIONES))
+                        ruta = input("Ingrese el archivo (o carpeta si se particiona) de salida: ")
+                        columna = input("Columna para particionar (vacío para un solo archivo): ")
+                        formato = None
+                        if columna:
+                            formato = input(f"Formato de cada partición {exportar_tablas.FORMATOS}: ") or None
+                        lector_csv.exportar(ruta, formato, columna or None)
+                    else:
+                        raise ValueError("Primero debe cargar un archivo CSV.")
+
+                elif opcion == "13":
+                    if lector_csv is not None:
+                        lector_csv.reporte_nulos()
+                        estrategia = input(f"Estrategia {faltantes.ESTRATEGIAS}: ")
+                        por = input("Columna de grupos (vacío para no agrupar): ")
+                        lector_csv.imputar_nulos(estrategia, por=por or None)
+                    else:
+                        raise ValueError("Primero debe cargar un archivo CSV.")
+
+                elif opcion == "14":
+                    if lector_csv is not None:
+                        lector_csv.deshacer()
+                    else:
+                        raise ValueError("Primero debe cargar un archivo CSV.")
+
+                elif opcion == "15":
+                    catalogo = Catalogo(input("Ingrese la carpeta con los archivos: "))
+                    catalogo.escanear()
+                    print(catalogo.tabla().to_string(index=False))
+                    tipo = input("¿Qué desea cargar? (csv, mat o vacío para nada): ").strip().lower()
+                    if tipo == "csv":
+                        lector_csv = Read_CSV(catalogo.directorio, cache=cache)
+                        lector_csv.cargar_dataframe(catalogo.cargar_csv())
+                    elif tipo == "mat":
+                        eeg = catalogo.cargar_mat()
+                        resumen = calcular_resumen(eeg)
+                        print(f"Matriz apilada (sujetos x canales x muestras x épocas): {eeg.shape}")
+                        print("Varianza media por sujeto:", np.round(resumen.varianza.mean(axis=1), 4))
+
+                elif opcion == "16":
+                    if lector_csv is not None:
+                        por = input("Columna de grupos (vacío para no agrupar): ")
+                        resumen = lector_csv.estadisticas(por=por or None)
+                        if resumen is not None:
+                            print(resumen.round(3).to_string())
+                        metodo = input("Correlación (pearson, spearman o vacío para ninguna): ").strip().lower()
+                        if metodo:
+                            matriz = lector_csv.correlacion(metodo=metodo)
+                            if matriz is not None:
+                                print(matriz.round(3).to_string())
+                    else:
+                        raise ValueError("Primero debe cargar un archivo CSV.")
+
+                elif opcion == "17":
+                    print("Saliendo del programa...")
+                    sys.exit()  # Al salir del with se cierra la precarga y se restaura sys.stdout
 
-            elif opcion == "8":
-                if lector_csv is not None:
-                    lector_csv.nan_counter_and_cleanup()
-                else:
-                    raise ValueError("Primero debe cargar un archivo CSV.")
-
-            elif opcion == "9":
-                if lector_csv is not None:
-                    col1 = input("Ingrese el nombre de la columna 1: ")
-                    col2 = input("Ingrese el nombre de la columna 2: ")
-                    new_file_name = input("Ingrese el nombre del nuevo archivo CSV: ")
-                    lector_csv.multiplicar_columnas_y_guardar(col1, col2, new_file_name)
                 else:
-                    raise ValueError("Primero debe cargar un archivo CSV.")
+                    raise ValueError("Opción no válida, intente nuevamente.")
 
-            elif opcion == "10":
-                print("Saliendo del programa...")
-                sys.exit()
+            except ValueError as ve:
+                print(f"Error: {ve}")
+            except FileNotFoundError as fnf_error:
+                print(f"Error: {fnf_error}")
+            except Exception as e:
+                print(f"Ha ocurrido un error inesperado: {e}")
 
-            else:
-                raise ValueError("Opción no válida, intente nuevamente.")
+def parsear_argumentos(argv):
+    parser = argparse.ArgumentParser(
+        description="Procesamiento por lotes (sin menú) de archivos CSV y MAT."
+    )
+    parser.add_argument('--csv', nargs='*', default=[], help="Patrones glob de archivos CSV.")
+    parser.add_argument('--mat', nargs='*', default=[], help="Patrones glob de archivos MAT.")
+    parser.add_argument('--operaciones', nargs='+', required=True,
+                        choices=list(lote.OPERACIONES_CSV + lote.OPERACIONES_MAT),
+                        help="Operaciones a aplicar a cada archivo.")
+    parser.add_argument('--columnas', nargs=2, metavar=('COL1', 'COL2'),
+                        help="Columnas a multiplicar (operación 'multiplicar').")
+    parser.add_argument('--salida', default='.', help="Carpeta de salida.")
+    parser.add_argument('--formato', default='csv', choices=exportar_tablas.FORMATOS,
+                        help="Formato de las tablas generadas (operación 'multiplicar').")
+    parser.add_argument('--workers', type=int, default=None, help="Número de procesos.")
+    parser.add_argument('--reporte', default=None, help="Archivo JSON con el resultado por archivo.")
+    parser.add_argument('--perfil', default=None,
+                        help="Registra los tiempos en este archivo (.jsonl, .json de speedscope o .prof).")
+    return parser.parse_args(argv)
+
+def main_lote(argv):
+    args = parsear_argumentos(argv)
+    if args.perfil:
+        perfilado.activar(args.perfil)
+    resultados = lote.ejecutar_lote(args.csv, args.mat, args.operaciones, args.columnas,
+                                    args.salida, args.workers, args.reporte, args.formato)
+    return 1 if any(r['estado'] != 'ok' for r in resultados) else 0
 
-        except ValueError as ve:
-            print(f"Error: {ve}")
-        except FileNotFoundError as fnf_error:
-            print(f"Error: {fnf_error}")
-        except Exception as e:
-            print(f"Ha ocurrido un error inesperado: {e}")
+def extraer_opciones_generales(argv):
+    """
+    Quita de los argumentos las opciones que valen también para el menú:
+    --perfil ARCHIVO activa el registro de tiempos (ver perfilado.py) y
+    --precargas N fija cuántos archivos se precargan en el menú.
+
+    :return: (argumentos restantes, número de precargas).
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--perfil', default=None)
+    parser.add_argument('--precargas', type=int, default=precarga.MAX_PRECARGAS)
+    args, resto = parser.parse_known_args(argv)
+    if args.perfil:
+        perfilado.activar(args.perfil)
+    return resto, args.precargas
 
 if __name__ == "__main__":
-    menu_principal()
+    argumentos, max_precargas = extraer_opciones_generales(sys.argv[1:])
+    if argumentos:
+        sys.exit(main_lote(argumentos))
+    menu_principal(max_precargas)
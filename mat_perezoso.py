@@ -0,0 +1,155 @@
+import struct
+
+import numpy as np
+
+from importacion_perezosa import importar_perezoso, disponible
+
+sio = importar_perezoso('scipy.io')
+# h5py solo es necesario para archivos MAT v7.3
+h5py = importar_perezoso('h5py') if disponible('h5py') else None
+
+# Tipos de datos de MAT v5 que se pueden mapear directamente a NumPy
+_TIPOS_MAT5 = {
+    1: 'i1', 2: 'u1', 3: 'i2', 4: 'u2', 5: 'i4', 6: 'u4',
+    7: 'f4', 9: 'f8', 12: 'i8', 13: 'u8',
+}
+_MI_MATRIX = 14
+_MI_COMPRESSED = 15
+# Clases numéricas de MATLAB (mxDOUBLE_CLASS ... mxUINT64_CLASS)
+_CLASES_NUMERICAS = range(6, 16)
+
+
+def es_mat_v73(file_path):
+    """
+    Indica si el archivo es un MAT v7.3 (basado en HDF5).
+
+    :param file_path: Ruta al archivo .mat.
+    :return: True si el encabezado corresponde a un archivo HDF5.
+    """
+    with open(file_path, 'rb') as f:
+        encabezado = f.read(128)
+    return b'MATLAB 7.3' in encabezado
+
+
+def leer_encabezado(file_path):
+    """
+    Lista las matrices del archivo sin leer sus datos.
+
+    :param file_path: Ruta al archivo .mat.
+    :return: Diccionario {nombre: (forma, clase)}.
+    """
+    if es_mat_v73(file_path):
+        if h5py is None:
+            raise ImportError("Se necesita h5py para leer archivos MAT v7.3.")
+        info = {}
+        with h5py.File(file_path, 'r') as f:
+            for nombre, obj in f.items():
+                if isinstance(obj, h5py.Dataset) and not nombre.startswith('#'):
+                    # MATLAB guarda las matrices en orden de columnas: se invierte la forma
+                    info[nombre] = (tuple(reversed(obj.shape)), str(obj.dtype))
+        return info
+    return {nombre: (tuple(forma), clase) for nombre, forma, clase in sio.whosmat(file_path)}
+
+
+def _leer_etiqueta(buffer, pos, orden):
+    """
+    Lee la etiqueta (tipo, bytes) de un elemento MAT v5, incluido el formato compacto.
+    """
+    tipo, num_bytes = struct.unpack_from(orden + 'II', buffer, pos)
+    if tipo >> 16:
+        # Elemento compacto: tipo y tamaño comparten los primeros 4 bytes
+        return tipo & 0xFFFF, tipo >> 16, pos + 4, pos + 8
+    fin = pos + 8 + num_bytes
+    return tipo, num_bytes, pos + 8, fin + (-fin % 8)
+
+
+def _buscar_desplazamientos(file_path):
+    """
+    Recorre los elementos de nivel superior de un MAT v5 y devuelve, para cada
+    matriz numérica real sin comprimir, el desplazamiento y la forma de sus datos.
+    """
+    desplazamientos = {}
+    with open(file_path, 'rb') as f:
+        encabezado = f.read(128)
+        orden = '<' if encabezado[126:128] == b'IM' else '>'
+        pos = 128
+        while True:
+            f.seek(pos)
+            etiqueta = f.read(8)
+            if len(etiqueta) < 8:
+                break
+            tipo, num_bytes = struct.unpack(orden + 'II', etiqueta)
+            siguiente = pos + 8 + num_bytes
+            if tipo == _MI_MATRIX:
+                # Solo se leen los subelementos de cabecera, no los datos
+                cabecera = f.read(min(num_bytes, 512))
+                try:
+                    _, _, ini, sig = _leer_etiqueta(cabecera, 0, orden)
+                    banderas = struct.unpack_from(orden + 'I', cabecera, ini)[0]
+                    clase, es_complejo = banderas & 0xFF, banderas & 0x0800
+                    _, n, ini, sig = _leer_etiqueta(cabecera, sig, orden)
+                    forma = struct.unpack_from(orden + 'i' * (n // 4), cabecera, ini)
+                    _, n, ini, sig = _leer_etiqueta(cabecera, sig, orden)
+                    nombre = cabecera[ini:ini + n].decode('latin1')
+                    tipo_datos, n, ini, _ = _leer_etiqueta(cabecera, sig, orden)
+                except struct.error:
+                    pos = siguiente
+                    continue
+                if clase in _CLASES_NUMERICAS and not es_complejo and tipo_datos in _TIPOS_MAT5:
+                    dtype = np.dtype(orden + _TIPOS_MAT5[tipo_datos])
+                    if n == dtype.itemsize * int(np.prod(forma)):
+                        desplazamientos[nombre] = (pos + 8 + ini, dtype, tuple(forma))
+            pos = siguiente + (-siguiente % 8) if tipo != _MI_COMPRESSED else siguiente
+    return desplazamientos
+
+
+class _VistaHDF5:
+    """
+    Vista perezosa de un dataset HDF5 que expone la forma de MATLAB
+    (canales x muestras x épocas) y solo lee las porciones indexadas.
+    """
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.shape = tuple(reversed(dataset.shape))
+        self.ndim = len(self.shape)
+        self.dtype = dataset.dtype
+
+    def __getitem__(self, indices):
+        if not isinstance(indices, tuple):
+            indices = (indices,)
+        if Ellipsis in indices:
+            pos = indices.index(Ellipsis)
+            relleno = (slice(None),) * (self.ndim - len(indices) + 1)
+            indices = indices[:pos] + relleno + indices[pos + 1:]
+        indices = indices + (slice(None),) * (self.ndim - len(indices))
+        # El dataset está en orden inverso: se invierten los índices y el resultado
+        return np.asarray(self.dataset[tuple(reversed(indices))]).T
+
+    def __array__(self, dtype=None, copy=None):
+        datos = self.dataset[()].T
+        return datos.astype(dtype) if dtype is not None else datos
+
+    def __len__(self):
+        return self.shape[0]
+
+
+def abrir_matriz(file_path, nombre, archivo_h5=None):
+    """
+    Devuelve una vista perezosa de una matriz del archivo.
+
+    Para MAT v7.3 se usa el dataset HDF5; para MAT v5 sin comprimir se usa
+    np.memmap. Si la matriz está comprimida solo se carga esa variable.
+
+    :param file_path: Ruta al archivo .mat.
+    :param nombre: Nombre de la matriz.
+    :param archivo_h5: Archivo h5py ya abierto (solo para v7.3).
+    :return: Objeto indexable con atributo shape.
+    """
+    if archivo_h5 is not None:
+        return _VistaHDF5(archivo_h5[nombre])
+    desplazamientos = _buscar_desplazamientos(file_path)
+    if nombre in desplazamientos:
+        offset, dtype, forma = desplazamientos[nombre]
+        return np.memmap(file_path, dtype=dtype, mode='r', offset=offset, shape=forma, order='F')
+    return sio.loadmat(file_path, variable_names=[nombre])[nombre]
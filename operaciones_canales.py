@@ -0,0 +1,117 @@
+import numpy as np
+
+
+def _como_slice(epocas, num_epocas):
+    """
+    Convierte la selección de épocas en un slice para que cada canal se lea
+    como vista (sin copia). Las listas de épocas se dejan como índices.
+    """
+    if epocas is None:
+        return slice(None)
+    if isinstance(epocas, (int, np.integer)):
+        epocas = int(epocas) % num_epocas
+        return slice(epocas, epocas + 1)
+    return epocas
+
+
+class Operaciones_Canales:
+    """
+    Operaciones entre canales de una matriz EEG (canales x muestras x épocas).
+
+    Cada operación recibe varios canales o pares a la vez, calcula solo las
+    épocas pedidas y escribe en un arreglo de salida que puede reutilizarse
+    entre llamadas. El ruido sale de un numpy.random.Generator con semilla,
+    de modo que los barridos son reproducibles.
+    """
+
+    def __init__(self, matriz, semilla=None):
+        """
+        :param matriz: Matriz EEG (también puede ser un memmap o vista perezosa).
+        :param semilla: Semilla o Generator para el ruido.
+        """
+        self.matriz = matriz
+        self.rng = semilla if isinstance(semilla, np.random.Generator) else np.random.default_rng(semilla)
+
+    def _canal(self, canal, epocas):
+        """
+        Devuelve un canal en las épocas pedidas (vista si epocas es un slice).
+        """
+        if isinstance(epocas, slice):
+            return self.matriz[canal, :, epocas]
+        # Con una lista de épocas se indexa en dos pasos para conservar el orden de los ejes
+        return np.asarray(self.matriz[canal])[:, epocas]
+
+    def _forma_salida(self, cantidad, epocas):
+        num_canales, num_muestras, num_epocas = self.matriz.shape
+        num_sel = len(range(num_epocas)[epocas]) if isinstance(epocas, slice) else len(epocas)
+        return (cantidad, num_muestras, num_sel)
+
+    def _salida(self, out, forma):
+        if out is None:
+            return np.empty(forma)
+        if out.shape != forma:
+            raise ValueError(f"El arreglo de salida debe tener forma {forma} y tiene {out.shape}.")
+        return out
+
+    def _binaria(self, ufunc, pares, epocas, out):
+        epocas = _como_slice(epocas, self.matriz.shape[2])
+        out = self._salida(out, self._forma_salida(len(pares), epocas))
+        for k, (a, b) in enumerate(pares):
+            ufunc(self._canal(a, epocas), self._canal(b, epocas), out=out[k])
+        return out
+
+    def resta(self, pares, epocas=None, out=None):
+        """
+        Calcula canal_a - canal_b para cada par.
+
+        :param pares: Lista de pares (canal_a, canal_b).
+        :param epocas: Época, slice o lista de épocas; por defecto todas.
+        :param out: Arreglo (pares x muestras x épocas) donde escribir el resultado.
+        :return: Arreglo con una fila por par.
+        """
+        return self._binaria(np.subtract, pares, epocas, out)
+
+    def multiplicacion(self, pares, epocas=None, out=None):
+        """
+        Calcula canal_a * canal_b para cada par.
+
+        :param pares: Lista de pares (canal_a, canal_b).
+        :param epocas: Época, slice o lista de épocas; por defecto todas.
+        :param out: Arreglo (pares x muestras x épocas) donde escribir el resultado.
+        :return: Arreglo con una fila por par.
+        """
+        return self._binaria(np.multiply, pares, epocas, out)
+
+    def con_ruido(self, canales, niveles, epocas=None, out=None):
+        """
+        Suma ruido gaussiano a varios canales con varios niveles a la vez.
+
+        :param canales: Lista de canales.
+        :param niveles: Lista de desviaciones estándar del ruido.
+        :param epocas: Época, slice o lista de épocas; por defecto todas.
+        :param out: Arreglo (canales x niveles x muestras x épocas) donde escribir.
+        :return: Arreglo con el canal más el ruido para cada canal y nivel.
+        """
+        epocas = _como_slice(epocas, self.matriz.shape[2])
+        forma = (len(canales), len(niveles)) + self._forma_salida(1, epocas)[1:]
+        out = self._salida(out, forma)
+        # El ruido se genera directamente en el arreglo de salida
+        self.rng.standard_normal(out=out)
+        out *= np.asarray(niveles, dtype=np.float64)[np.newaxis, :, np.newaxis, np.newaxis]
+        for k, canal in enumerate(canales):
+            out[k] += self._canal(canal, epocas)
+        return out
+
+    def nivel_para_snr(self, canal, snr_db, epocas=None):
+        """
+        Desviación estándar del ruido que produce la relación señal/ruido indicada.
+
+        :param canal: Canal de referencia.
+        :param snr_db: Relación señal/ruido en decibeles (uno o varios valores).
+        :param epocas: Épocas sobre las que se mide la potencia de la señal.
+        :return: Desviación estándar (o arreglo de ellas).
+        """
+        epocas = _como_slice(epocas, self.matriz.shape[2])
+        senal = np.asarray(self._canal(canal, epocas), dtype=np.float64)
+        rms = np.sqrt(np.mean(senal ** 2))
+        return rms / 10 ** (np.asarray(snr_db, dtype=np.float64) / 20)
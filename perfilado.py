@@ -0,0 +1,311 @@
+"""
+Medición de tiempos de las operaciones de Read_CSV y Read_Mat.
+
+Cuando está activo, cada método público de las clases y cada tramo marcado
+con ``tramo`` (pd.read_csv, sio.loadmat, los promedios del resumen EEG,
+seaborn, tight_layout, guardar la figura...) deja un registro con el tiempo
+real, el tiempo de CPU, la memoria pico (tracemalloc) y los bytes leídos y
+escritos por el proceso (con varios hilos, como en la precarga del menú,
+la memoria y los bytes son los de todo el proceso). Desactivado solo
+cuesta revisar una variable.
+
+Se activa con la variable de entorno PERFIL o con ``--perfil`` en main.py;
+el valor es el archivo de salida y su extensión elige el formato:
+
+    .jsonl  un registro JSON por línea
+    .json   perfil de speedscope (https://www.speedscope.app)
+    .prof   estadísticas de cProfile del proceso principal (pstats, snakeviz)
+
+Uso:
+    PERFIL=perfil.jsonl python main.py
+    python main.py --perfil perfil.json --csv "datos/*.csv" --operaciones nan
+"""
+import atexit
+import contextlib
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+from importacion_perezosa import importar_perezoso, disponible
+
+psutil = importar_perezoso('psutil') if disponible('psutil') else None
+
+VARIABLE_ENTORNO = 'PERFIL'
+
+_activo = False
+_salida = None
+_perfilador = None  # cProfile.Profile si la salida es .prof
+_registros = []
+_hilos = threading.local()  # Tramos abiertos de cada hilo (ver _pila)
+_NULO = contextlib.nullcontext()
+
+
+def activo():
+    return _activo
+
+
+def _pila():
+    """
+    Tramos abiertos en el hilo actual: [memoria al entrar, pico de los tramos internos].
+    """
+    if not hasattr(_hilos, 'pila'):
+        _hilos.pila = []
+    return _hilos.pila
+
+
+def _bytes_es():
+    """
+    Bytes leídos y escritos por el proceso hasta ahora (None si no se pueden saber).
+    """
+    try:
+        with open('/proc/self/io', encoding='ascii') as f:
+            contadores = dict(linea.split(': ') for linea in f.read().splitlines())
+        return int(contadores['rchar']), int(contadores['wchar'])
+    except (OSError, KeyError, ValueError):
+        pass
+    if psutil is not None:
+        io = psutil.Process().io_counters()
+        return io.read_bytes, io.write_bytes
+    return None, None
+
+
+def activar(salida=None):
+    """
+    Empieza a registrar. La salida se escribe al terminar el programa.
+
+    :param salida: Archivo .jsonl, .json (speedscope) o .prof (cProfile);
+                   sin salida los registros solo quedan en memoria.
+    """
+    global _activo, _salida, _perfilador
+    if _activo:
+        return
+    _activo, _salida = True, salida
+    if salida is not None:
+        # Los procesos de los lotes heredan la variable y también registran
+        os.environ[VARIABLE_ENTORNO] = salida
+        if salida.endswith('.prof'):
+            import cProfile
+            _perfilador = cProfile.Profile()
+            _perfilador.enable()
+        atexit.register(guardar)
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def desactivar():
+    global _activo, _perfilador
+    _activo = False
+    if _perfilador is not None:
+        _perfilador.disable()
+    _pila().clear()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+@contextlib.contextmanager
+def _medir(nombre):
+    pila = _pila()
+    memoria, pico = tracemalloc.get_traced_memory()
+    if pila:
+        pila[-1][1] = max(pila[-1][1], pico)
+    tracemalloc.reset_peak()
+    propio = [memoria, 0]
+    pila.append(propio)
+    leidos, escritos = _bytes_es()
+    inicio_epoca, inicio, cpu = time.time(), time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        segundos, cpu = time.perf_counter() - inicio, time.process_time() - cpu
+        leidos_fin, escritos_fin = _bytes_es()
+        _, pico = tracemalloc.get_traced_memory()
+        # Se busca por identidad: un generador abandonado puede cerrarse después de otros tramos
+        for i in range(len(pila) - 1, -1, -1):
+            if pila[i] is propio:
+                del pila[i]
+                break
+        pico = max(pico, propio[1])
+        if pila:
+            pila[-1][1] = max(pila[-1][1], pico)
+        _registros.append({
+            'nombre': nombre,
+            'pid': os.getpid(),
+            'inicio': inicio_epoca,
+            'reloj': inicio,  # perf_counter: ordena los tramos del mismo proceso sin saltos del reloj
+            'segundos': segundos,
+            'cpu_segundos': cpu,
+            'memoria_pico_mb': round(max(0, pico - memoria) / 1024 ** 2, 3),
+            'bytes_leidos': None if leidos is None else leidos_fin - leidos,
+            'bytes_escritos': None if escritos is None else escritos_fin - escritos,
+            'hilo': threading.current_thread().name,
+            'profundidad': len(pila),
+        })
+
+
+def tramo(nombre):
+    """
+    Contexto que registra un tramo de código dentro de una operación::
+
+        with perfilado.tramo('pd.read_csv'):
+            data = pd.read_csv(ruta)
+    """
+    return _medir(nombre) if _activo else _NULO
+
+
+def medir(funcion, nombre=None):
+    """
+    Decorador que registra cada llamada a la función.
+
+    En las funciones generadoras (como Read_Mat.iterar_epocas) el tramo va
+    desde el primer valor pedido hasta que se agota o se cierra el
+    generador, e incluye lo que haga quien lo recorre entre valores.
+    """
+    nombre = nombre or funcion.__qualname__
+
+    if inspect.isgeneratorfunction(funcion):
+        @functools.wraps(funcion)
+        def generador(*args, **kwargs):
+            if not _activo:
+                return (yield from funcion(*args, **kwargs))
+            with _medir(nombre):
+                return (yield from funcion(*args, **kwargs))
+        return generador
+
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        if not _activo:
+            return funcion(*args, **kwargs)
+        with _medir(nombre):
+            return funcion(*args, **kwargs)
+    return envoltura
+
+
+def instrumentar(clase):
+    """
+    Decorador de clase que aplica ``medir`` a todos sus métodos públicos.
+    """
+    for nombre, valor in list(vars(clase).items()):
+        if inspect.isfunction(valor) and not nombre.startswith('_'):
+            setattr(clase, nombre, medir(valor))
+    return clase
+
+
+def registros():
+    """
+    Copia de los registros tomados hasta ahora.
+    """
+    return list(_registros)
+
+
+def extraer():
+    """
+    Devuelve los registros de este proceso y los borra (los procesos de un
+    lote se los pasan así al proceso principal). Los heredados del proceso
+    padre al crear el proceso se descartan.
+    """
+    pid = os.getpid()
+    tomados = [r for r in _registros if r['pid'] == pid]
+    _registros.clear()
+    return tomados
+
+
+def agregar(otros):
+    """
+    Suma registros tomados en otro proceso.
+    """
+    _registros.extend(otros)
+
+
+def resumen(lista=None):
+    """
+    Tiempo total, número de llamadas y memoria pico por nombre, de mayor a menor tiempo.
+    """
+    totales = {}
+    for r in _registros if lista is None else lista:
+        t = totales.setdefault(r['nombre'], {'llamadas': 0, 'segundos': 0.0, 'cpu_segundos': 0.0,
+                                             'memoria_pico_mb': 0.0})
+        t['llamadas'] += 1
+        t['segundos'] += r['segundos']
+        t['cpu_segundos'] += r['cpu_segundos']
+        t['memoria_pico_mb'] = max(t['memoria_pico_mb'], r['memoria_pico_mb'])
+    return dict(sorted(totales.items(), key=lambda par: -par[1]['segundos']))
+
+
+def a_speedscope(lista, nombre='perfil'):
+    """
+    Convierte los registros al formato de speedscope: un perfil por proceso
+    e hilo con eventos de apertura y cierre de cada tramo.
+    """
+    marcos, posicion = [], {}
+    perfiles = []
+    for pid, hilo in sorted({(r['pid'], r['hilo']) for r in lista}):
+        propios = [r for r in lista if r['pid'] == pid and r['hilo'] == hilo]
+        origen = min(r['reloj'] for r in propios)
+        eventos = []
+        for r in propios:
+            if r['nombre'] not in posicion:
+                posicion[r['nombre']] = len(marcos)
+                marcos.append({'name': r['nombre']})
+            marco, inicio = posicion[r['nombre']], r['reloj'] - origen
+            # Al mismo instante se abren primero los externos y se cierran primero los internos
+            eventos.append((inicio, 1, r['profundidad'], {'type': 'O', 'frame': marco, 'at': inicio}))
+            eventos.append((inicio + r['segundos'], 0, -r['profundidad'],
+                            {'type': 'C', 'frame': marco, 'at': inicio + r['segundos']}))
+        eventos.sort(key=lambda e: e[:3])
+        perfiles.append({'type': 'evented', 'name': f'pid {pid} {hilo}', 'unit': 'seconds', 'startValue': 0,
+                         'endValue': max(e[0] for e in eventos), 'events': [e[3] for e in eventos]})
+    return {'$schema': 'https://www.speedscope.app/file-format-schema.json', 'name': nombre,
+            'shared': {'frames': marcos}, 'profiles': perfiles}
+
+
+def guardar(salida=None):
+    """
+    Escribe los registros en el formato que indica la extensión de la salida.
+
+    Los procesos de un lote (que heredan PERFIL) no escriben: sus registros
+    los junta el proceso principal.
+
+    :return: Ruta escrita o None.
+    """
+    salida = salida or _salida
+    if salida is None:
+        return None
+    if salida.endswith('.prof'):
+        if _perfilador is None:
+            return None
+        _perfilador.disable()
+        _perfilador.dump_stats(salida)
+    elif salida.endswith('.jsonl'):
+        with open(salida, 'w', encoding='utf-8') as f:
+            for r in _registros:
+                f.write(json.dumps(r, ensure_ascii=False) + '\n')
+    else:
+        with open(salida, 'w', encoding='utf-8') as f:
+            json.dump(a_speedscope(_registros, os.path.basename(salida)), f, ensure_ascii=False)
+    print(f"Perfil guardado en: {salida}")
+    return salida
+
+
+def _desde_entorno():
+    """
+    Activa el registro si la variable PERFIL está definida. En un proceso
+    de un lote solo se registra; el principal es el que escribe.
+    """
+    salida = os.environ.get(VARIABLE_ENTORNO)
+    if not salida:
+        return
+    import multiprocessing
+    if multiprocessing.parent_process() is None:
+        activar(salida)
+    else:
+        global _activo
+        _activo = True
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+
+_desde_entorno()
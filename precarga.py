@@ -0,0 +1,135 @@
+"""
+Precarga en segundo plano de los archivos del menú.
+
+Mientras el menú espera una opción, los archivos de las listas se cargan en
+hilos. Al elegir un archivo se toma el lector ya cargado (o se espera el que
+está en curso) en lugar de empezar a leerlo. Como mucho se guardan
+``max_datos`` archivos precargados; al tomar uno se empieza el siguiente.
+
+Los mensajes de las cargas en segundo plano no se mezclan con el menú: se
+guardan y se muestran cuando se elige el archivo.
+"""
+import io
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Número de archivos precargados que se mantienen en memoria a la vez
+MAX_PRECARGAS = 2
+
+
+class _SalidaPorHilo:
+    """
+    Sustituto de sys.stdout que guarda aparte lo que imprimen los hilos de
+    precarga y deja pasar lo demás.
+    """
+
+    def __init__(self, original):
+        self.original = original
+        self.buffers = {}  # identificador de hilo -> StringIO
+
+    def write(self, texto):
+        return self.buffers.get(threading.get_ident(), self.original).write(texto)
+
+    def flush(self):
+        self.original.flush()
+
+    def __getattr__(self, atributo):
+        return getattr(self.original, atributo)
+
+
+def _cargar(tipo, ruta, cache, salida):
+    from clases import Read_CSV, Read_Mat
+
+    buffer = io.StringIO()
+    salida.buffers[threading.get_ident()] = buffer
+    try:
+        if tipo == 'csv':
+            lector = Read_CSV(ruta, cache=cache)
+            lector.load_csv()
+        else:
+            lector = Read_Mat(ruta, cache=cache)
+            lector.load_mat()
+    finally:
+        del salida.buffers[threading.get_ident()]
+    return lector, buffer.getvalue()
+
+
+class Precarga:
+    """
+    Carga en hilos los archivos candidatos y entrega los lectores listos.
+
+    Mientras está abierta, sys.stdout se sustituye para separar los mensajes
+    de los hilos; se restaura al cerrarla (al salir del with, también si hay
+    una excepción o sys.exit).
+
+    Uso:
+        with Precarga(archivos_csv, archivos_mat, cache=cache) as precarga:
+            lector = precarga.obtener('csv', ruta)  # Ya cargado o esperando la carga en curso
+    """
+
+    def __init__(self, rutas_csv=(), rutas_mat=(), cache=None, max_datos=MAX_PRECARGAS):
+        """
+        :param rutas_csv: Archivos CSV que se pueden elegir.
+        :param rutas_mat: Archivos MAT que se pueden elegir.
+        :param cache: Instancia de Cache_Disco que usan los lectores.
+        :param max_datos: Máximo de archivos precargados (o cargándose) a la
+                          vez; 0 desactiva la precarga.
+        """
+        self.cache = cache
+        self.max_datos = max_datos
+        # Se alternan CSV y MAT para tener pronto uno de cada tipo
+        candidatos = []
+        for i in range(max(len(rutas_csv), len(rutas_mat))):
+            candidatos += [('csv', r) for r in rutas_csv[i:i + 1]] + [('mat', r) for r in rutas_mat[i:i + 1]]
+        self.pendientes = candidatos  # Aún no precargados, en orden
+        self.en_curso = {}  # (tipo, ruta) -> Future con (lector, mensajes)
+        self.pool = ThreadPoolExecutor(max_workers=max(1, max_datos), thread_name_prefix='precarga')
+        self._salida = _SalidaPorHilo(sys.stdout)
+        sys.stdout = self._salida
+        self._rellenar()
+
+    def _rellenar(self):
+        while self.pendientes and len(self.en_curso) < self.max_datos:
+            tipo, ruta = self.pendientes.pop(0)
+            self.en_curso[(tipo, ruta)] = self.pool.submit(_cargar, tipo, ruta, self.cache, self._salida)
+
+    def obtener(self, tipo, ruta):
+        """
+        Devuelve el lector del archivo cargado.
+
+        Si estaba precargado se entrega (esperando si la carga sigue en
+        curso) y se empieza a precargar el siguiente candidato; si no, se
+        carga en ese momento.
+
+        :param tipo: 'csv' o 'mat'.
+        :param ruta: Archivo elegido.
+        :return: Read_CSV o Read_Mat.
+        """
+        futuro = self.en_curso.pop((tipo, ruta), None)
+        if (tipo, ruta) in self.pendientes:
+            self.pendientes.remove((tipo, ruta))
+        if futuro is None:
+            lector, mensajes = _cargar(tipo, ruta, self.cache, self._salida)
+        else:
+            if not futuro.done():
+                print("Esperando a que termine la carga en segundo plano...")
+            lector, mensajes = futuro.result()
+        print(mensajes, end='')
+        self._rellenar()
+        return lector
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+    def cerrar(self):
+        """
+        Cancela las precargas pendientes y devuelve sys.stdout a su estado.
+        """
+        self.pendientes = []
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        if sys.stdout is self._salida:
+            sys.stdout = self._salida.original
@@ -0,0 +1,194 @@
+import numpy as np
+
+# Tamaño aproximado de cada bloque de épocas que se procesa a la vez
+BYTES_POR_BLOQUE = 64 * 1024 ** 2
+
+
+class Resumen_EEG:
+    """
+    Resultado compacto de las reducciones de una matriz EEG.
+
+    Las matrices tienen forma (canales, muestras, épocas) o, para un lote de
+    sujetos, (sujetos, canales, muestras, épocas). En el segundo caso cada
+    atributo conserva el eje de sujetos al inicio.
+
+    Atributos:
+        promedio_epocas: Promedio sobre las épocas (canales x muestras).
+        promedio_canales: Promedio sobre los canales (muestras x épocas).
+        promedio_tiempo: Promedio sobre las muestras (canales x épocas).
+        varianza, minimo, maximo: Estadísticos por canal.
+    """
+
+    def __init__(self, forma, promedio_epocas, promedio_canales, promedio_tiempo,
+                 varianza, minimo, maximo, nombre=None):
+        self.forma = forma
+        self.promedio_epocas = promedio_epocas
+        self.promedio_canales = promedio_canales
+        self.promedio_tiempo = promedio_tiempo
+        self.varianza = varianza
+        self.minimo = minimo
+        self.maximo = maximo
+        self.nombre = nombre
+
+    @property
+    def num_canales(self):
+        return self.forma[-3]
+
+    @property
+    def num_muestras(self):
+        return self.forma[-2]
+
+    @property
+    def num_epocas(self):
+        return self.forma[-1]
+
+    @property
+    def es_lote(self):
+        return len(self.forma) == 4
+
+    def sujeto(self, i):
+        """
+        Devuelve el resumen de un solo sujeto de un lote.
+
+        :param i: Índice del sujeto.
+        """
+        if not self.es_lote:
+            return self
+        return Resumen_EEG(self.forma[1:], self.promedio_epocas[i], self.promedio_canales[i],
+                           self.promedio_tiempo[i], self.varianza[i], self.minimo[i],
+                           self.maximo[i], self.nombre)
+
+
+class Estadistica_En_Linea:
+    """
+    Media, varianza y extremos a lo largo de las épocas, actualizados bloque a
+    bloque con el algoritmo de Welford (en su versión por bloques de Chan).
+
+    Solo guarda arreglos del tamaño de una época (canales x muestras), sin
+    importar cuántas épocas se procesen.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.media = None
+        self.m2 = None
+        self.minimo = None
+        self.maximo = None
+
+    def actualizar(self, bloque):
+        """
+        Incorpora un bloque de épocas (canales x muestras x épocas).
+
+        :param bloque: Arreglo con una o más épocas en el último eje.
+        """
+        bloque = np.asarray(bloque, dtype=np.float64)
+        if bloque.ndim == 2:
+            bloque = bloque[..., np.newaxis]
+        n_b = bloque.shape[-1]
+        if n_b == 0:
+            return
+        media_b = bloque.mean(axis=-1)
+        m2_b = ((bloque - media_b[..., np.newaxis]) ** 2).sum(axis=-1)
+        if self.n == 0:
+            self.n, self.media, self.m2 = n_b, media_b, m2_b
+            self.minimo, self.maximo = bloque.min(axis=-1), bloque.max(axis=-1)
+            return
+        total = self.n + n_b
+        delta = media_b - self.media
+        self.media += delta * (n_b / total)
+        self.m2 += m2_b + delta ** 2 * (self.n * n_b / total)
+        self.n = total
+        np.minimum(self.minimo, bloque.min(axis=-1), out=self.minimo)
+        np.maximum(self.maximo, bloque.max(axis=-1), out=self.maximo)
+
+    @property
+    def varianza(self):
+        """
+        Varianza poblacional a lo largo de las épocas.
+        """
+        return self.m2 / self.n if self.n else None
+
+
+def calcular_resumen(matriz, nombre=None, bloque_epocas=None):
+    """
+    Calcula todas las reducciones que usan las gráficas en un solo recorrido.
+
+    La matriz se recorre por bloques de épocas; cada bloque se lee una sola
+    vez (también si es un memmap o una vista perezosa) y de él se obtienen
+    todos los promedios, la varianza y los extremos por canal.
+
+    :param matriz: Matriz de 3 dimensiones (canales x muestras x épocas) o de
+                   4 dimensiones (sujetos x canales x muestras x épocas).
+    :param nombre: Nombre de la matriz, para los títulos de las gráficas.
+    :param bloque_epocas: Épocas por bloque. Por defecto se calcula para que
+                          cada bloque ocupe unos BYTES_POR_BLOQUE.
+    :return: Instancia de Resumen_EEG.
+    """
+    forma = tuple(matriz.shape)
+    if len(forma) not in (3, 4):
+        raise ValueError(f"Se esperaba una matriz de 3 o 4 dimensiones y se recibió {forma}.")
+    lote = len(forma) == 4
+    sujetos = forma[0] if lote else 1
+    canales, muestras, epocas = forma[-3:]
+
+    if bloque_epocas is None:
+        bytes_epoca = sujetos * canales * muestras * 8
+        bloque_epocas = max(1, BYTES_POR_BLOQUE // max(bytes_epoca, 1))
+
+    suma_epocas = np.zeros((sujetos, canales, muestras))
+    promedio_canales = np.empty((sujetos, muestras, epocas))
+    promedio_tiempo = np.empty((sujetos, canales, epocas))
+    varianza_epoca = np.empty((sujetos, canales, epocas))
+    minimo = np.full((sujetos, canales), np.inf)
+    maximo = np.full((sujetos, canales), -np.inf)
+
+    for ini in range(0, epocas, bloque_epocas):
+        fin = min(ini + bloque_epocas, epocas)
+        bloque = np.asarray(matriz[..., ini:fin], dtype=np.float64)
+        if not lote:
+            bloque = bloque[np.newaxis]
+        suma_epocas += bloque.sum(axis=3)
+        promedio_canales[:, :, ini:fin] = bloque.mean(axis=1)
+        media = bloque.mean(axis=2)
+        promedio_tiempo[:, :, ini:fin] = media
+        varianza_epoca[:, :, ini:fin] = bloque.var(axis=2)
+        np.minimum(minimo, bloque.min(axis=(2, 3)), out=minimo)
+        np.maximum(maximo, bloque.max(axis=(2, 3)), out=maximo)
+
+    # Todas las épocas tienen las mismas muestras: la varianza total por canal es
+    # la media de las varianzas por época más la varianza de sus medias
+    varianza = varianza_epoca.mean(axis=2) + promedio_tiempo.var(axis=2)
+
+    resultados = [suma_epocas / epocas, promedio_canales, promedio_tiempo, varianza, minimo, maximo]
+    if not lote:
+        resultados = [r[0] for r in resultados]
+    return Resumen_EEG(forma, *resultados, nombre=nombre)
+
+
+def apilar_sujetos(lectores, nombre=None):
+    """
+    Apila la misma matriz de varios sujetos en una matriz de 4 dimensiones.
+
+    :param lectores: Lista de instancias de Read_Mat ya cargadas.
+    :param nombre: Nombre de la matriz; por defecto, la primera de cada archivo.
+    :return: Matriz (sujetos x canales x muestras x épocas).
+    """
+    matrices = [l.get_matrix(nombre if nombre is not None else l.matrix_names[0]) for l in lectores]
+    formas = {tuple(m.shape) for m in matrices}
+    if len(formas) != 1:
+        raise ValueError(f"Las matrices de los sujetos tienen formas distintas: {sorted(formas)}.")
+    apilada = np.empty((len(matrices),) + formas.pop())
+    for i, m in enumerate(matrices):
+        apilada[i] = m
+    return apilada
+
+
+def resumir_sujetos(lectores, nombre=None):
+    """
+    Calcula el resumen de un lote de sujetos de una sola vez.
+
+    :param lectores: Lista de instancias de Read_Mat ya cargadas.
+    :param nombre: Nombre de la matriz; por defecto, la primera de cada archivo.
+    :return: Instancia de Resumen_EEG con el eje de sujetos al inicio.
+    """
+    return calcular_resumen(apilar_sujetos(lectores, nombre), nombre=nombre)
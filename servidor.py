@@ -0,0 +1,335 @@
+"""
+Servidor de sesión local que mantiene los datos cargados entre consultas.
+
+Los archivos CSV y MAT se cargan una sola vez y quedan en memoria; cuando
+se supera el presupuesto de memoria se descartan los usados hace más tiempo
+(LRU). Los clientes envían operaciones en JSON por HTTP a localhost.
+
+Solo se aceptan peticiones application/json, sin origen o con origen
+local, y con la clave de la sesión que se muestra al iniciar (y se guarda
+en un archivo que solo puede leer el usuario). Las salidas se escriben
+dentro de la carpeta indicada con --salida.
+
+Uso:
+    python servidor.py --puerto 8765 --memoria-mb 2048 --salida resultados
+
+Desde Python, con el cliente (cliente.py), que no carga los datos ni matplotlib:
+    from cliente import enviar
+    enviar('nan', archivo='MMSE 1.csv')
+"""
+import argparse
+import contextlib
+import hmac
+import io
+import json
+import os
+import secrets
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import numpy as np
+
+import columnas_derivadas
+from cliente import PUERTO, ENCABEZADO_CLAVE, archivo_clave, enviar  # enviar sigue disponible como servidor.enviar
+
+
+def _memoria(lector):
+    """
+    Memoria aproximada (en bytes) de los datos de un lector.
+    Los memmap y las vistas perezosas no cuentan porque viven en disco.
+    """
+    from clases import Read_CSV
+
+    if isinstance(lector, Read_CSV):
+        return int(lector.data.memory_usage(deep=True).sum()) if lector.data is not None else 0
+    total = 0
+    for valor in (lector.data or {}).values():
+        if isinstance(valor, np.ndarray) and not isinstance(valor, np.memmap):
+            total += valor.nbytes
+    return total
+
+
+def _a_json(valor):
+    if isinstance(valor, np.ndarray):
+        return valor.tolist()
+    if isinstance(valor, (np.integer, np.floating)):
+        return valor.item()
+    if hasattr(valor, 'to_dict'):
+        return valor.to_dict()
+    raise TypeError(f"No se puede convertir {type(valor).__name__} a JSON.")
+
+
+class Sesion:
+    """
+    Conjunto de lectores cargados, con desalojo LRU por presupuesto de memoria.
+    """
+
+    def __init__(self, memoria_max=2 * 1024 ** 3, carpeta_salida='.'):
+        """
+        :param memoria_max: Memoria máxima (bytes) que pueden ocupar los datos.
+        :param carpeta_salida: Carpeta donde se escriben todas las salidas.
+        """
+        self.memoria_max = memoria_max
+        self.carpeta_salida = os.path.realpath(carpeta_salida)
+        self.lectores = OrderedDict()  # ruta absoluta -> (lector, bytes)
+
+    def obtener(self, archivo, lazy=False):
+        """
+        Devuelve el lector del archivo, cargándolo solo si no está en memoria.
+        """
+        from clases import Read_CSV, Read_Mat
+
+        clave = os.path.abspath(archivo)
+        if clave in self.lectores:
+            self.lectores.move_to_end(clave)
+            return self.lectores[clave][0]
+
+        if clave.lower().endswith('.mat'):
+            lector = Read_Mat(clave, lazy=lazy)
+            lector.load_mat()
+            cargado = lector.data is not None
+        else:
+            lector = Read_CSV(clave)
+            lector.load_csv()
+            cargado = lector.data is not None
+        if not cargado:
+            raise ValueError(f"No se pudo cargar el archivo {archivo}.")
+
+        self.lectores[clave] = (lector, _memoria(lector))
+        self.desalojar()
+        return lector
+
+    def actualizar_memoria(self, archivo):
+        clave = os.path.abspath(archivo)
+        if clave in self.lectores:
+            lector = self.lectores[clave][0]
+            self.lectores[clave] = (lector, _memoria(lector))
+            self.desalojar()
+
+    def desalojar(self):
+        """
+        Descarta los lectores usados hace más tiempo hasta respetar el presupuesto.
+        El último lector usado nunca se descarta.
+        """
+        while len(self.lectores) > 1 and sum(b for _, b in self.lectores.values()) > self.memoria_max:
+            self.descargar(next(iter(self.lectores)))
+
+    def descargar(self, archivo):
+        """
+        Quita un lector de la sesión y cierra sus archivos (memmap, HDF5).
+        """
+        lector, _ = self.lectores.pop(os.path.abspath(archivo), (None, 0))
+        if hasattr(lector, 'cerrar'):
+            lector.cerrar()
+
+    def ruta_salida(self, ruta):
+        """
+        Ruta de una salida dentro de la carpeta de salida. Se rechazan las que
+        salen de ella (rutas absolutas ajenas, '..' o enlaces simbólicos).
+        """
+        completa = os.path.realpath(os.path.join(self.carpeta_salida, ruta))
+        if os.path.commonpath([completa, self.carpeta_salida]) != self.carpeta_salida:
+            raise ValueError(f"La salida {ruta} está fuera de la carpeta {self.carpeta_salida}.")
+        os.makedirs(os.path.dirname(completa), exist_ok=True)
+        return completa
+
+    def estado(self):
+        return [{'archivo': clave, 'bytes': b} for clave, (_, b) in self.lectores.items()]
+
+    def ejecutar(self, operacion, params):
+        """
+        Ejecuta una operación sobre los datos en memoria.
+
+        :param operacion: Nombre de la operación.
+        :param params: Parámetros de la operación (incluye 'archivo').
+        :return: Resultado serializable a JSON.
+        """
+        if operacion == 'estado':
+            return self.estado()
+        if operacion == 'descargar':
+            self.descargar(params['archivo'])
+            return self.estado()
+
+        archivo = params['archivo']
+        lector = self.obtener(archivo, params.get('lazy', False))
+
+        if operacion == 'columnas':
+            return lector.obtener_columnas()
+        if operacion == 'matrices':
+            return {n: list(lector.get_matrix(n).shape) for n in lector.matrix_names}
+        if operacion == 'recargar':
+            nuevas = lector.recargar()
+            self.actualizar_memoria(archivo)
+            return {'filas_nuevas': nuevas, 'filas': len(lector.data)}
+        if operacion == 'nan':
+            conteo = lector.mascara_nulos().por_columna()
+            if params.get('limpiar'):
+                lector.nan_counter_and_cleanup()
+                self.actualizar_memoria(archivo)
+            return {'por_columna': conteo.to_dict(), 'total': int(conteo.sum()), 'filas': len(lector.data)}
+        if operacion == 'imputar':
+            conteo = lector.imputar_nulos(params['estrategia'], params.get('columnas'), params.get('por'))
+            self.actualizar_memoria(archivo)
+            return {'imputados': conteo}
+        if operacion == 'deshacer':
+            hecho = lector.deshacer()
+            self.actualizar_memoria(archivo)
+            return {'deshecho': hecho, 'filas': len(lector.data)}
+        if operacion == 'filtrar':
+            # En JSON los rangos se escriben como {"min": a, "max": b}
+            condiciones = {c: (v['min'], v['max']) if isinstance(v, dict) else v
+                           for c, v in params['condiciones'].items()}
+            filas = lector.filtrar(condiciones)
+            if filas is None:
+                raise ValueError("No se pudo aplicar el filtro.")
+            limite = params.get('limite', 100)
+            return {'filas': len(filas), 'datos': filas.head(limite).reset_index().to_dict('records')}
+        if operacion == 'agrupar':
+            return lector.agregar(params['por'], params['columna']).to_dict('index')
+        if operacion == 'estadisticas':
+            por = params.get('por')
+            resumen = lector.estadisticas(params.get('columnas'), por, params.get('workers'))
+            if resumen is None:
+                raise ValueError("No se pudieron calcular las estadísticas.")
+            if por is None:
+                return resumen.to_dict()
+            # Un resumen (columna -> estadísticas) por grupo
+            return {str(g): resumen.loc[g].T.to_dict() for g in resumen.index.unique(level=0)}
+        if operacion == 'correlacion':
+            matriz = lector.correlacion(params.get('columnas'), params.get('metodo', 'pearson'),
+                                        params.get('workers'))
+            if matriz is None:
+                raise ValueError("No se pudo calcular la correlación.")
+            return matriz.to_dict()
+        if operacion == 'multiplicar':
+            salida = self.ruta_salida(params['salida'])
+            if not lector.multiplicar_columnas_y_guardar(params['col1'], params['col2'], salida):
+                raise ValueError(f"No se pudo multiplicar '{params['col1']}' por '{params['col2']}'.")
+            self.actualizar_memoria(archivo)
+            return {'salida': salida}
+        if operacion == 'derivar':
+            definiciones = columnas_derivadas.parsear_definiciones(params['definiciones'])
+            salida = self.ruta_salida(params['salida']) if params.get('salida') else None
+            if not lector.derivar_columnas(definiciones, salida):
+                raise ValueError("No se pudieron calcular las columnas derivadas.")
+            self.actualizar_memoria(archivo)
+            return {'columnas': list(definiciones), 'salida': salida}
+        if operacion == 'exportar':
+            salida = self.ruta_salida(params['salida'])
+            if not lector.exportar(salida, params.get('formato'), params.get('particionar_por')):
+                raise ValueError(f"No se pudieron exportar los datos a {salida}.")
+            return {'salida': salida}
+        if operacion == 'resumen':
+            resumen = lector.resumen(params.get('matriz'))
+            return {
+                'forma': list(resumen.forma),
+                'varianza': resumen.varianza,
+                'minimo': resumen.minimo,
+                'maximo': resumen.maximo,
+                'promedio_tiempo': resumen.promedio_tiempo,
+            }
+        if operacion == 'figura':
+            # Solo los métodos de gráficas: el nombre lo elige el cliente
+            grafica = params['grafica']
+            if not grafica.startswith('graficar_') or not callable(getattr(lector, grafica, None)):
+                raise ValueError(f"Gráfica '{grafica}' no reconocida.")
+            salida = self.ruta_salida(params['salida'])
+            if not getattr(lector, grafica)(ruta_salida=salida, **params.get('opciones', {})):
+                raise ValueError(f"No se pudo generar la gráfica '{grafica}'.")
+            return {'salida': salida}
+        raise ValueError(f"Operación '{operacion}' no reconocida.")
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    sesion = None
+    clave = None
+
+    def _rechazo(self):
+        """
+        Motivo para rechazar la petición (código, mensaje) o None si es válida.
+
+        Una página web abierta en el navegador puede enviar POST a localhost,
+        pero sin la clave y, salvo con CORS, solo como text/plain o formulario.
+        """
+        if self.headers.get_content_type() != 'application/json':
+            return 415, "Solo se aceptan peticiones application/json."
+        origen = self.headers.get('Origin')
+        locales = (f'http://127.0.0.1:{self.server.server_port}', f'http://localhost:{self.server.server_port}')
+        if origen is not None and origen not in locales:
+            return 403, f"Origen no permitido: {origen}"
+        if not hmac.compare_digest(self.headers.get(ENCABEZADO_CLAVE, ''), self.clave):
+            return 401, "Falta la clave de la sesión o no es válida."
+        return None
+
+    def do_POST(self):
+        rechazo = self._rechazo()
+        if rechazo is not None:
+            self._responder({'ok': False, 'error': rechazo[1]}, rechazo[0])
+            return
+        try:
+            cuerpo = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            salida = io.StringIO()
+            with contextlib.redirect_stdout(salida):
+                resultado = self.sesion.ejecutar(cuerpo.pop('operacion'), cuerpo)
+            respuesta, codigo = {'ok': True, 'resultado': resultado, 'mensajes': salida.getvalue()}, 200
+        except Exception as e:
+            respuesta, codigo = {'ok': False, 'error': f"{type(e).__name__}: {e}"}, 400
+        self._responder(respuesta, codigo)
+
+    def _responder(self, respuesta, codigo):
+        datos = json.dumps(respuesta, default=_a_json, ensure_ascii=False).encode('utf-8')
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def log_message(self, formato, *args):
+        pass  # Sin registro por petición
+
+
+def _guardar_clave(clave, puerto):
+    ruta = archivo_clave(puerto)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    if os.path.exists(ruta):
+        os.remove(ruta)
+    descriptor = os.open(ruta, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(descriptor, 'w', encoding='ascii') as f:
+        f.write(clave)
+    return ruta
+
+
+def iniciar_servidor(puerto=PUERTO, memoria_max=2 * 1024 ** 3, carpeta_salida='.'):
+    """
+    Inicia el servidor en localhost y atiende peticiones hasta Ctrl+C.
+
+    Genera una clave nueva para la sesión, la muestra y la guarda para
+    cliente.enviar en un archivo que solo puede leer el usuario.
+    """
+    import matplotlib
+    matplotlib.use('Agg')  # Las figuras se guardan en archivos, sin ventanas
+
+    _Manejador.sesion = Sesion(memoria_max, carpeta_salida)
+    _Manejador.clave = secrets.token_urlsafe(32)
+    servidor = HTTPServer(('127.0.0.1', puerto), _Manejador)
+    ruta_clave = _guardar_clave(_Manejador.clave, puerto)
+    print(f"Servidor de sesión escuchando en http://127.0.0.1:{puerto}")
+    print(f"Clave de la sesión: {_Manejador.clave} (guardada en {ruta_clave})")
+    print(f"Carpeta de salida: {_Manejador.sesion.carpeta_salida}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\nServidor detenido.")
+    finally:
+        servidor.server_close()
+        if os.path.exists(ruta_clave):
+            os.remove(ruta_clave)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor de sesión para datos CSV y MAT.")
+    parser.add_argument('--puerto', type=int, default=PUERTO)
+    parser.add_argument('--memoria-mb', type=int, default=2048, help="Presupuesto de memoria para los datos.")
+    parser.add_argument('--salida', default='.', help="Carpeta donde se escriben las salidas.")
+    args = parser.parse_args()
+    iniciar_servidor(args.puerto, args.memoria_mb * 1024 ** 2, args.salida)
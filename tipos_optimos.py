@@ -0,0 +1,209 @@
+import json
+import os
+
+import numpy as np
+
+from cache import CACHE_DIR
+from importacion_perezosa import importar_perezoso, disponible
+
+pd = importar_perezoso('pandas')
+
+HAY_ARROW = disponible('pyarrow')
+
+ARCHIVO_ESQUEMAS = os.path.join(CACHE_DIR, 'esquemas.json')
+
+# Fracción máxima de valores distintos para convertir texto en categoría
+MAX_FRACCION_CATEGORIAS = 0.5
+
+_ENTEROS = [
+    ('uint8', np.uint8), ('int8', np.int8), ('uint16', np.uint16), ('int16', np.int16),
+    ('uint32', np.uint32), ('int32', np.int32),
+]
+
+
+def _entero_minimo(minimo, maximo):
+    for nombre, tipo in _ENTEROS:
+        info = np.iinfo(tipo)
+        if info.min <= minimo and maximo <= info.max:
+            return nombre
+    return 'int64'
+
+
+def es_entero_angosto(tipo):
+    """
+    Indica si el tipo es un entero de menos de 64 bits (NumPy, con NA o Arrow).
+    """
+    tipo = pd.api.types.pandas_dtype(tipo)
+    return pd.api.types.is_integer_dtype(tipo) and _numpy(tipo).itemsize < 8
+
+
+def _numpy(tipo):
+    # 'UInt8' y 'uint8[pyarrow]' guardan el tipo de NumPy equivalente en numpy_dtype
+    return np.dtype(getattr(tipo, 'numpy_dtype', tipo))
+
+
+def tipo_ancho(tipo):
+    """
+    Entero de 64 bits equivalente al tipo: 'int64', 'Int64' (con NA) o 'int64[pyarrow]'.
+
+    Los enteros compactos desbordan en silencio al operar (uint8: 20 * 19 = 124),
+    así que se amplían antes de usarlos en cálculos.
+    """
+    nombre = str(tipo)
+    if nombre.endswith('[pyarrow]'):
+        return 'int64[pyarrow]'
+    if nombre[0] in 'UI':
+        return 'Int64'
+    return 'int64'
+
+
+def ampliar_entero(tipo, minimo, maximo):
+    """
+    Devuelve el tipo si minimo y maximo caben en él (np.iinfo); si no, el
+    entero más pequeño de la misma familia (NumPy, con NA o Arrow) que
+    abarca su rango y el nuevo.
+    """
+    info = np.iinfo(_numpy(pd.api.types.pandas_dtype(tipo)))
+    if info.min <= minimo and maximo <= info.max:
+        return tipo
+    nuevo = _entero_minimo(min(minimo, info.min), max(maximo, info.max))
+    if str(tipo).endswith('[pyarrow]'):
+        return f'{nuevo}[pyarrow]'
+    if str(tipo)[0] in 'UI':
+        return 'UInt' + nuevo[4:] if nuevo.startswith('uint') else 'Int' + nuevo[3:]
+    return nuevo
+
+
+def _ajustar_enteros(data, esquema):
+    """
+    Convierte las columnas enteras (leídas en 64 bits) al tipo compacto del
+    esquema, o a uno más amplio si sus valores ya no caben.
+
+    :return: Esquema con los tipos finales.
+    """
+    ajustado = dict(esquema)
+    for col, tipo in esquema.items():
+        if col not in data.columns or not es_entero_angosto(tipo):
+            continue
+        valores = data[col].dropna()
+        if len(valores):
+            ajustado[col] = ampliar_entero(tipo, valores.min(), valores.max())
+        data[col] = data[col].astype(ajustado[col])
+    return ajustado
+
+
+def inferir_esquema(data, arrow=False):
+    """
+    Elige el tipo más compacto para cada columna del DataFrame.
+
+    - Enteros: el entero más pequeño que contiene el rango de la columna.
+    - Decimales con solo valores enteros y NaN: entero con NA de pandas (Int8, ...).
+    - Texto con pocos valores distintos: categoría.
+    - Con arrow=True, el texto restante y los enteros usan tipos de Arrow.
+
+    :param data: DataFrame cargado con los tipos por defecto.
+    :param arrow: Si es True se usan tipos respaldados por pyarrow.
+    :return: Diccionario {columna: tipo}.
+    """
+    esquema = {}
+    for col in data.columns:
+        serie = data[col]
+        if pd.api.types.is_bool_dtype(serie):
+            continue
+        if pd.api.types.is_integer_dtype(serie):
+            if len(serie) == 0:
+                continue
+            tipo = _entero_minimo(serie.min(), serie.max())
+            esquema[col] = f'{tipo}[pyarrow]' if arrow else tipo
+        elif pd.api.types.is_float_dtype(serie):
+            valores = serie.dropna()
+            if len(valores) and np.all(np.mod(valores, 1) == 0):
+                tipo = _entero_minimo(valores.min(), valores.max())
+                # Entero con NA de pandas: 'uint8' -> 'UInt8', 'int16' -> 'Int16'
+                con_na = 'UInt' + tipo[4:] if tipo.startswith('uint') else 'Int' + tipo[3:]
+                esquema[col] = f'{tipo}[pyarrow]' if arrow else con_na
+        elif pd.api.types.is_object_dtype(serie) or pd.api.types.is_string_dtype(serie):
+            if len(serie) and serie.nunique(dropna=True) <= MAX_FRACCION_CATEGORIAS * len(serie):
+                esquema[col] = 'category'
+            elif arrow:
+                esquema[col] = 'string[pyarrow]'
+    return esquema
+
+
+def _version(file_path):
+    info = os.stat(file_path)
+    return info.st_size, info.st_mtime_ns
+
+
+def leer_esquema(file_path):
+    """
+    Devuelve el esquema guardado para el archivo o None si no existe o si
+    el archivo cambió (tamaño o fecha) desde que se guardó.
+    """
+    try:
+        with open(ARCHIVO_ESQUEMAS, encoding='utf-8') as f:
+            guardado = json.load(f).get(os.path.abspath(file_path))
+        if guardado is None or (guardado.get('bytes'), guardado.get('mtime_ns')) != _version(file_path):
+            return None
+        return guardado
+    except (OSError, ValueError):
+        return None
+
+
+def guardar_esquema(file_path, esquema, arrow, bytes_originales):
+    """
+    Guarda el esquema elegido para el archivo, junto con la memoria que
+    ocupaba el DataFrame con los tipos por defecto.
+    """
+    try:
+        with open(ARCHIVO_ESQUEMAS, encoding='utf-8') as f:
+            esquemas = json.load(f)
+    except (OSError, ValueError):
+        esquemas = {}
+    tamano, mtime_ns = _version(file_path)
+    esquemas[os.path.abspath(file_path)] = {
+        'tipos': esquema, 'arrow': arrow, 'bytes_originales': int(bytes_originales),
+        'bytes': tamano, 'mtime_ns': mtime_ns,
+    }
+    os.makedirs(os.path.dirname(ARCHIVO_ESQUEMAS), exist_ok=True)
+    with open(ARCHIVO_ESQUEMAS, 'w', encoding='utf-8') as f:
+        json.dump(esquemas, f, indent=2, ensure_ascii=False)
+
+
+def cargar_optimizado(file_path, arrow=False):
+    """
+    Carga un CSV con tipos compactos.
+
+    Si ya hay un esquema guardado para el archivo (del mismo tamaño y
+    fecha), se pasa a pd.read_csv y se evita la inferencia. Los enteros se
+    leen en 64 bits y se reducen después de comprobar su rango con np.iinfo:
+    pd.read_csv con dtype='uint8' no avisa si un valor no cabe (300 queda
+    como 44). Si un valor ya no cabe, la columna se amplía.
+
+    :param file_path: Ruta al archivo CSV.
+    :param arrow: Si es True se usan tipos respaldados por pyarrow.
+    :return: Tupla (DataFrame, bytes con tipos por defecto, bytes optimizados).
+    """
+    if arrow and not HAY_ARROW:
+        print("pyarrow no está instalado; se usan tipos de NumPy.")
+        arrow = False
+
+    guardado = leer_esquema(file_path)
+    if guardado is not None and guardado['arrow'] == arrow:
+        tipos = guardado['tipos']
+        lectura = {c: tipo_ancho(t) if es_entero_angosto(t) else t for c, t in tipos.items()}
+        try:
+            data = pd.read_csv(file_path, index_col=0, dtype=lectura)
+            ajustado = _ajustar_enteros(data, tipos)
+            if ajustado != tipos:
+                guardar_esquema(file_path, ajustado, arrow, guardado['bytes_originales'])
+            return data, guardado['bytes_originales'], data.memory_usage(deep=True).sum()
+        except (ValueError, TypeError, OverflowError):
+            pass  # El esquema ya no es válido (p. ej. texto en una columna entera)
+
+    data = pd.read_csv(file_path, index_col=0)
+    bytes_originales = data.memory_usage(deep=True).sum()
+    esquema = inferir_esquema(data, arrow)
+    data = data.astype(esquema)
+    guardar_esquema(file_path, esquema, arrow, bytes_originales)
+    return data, bytes_originales, data.memory_usage(deep=True).sum()